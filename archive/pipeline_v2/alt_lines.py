@@ -0,0 +1,151 @@
+"""
+Alternate-line markets (alternate_spreads / alternate_totals) in compact columnar form.
+
+Alternates multiply a slate's row count 10-30x, so their rows are not kept as
+dicts of strings. Each raw row becomes one entry in a few typed arrays:
+- prices: int32 milli-odds per bookmaker column (1.950 -> 1950, 0 = not quoted).
+  Exact for the extractor's 3-decimal prices (1950 / 1000.0 == float("1.950")),
+  4 bytes per price instead of a dict slot holding a string.
+- event code (meta kept once per event), market code, selection code
+- outcome order (0 = Over / home side, 1 = Under / away side)
+- the row's own line and its pairing line (home handicap for spreads)
+
+pair_lines() dedupes and pairs both sides of every line with one lexsort and
+hands back the (markets, 2, books) odds tensor plus per-outcome side ids and
+lines, ready for market_matrix and line_index.
+"""
+
+from array import array
+from typing import Dict, List
+
+import numpy as np
+
+ALT_LINE_MARKETS = ("alternate_spreads", "alternate_totals")
+EVENT_META = ("timestamp", "sport", "event_id", "commence_time", "away_team", "home_team")
+
+
+def _to_float(val) -> float:
+    try:
+        return float(val)
+    except Exception:
+        return 0.0
+
+
+def new_line_store(bookie_cols: List[str]) -> Dict:
+    """Empty store for one slate (or one sport) of alternate-line rows."""
+    return {
+        "bookie_cols": list(bookie_cols),
+        "events": [],
+        "event_codes": {},
+        "selections": [],
+        "selection_codes": {},
+        "event": array("i"),
+        "market": array("b"),
+        "selection": array("i"),
+        "order": array("b"),
+        "line": array("d"),
+        "pair_line": array("d"),
+        "prices": array("i"),
+    }
+
+
+def add_line_row(store: Dict, row: Dict) -> bool:
+    """Append one raw row to the store. Returns False if it is not a usable alternate line."""
+    market = row.get("market", "")
+    point = row.get("point", "")
+    if market not in ALT_LINE_MARKETS or point in ("", None):
+        return False
+    line = _to_float(point)
+    selection = row.get("selection", "") or ""
+
+    if market == "alternate_totals":
+        lowered = selection.lower()
+        if lowered.startswith("over"):
+            order = 0
+        elif lowered.startswith("under"):
+            order = 1
+        else:
+            return False
+        pair_line = line
+    elif selection == row.get("home_team"):
+        order, pair_line = 0, line
+    elif selection == row.get("away_team"):
+        order, pair_line = 1, -line
+    else:
+        return False
+
+    event_id = row.get("event_id", "")
+    event = store["event_codes"].get(event_id)
+    if event is None:
+        event = store["event_codes"][event_id] = len(store["events"])
+        store["events"].append({col: row.get(col, "") for col in EVENT_META})
+    sel = store["selection_codes"].get(selection)
+    if sel is None:
+        sel = store["selection_codes"][selection] = len(store["selections"])
+        store["selections"].append(selection)
+
+    store["event"].append(event)
+    store["market"].append(ALT_LINE_MARKETS.index(market))
+    store["selection"].append(sel)
+    store["order"].append(order)
+    store["line"].append(line)
+    store["pair_line"].append(pair_line + 0.0)
+    prices = store["prices"]
+    for bk in store["bookie_cols"]:
+        price = _to_float(row.get(bk))
+        prices.append(int(round(price * 1000)) if price > 1 else 0)
+    return True
+
+
+def store_size(store: Dict) -> int:
+    return len(store["event"])
+
+
+def pair_lines(store: Dict) -> Dict[str, np.ndarray]:
+    """Pair both outcomes of every (event, market, line) in the store.
+
+    Duplicate rows for the same outcome (several timestamps) keep the one with
+    most bookmaker coverage, like extract_outcomes. Returns a dict with:
+    - rows:   (markets, 2) store row indices, outcome 0 = Over / home side
+    - prices: (markets, 2, books) decimal odds (0 = not quoted)
+    - side:   (markets, 2) side ids, one per (event, market, outcome order)
+    - line:   (markets, 2) each outcome's own line
+    """
+    n_books = len(store["bookie_cols"])
+    n_rows = store_size(store)
+    event = np.frombuffer(store["event"], dtype=np.int32).astype(np.int64)
+    market = np.frombuffer(store["market"], dtype=np.int8).astype(np.int64)
+    order = np.frombuffer(store["order"], dtype=np.int8).astype(np.int64)
+    line = np.frombuffer(store["line"], dtype=np.float64)
+    pair_line = np.frombuffer(store["pair_line"], dtype=np.float64)
+    milli = np.frombuffer(store["prices"], dtype=np.int32).reshape(n_rows, n_books)
+
+    coverage = (milli > 0).sum(axis=1)
+    idx = np.lexsort((-coverage, order, pair_line, market, event))
+    same_outcome = np.zeros(len(idx), dtype=bool)
+    if len(idx) > 1:
+        same_outcome[1:] = (
+            (event[idx[1:]] == event[idx[:-1]])
+            & (market[idx[1:]] == market[idx[:-1]])
+            & (pair_line[idx[1:]] == pair_line[idx[:-1]])
+            & (order[idx[1:]] == order[idx[:-1]])
+        )
+    idx = idx[~same_outcome]
+
+    # Sorted by (event, market, pair_line, order): a market is an order-0 row
+    # directly followed by the order-1 row of the same line
+    first, second = idx[:-1], idx[1:]
+    is_pair = (
+        (event[first] == event[second])
+        & (market[first] == market[second])
+        & (pair_line[first] == pair_line[second])
+        & (order[first] == 0)
+        & (order[second] == 1)
+    )
+    rows = np.stack([first[is_pair], second[is_pair]], axis=1)
+    return {
+        "rows": rows,
+        "prices": milli[rows] / 1000.0,
+        "side": (event[rows] * len(ALT_LINE_MARKETS) + market[rows]) * 2 + order[rows],
+        "line": line[rows],
+    }
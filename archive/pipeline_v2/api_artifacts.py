@@ -0,0 +1,67 @@
+"""
+Pre-encoded API responses published by the pipeline.
+
+Each artifact is a gzip-compressed JSON body the API sends as-is, next to a
+small sidecar (<name>.meta.json) holding the request parameters it answers,
+its ETag and the (mtime_ns, size) of the file it was built from. The API only
+serves the bytes while that source file is unchanged, so an artifact from an
+earlier run is never mistaken for the current data.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+ARTIFACT_DIRNAME = "api"
+GZIP_LEVEL = int(os.getenv("API_ARTIFACT_GZIP_LEVEL", "6"))
+
+
+def artifact_name(base: str, sport: Optional[str] = None) -> Optional[str]:
+    """File stem for a view ("ev_hits", "ev_hits.basketball_nba"); None if sport is unsafe."""
+    if not sport:
+        return base
+    return f"{base}.{sport}" if re.fullmatch(r"[A-Za-z0-9_\-]+", sport) else None
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def publish_artifact(
+    data_dir: Path, name: str, body: Dict, params: Dict, source: Path
+) -> Optional[Dict]:
+    """Write body as <name>.json.gz plus its sidecar; returns the sidecar (None if no source).
+
+    The blob is written before the sidecar, and the sidecar names the source
+    version, so a reader never pairs a new sidecar with an old blob.
+    """
+    try:
+        stat = source.stat()
+    except OSError:
+        return None
+    raw = json.dumps(body, separators=(",", ":"), default=str).encode("utf-8")
+    blob = gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+    meta = {
+        "name": name,
+        "params": params,
+        "etag": hashlib.sha256(raw).hexdigest()[:32],
+        "bytes": len(raw),
+        "gzip_bytes": len(blob),
+        "source": source.name,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "source_size": stat.st_size,
+        "published_at": datetime.utcnow().isoformat(),
+    }
+    directory = Path(data_dir) / ARTIFACT_DIRNAME
+    directory.mkdir(parents=True, exist_ok=True)
+    _write_atomic(directory / f"{name}.json.gz", blob)
+    _write_atomic(directory / f"{name}.meta.json", json.dumps(meta).encode("utf-8"))
+    return meta
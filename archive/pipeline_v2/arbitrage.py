@@ -0,0 +1,88 @@
+"""
+Cross-book arbitrage from a per-bucket best-price-per-side index.
+
+The index maps bucket_key -> selection -> side, where a side holds every
+book's current quote and the cached best (price, book):
+
+    {bucket_key: {selection: {"quotes": {book: price}, "best_price": p, "best_book": b}}}
+
+update_quote keeps it current one quote at a time: a better price replaces the
+best in O(1); only when the best book shortens or withdraws is that one side
+rescanned. Building it from a slate is therefore a single O(quotes) pass of
+update_quote calls, and re-checking a bucket after a quote change only looks at
+that bucket's cached bests.
+
+A bucket is an arb when the best prices of its (exhaustive) outcomes satisfy
+sum(1 / best) < 1. Stakes are split in proportion to 1 / best so every outcome
+pays the same, for a guaranteed profit of 1 / sum(1 / best) - 1.
+"""
+
+from typing import Dict, List, Tuple
+
+
+def update_quote(index: Dict, key: Tuple, selection: str, book: str, price: float) -> bool:
+    """Set one book's quote (price <= 1 withdraws it). Returns True if the side's best changed."""
+    side = index.setdefault(key, {}).get(selection)
+    if side is None:
+        side = index[key][selection] = {"quotes": {}, "best_price": 0.0, "best_book": ""}
+    quotes = side["quotes"]
+    if price > 1:
+        quotes[book] = price
+    else:
+        quotes.pop(book, None)
+        if book != side["best_book"]:
+            return False  # withdrawing a quote that was not the best
+
+    if price > side["best_price"]:
+        side["best_price"], side["best_book"] = price, book
+        return True
+    if book == side["best_book"] and price < side["best_price"]:
+        # Best quote shortened or withdrawn: rescan this side only
+        if quotes:
+            best_book = max(quotes, key=quotes.get)
+            side["best_price"], side["best_book"] = quotes[best_book], best_book
+        else:
+            side["best_price"], side["best_book"] = 0.0, ""
+        return True
+    return False
+
+
+def bucket_arb(sides: Dict[str, Dict], total_stake: float) -> Dict | None:
+    """Arb for one bucket's sides from their cached best prices, or None."""
+    if len(sides) < 2:
+        return None
+    inverse = 0.0
+    for side in sides.values():
+        if side["best_price"] <= 1:
+            return None
+        inverse += 1.0 / side["best_price"]
+    if inverse >= 1.0:
+        return None
+
+    legs = [
+        {
+            "selection": selection,
+            "book": side["best_book"],
+            "odds": side["best_price"],
+            "stake": total_stake * (1.0 / side["best_price"]) / inverse,
+        }
+        for selection, side in sides.items()
+    ]
+    return {
+        "profit_percent": (1.0 / inverse - 1.0) * 100,
+        "payout": total_stake / inverse,
+        "total_stake": total_stake,
+        "legs": legs,
+    }
+
+
+def scan_arbitrage(
+    index: Dict, total_stake: float, min_profit: float = 0.0, keys=None
+) -> List[Tuple[Tuple, Dict]]:
+    """[(bucket_key, arb)] for every bucket (or just ``keys``) with profit >= min_profit."""
+    found = []
+    for key in index if keys is None else keys:
+        arb = bucket_arb(index.get(key, {}), total_stake)
+        if arb and arb["profit_percent"] >= min_profit * 100:
+            found.append((key, arb))
+    return found
@@ -0,0 +1,429 @@
+"""
+BACKTEST
+Replays archived raw-odds snapshots through the EV engine and settles the hits
+against final results.
+
+Usage (from the directory containing pipeline_v2/):
+    python -m pipeline_v2.backtest --snapshots "data/snapshots/*.csv" --results data/results.csv
+    python -m pipeline_v2.backtest --snapshots ... --results ... \\
+        --min-edge 0.01 0.02 0.03 --profile ratings sport default --devig none shin
+
+Snapshots are raw wide CSVs (raw_odds_pure.csv format); every distinct
+timestamp is one snapshot. The results CSV settles bets with either
+    event_id, home_score, away_score                  (h2h / spreads / totals + alternates)
+or  event_id, market, selection, point, result        (win / loss / push / void; anything else)
+
+How it runs:
+1. Rows are priced a chunk of snapshots at a time: the snapshot is folded into
+   the bucket key, so one price_market_batch call prices many snapshots at once.
+2. Every target price with EV >= the lowest swept edge is a candidate bet.
+3. Per min edge, one bet per outcome: the first snapshot where it qualifies, at
+   that snapshot's best qualifying price.
+4. Bankroll paths for every min edge at once: a (min edges, bets) P&L matrix in
+   settlement order -> cumsum for equity, running max for drawdown.
+
+Each (weight profile, devig method) config reprices the archive, so a sweep runs
+configs in worker processes. Profiles: "ratings" = the live engine (rating *
+sport weight), "sport" = each sport's SPORT_WEIGHT_PROFILES entry, or any
+SPORT_WEIGHT_PROFILES key applied to every sport.
+"""
+
+import argparse
+import csv
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from pipeline_v2.calculate_opportunities import (
+    BANKROLL,
+    DATA_DIR,
+    EXCLUDE_MARKETS,
+    KELLY_FRACTION,
+    TARGET_BOOKS,
+    _is_over,
+    _is_under,
+    bookie_columns_from_header,
+    bucket_key,
+    extract_outcomes,
+    home_line,
+    parse_float,
+    partition_by_sport,
+    price_market_batch,
+    width_class,
+)
+from pipeline_v2.market_matrix import ev_matrix
+from pipeline_v2.ratings import SPORT_WEIGHT_PROFILES, get_sharp_books_only, load_weight_config
+
+BACKTEST_CSV = DATA_DIR / "backtest_results.csv"
+SNAPSHOTS_PER_BATCH = int(os.getenv("BACKTEST_SNAPSHOTS_PER_BATCH", "200"))
+FLAT_STAKE = BANKROLL * 0.01
+
+WIN, LOSS, PUSH, UNSETTLED = 1, 0, 2, -1
+RESULT_CODES = {"win": WIN, "won": WIN, "loss": LOSS, "lost": LOSS, "push": PUSH, "void": PUSH}
+
+
+def load_snapshots(patterns: List[str]) -> Tuple[List[str], List[Dict]]:
+    """Bookmaker columns and every row of the archived snapshot CSVs (glob patterns)."""
+    paths = sorted({p for pattern in patterns for p in glob.glob(pattern)})
+    header: set = set()
+    rows: List[Dict] = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            header.update(reader.fieldnames or [])
+            rows.extend(reader)
+    print(f"[OK] Loaded {len(rows)} rows from {len(paths)} snapshot files")
+    return bookie_columns_from_header(header), rows
+
+
+def _point_key(point) -> str:
+    if point in ("", None):
+        return ""
+    return str(parse_float(point) + 0.0)
+
+
+def load_results(path: str) -> Tuple[Dict[str, Tuple[float, float]], Dict[Tuple, int]]:
+    """(scores, explicit): event_id -> (home, away) scores, outcome key -> result code."""
+    scores: Dict[str, Tuple[float, float]] = {}
+    explicit: Dict[Tuple, int] = {}
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            event_id = row.get("event_id", "")
+            if row.get("result"):
+                code = RESULT_CODES.get(row["result"].strip().lower(), UNSETTLED)
+                key = (event_id, row.get("market", ""), row.get("selection", ""))
+                explicit[key + (_point_key(row.get("point")),)] = code
+            elif row.get("home_score") and row.get("away_score"):
+                scores[event_id] = (float(row["home_score"]), float(row["away_score"]))
+    print(f"[OK] Loaded results: {len(scores)} final scores, {len(explicit)} settled outcomes")
+    return scores, explicit
+
+
+def settle(
+    outcome: Dict,
+    scores: Dict[str, Tuple[float, float]],
+    explicit: Dict[Tuple, int],
+) -> int:
+    """Result code (WIN / LOSS / PUSH / UNSETTLED) for one outcome row."""
+    event_id, market = outcome.get("event_id", ""), outcome.get("market", "")
+    selection, point = outcome.get("selection", ""), outcome.get("point", "")
+    code = explicit.get((event_id, market, selection, _point_key(point)))
+    if code is not None:
+        return code
+    if event_id not in scores:
+        return UNSETTLED
+
+    home, away = scores[event_id]
+    family = market[len("alternate_") :] if market.startswith("alternate_") else market
+    is_home = selection == outcome.get("home_team")
+    is_away = selection == outcome.get("away_team")
+    if family == "h2h":
+        if selection == "Draw":
+            return WIN if home == away else LOSS
+        if home == away:
+            # A tie is a loss in a 3-way (soccer) market and void in a 2-way one
+            return LOSS if "soccer" in outcome.get("sport", "") else PUSH
+        if is_home or is_away:
+            return WIN if (home > away) == is_home else LOSS
+        return UNSETTLED
+    if family == "spreads" and (is_home or is_away) and point not in ("", None):
+        margin = (home - away if is_home else away - home) + parse_float(point)
+    elif family == "totals" and point not in ("", None):
+        total, line = home + away, parse_float(point)
+        if _is_over(selection):
+            margin = total - line
+        elif _is_under(selection):
+            margin = line - total
+        else:
+            return UNSETTLED
+    else:
+        return UNSETTLED
+    return WIN if margin > 0 else LOSS if margin < 0 else PUSH
+
+
+def _snapshot_key(row: Dict, snapshot: int) -> Tuple:
+    """bucket_key with the snapshot folded into the event (alternate spreads pair like spreads)."""
+    sport, event_id, market, point, player = bucket_key(row)
+    if market == "alternate_spreads":
+        point = home_line(row)
+    return (sport, (snapshot, event_id), market, point, player)
+
+
+def _sharp_weights(profile: str, sport: str) -> Dict[str, float] | None:
+    if profile == "ratings":
+        return None
+    weights = load_weight_config(sport) if profile == "sport" else SPORT_WEIGHT_PROFILES[profile]
+    return get_sharp_books_only(weights)
+
+
+def candidate_bets(
+    rows: List[Dict],
+    bookie_cols: List[str],
+    min_edge: float,
+    profile: str = "ratings",
+    devig_method: str = "none",
+    target_books: List[str] | None = None,
+) -> Dict[str, np.ndarray]:
+    """Every target price with EV >= min_edge across all snapshots, as parallel arrays."""
+    allowed = set(target_books) if target_books is not None else set(TARGET_BOOKS)
+    target_idx = [i for i, bk in enumerate(bookie_cols) if bk in allowed]
+    snapshot_ids = {ts: i for i, ts in enumerate(sorted({r.get("timestamp", "") for r in rows}))}
+
+    found: Dict[str, List] = {
+        name: [] for name in ("snapshot", "book", "odds", "fair", "ev", "outcome", "commence")
+    }
+    outcomes: List[Dict] = []
+    outcome_codes: Dict[Tuple, int] = {}
+    for sport, sport_rows in sorted(partition_by_sport(rows).items()):
+        sharp_weights = _sharp_weights(profile, sport)
+        by_snapshot: Dict[int, List[Dict]] = {}
+        for row in sport_rows:
+            by_snapshot.setdefault(snapshot_ids[row.get("timestamp", "")], []).append(row)
+        ordered = sorted(by_snapshot)
+
+        for start in range(0, len(ordered), SNAPSHOTS_PER_BATCH):
+            grouped: Dict[Tuple, List[Dict]] = {}
+            for snapshot in ordered[start : start + SNAPSHOTS_PER_BATCH]:
+                for row in by_snapshot[snapshot]:
+                    grouped.setdefault(_snapshot_key(row, snapshot), []).append(row)
+
+            batches: Dict[int, List[Tuple[Tuple, List[Dict]]]] = {}
+            for key, bucket in grouped.items():
+                if key[2] in EXCLUDE_MARKETS:
+                    continue
+                market_outcomes = extract_outcomes(bucket)
+                if market_outcomes:
+                    batches.setdefault(width_class(len(market_outcomes)), []).append(
+                        (key, market_outcomes)
+                    )
+
+            for width, markets in batches.items():
+                batch = price_market_batch(
+                    markets, width, bookie_cols, devig_method, sharp_weights=sharp_weights
+                )
+                fair = np.where(batch["priced"][:, np.newaxis], batch["fair"], 0.0)
+                ev = ev_matrix(batch["prices"][:, :, target_idx], fair)
+                for m, o, t in zip(*np.nonzero(ev >= min_edge)):
+                    key, market_outcomes = markets[m]
+                    row = market_outcomes[o]
+                    family = (
+                        key[2][len("alternate_") :] if key[2].startswith("alternate_") else key[2]
+                    )
+                    outcome = (
+                        key[1][1],
+                        family,
+                        row.get("selection", ""),
+                        _point_key(row.get("point")),
+                    )
+                    code = outcome_codes.get(outcome)
+                    if code is None:
+                        code = outcome_codes[outcome] = len(outcomes)
+                        outcomes.append(row)
+                    found["snapshot"].append(key[1][0])
+                    found["book"].append(target_idx[t])
+                    found["odds"].append(batch["prices"][m, o, target_idx[t]])
+                    found["fair"].append(fair[m, o])
+                    found["ev"].append(ev[m, o, t])
+                    found["outcome"].append(code)
+                    found["commence"].append(row.get("commence_time", ""))
+
+    dtypes = {"odds": float, "fair": float, "ev": float, "commence": str}
+    candidates = {
+        name: np.array(values, dtype=dtypes.get(name, np.int64)) for name, values in found.items()
+    }
+    candidates["outcomes"] = outcomes
+    candidates["n_snapshots"] = len(snapshot_ids)
+    return candidates
+
+
+def select_bets(candidates: Dict, min_edges: List[float]) -> List[np.ndarray]:
+    """Candidate indices bet at each min edge: first qualifying snapshot per outcome, best odds."""
+    order = np.lexsort((-candidates["odds"], candidates["snapshot"], candidates["outcome"]))
+    chosen = []
+    for min_edge in min_edges:
+        sub = order[candidates["ev"][order] >= min_edge]
+        outcome = candidates["outcome"][sub]
+        first = np.ones(len(sub), dtype=bool)
+        first[1:] = outcome[1:] != outcome[:-1]
+        chosen.append(sub[first])
+    return chosen
+
+
+def bankroll_paths(
+    candidates: Dict,
+    chosen: List[np.ndarray],
+    results: np.ndarray,
+    stake_mode: str = "kelly",
+) -> List[Dict]:
+    """Metrics for every min edge from one (params, bets) P&L matrix in settlement order."""
+    n = len(candidates["odds"])
+    odds, fair = candidates["odds"], candidates["fair"]
+    if stake_mode == "flat":
+        stakes = np.full(n, FLAT_STAKE)
+    else:
+        # kelly_stake for every candidate at once (zero unless both prices exceed 1)
+        priced = (odds > 1.0) & (fair > 1.0)
+        p = np.divide(1.0, fair, out=np.zeros(n), where=priced)
+        kelly = np.divide(odds * p - (1 - p), odds - 1.0, out=np.zeros(n), where=priced)
+        stakes = np.clip(BANKROLL * kelly * KELLY_FRACTION, 0.0, BANKROLL * 0.1)
+    code = results[candidates["outcome"]] if n else np.zeros(0, dtype=np.int64)
+    unit_return = np.select([code == WIN, code == LOSS], [odds - 1.0, -1.0], 0.0)
+    settled = code != UNSETTLED
+
+    # Column order = settlement order (kick-off, then when the bet was placed)
+    settle_order = np.lexsort((candidates["snapshot"], candidates["commence"]))
+    position = np.empty(n, dtype=np.int64)
+    position[settle_order] = np.arange(n)
+
+    picked = np.zeros((len(chosen), n), dtype=bool)
+    for p, idx in enumerate(chosen):
+        picked[p, idx[settled[idx]]] = True
+    staked = np.where(picked, stakes, 0.0)
+    pnl = np.zeros((len(chosen), n))
+    pnl[:, position] = staked * unit_return
+
+    equity = BANKROLL + np.cumsum(pnl, axis=1)
+    peak = np.maximum.accumulate(np.maximum(equity, BANKROLL), axis=1)
+    drawdown = (peak - equity) / peak
+
+    metrics = []
+    for p, idx in enumerate(chosen):
+        bets = picked[p]
+        wins = int((bets & (code == WIN)).sum())
+        losses = int((bets & (code == LOSS)).sum())
+        total_staked = float(staked[p].sum())
+        profit = float(pnl[p].sum())
+        metrics.append(
+            {
+                "bets": int(bets.sum()),
+                "unsettled": int(len(idx) - bets.sum()),
+                "wins": wins,
+                "losses": losses,
+                "pushes": int((bets & (code == PUSH)).sum()),
+                "staked": total_staked,
+                "profit": profit,
+                "roi_percent": profit / total_staked * 100 if total_staked else 0.0,
+                "hit_rate_percent": wins / (wins + losses) * 100 if wins + losses else 0.0,
+                "max_drawdown_percent": float(drawdown[p].max()) * 100 if n else 0.0,
+                "avg_ev_percent": float(candidates["ev"][idx].mean()) * 100 if len(idx) else 0.0,
+                "final_bankroll": BANKROLL + profit,
+            }
+        )
+    return metrics
+
+
+def run_backtest(
+    snapshots: List[str],
+    results_path: str,
+    min_edges: List[float],
+    profile: str = "ratings",
+    devig_method: str = "none",
+    stake_mode: str = "kelly",
+) -> List[Dict]:
+    """Backtest one pricing config over every min edge. Top-level so it can run in a worker."""
+    started = time.perf_counter()
+    bookie_cols, rows = load_snapshots(snapshots)
+    scores, explicit = load_results(results_path)
+    candidates = candidate_bets(rows, bookie_cols, min(min_edges), profile, devig_method)
+    results = np.array(
+        [settle(outcome, scores, explicit) for outcome in candidates["outcomes"]], dtype=np.int64
+    )
+    chosen = select_bets(candidates, min_edges)
+    metrics = bankroll_paths(candidates, chosen, results, stake_mode)
+    elapsed = time.perf_counter() - started
+    print(
+        f"[BACKTEST] profile={profile} devig={devig_method}: "
+        f"{candidates['n_snapshots']} snapshots, {len(candidates['odds'])} candidates "
+        f"in {elapsed:.1f}s"
+    )
+    return [
+        {
+            "profile": profile,
+            "devig_method": devig_method,
+            "min_edge": edge,
+            "stake": stake_mode,
+            **m,
+        }
+        for edge, m in zip(min_edges, metrics)
+    ]
+
+
+def sweep(
+    snapshots: List[str],
+    results_path: str,
+    min_edges: List[float],
+    profiles: List[str],
+    devig_methods: List[str],
+    stake_mode: str = "kelly",
+    workers: int | None = None,
+) -> List[Dict]:
+    """Backtest every (profile, devig method) config, one worker process per config."""
+    configs = [(profile, method) for profile in profiles for method in devig_methods]
+    workers = min(workers or os.cpu_count() or 1, len(configs))
+    if workers <= 1:
+        runs = [
+            run_backtest(snapshots, results_path, min_edges, profile, method, stake_mode)
+            for profile, method in configs
+        ]
+    else:
+        print(f"[PARALLEL] {len(configs)} configs across {workers} worker processes...")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    run_backtest, snapshots, results_path, min_edges, profile, method, stake_mode
+                )
+                for profile, method in configs
+            ]
+            runs = [future.result() for future in futures]
+    return [row for run in runs for row in run]
+
+
+def write_backtest(rows: List[Dict], path=BACKTEST_CSV):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"✅ Wrote {len(rows)} backtest rows to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest EV hits over archived snapshots")
+    parser.add_argument("--snapshots", nargs="+", required=True, help="snapshot CSV glob(s)")
+    parser.add_argument("--results", required=True, help="results CSV")
+    parser.add_argument("--min-edge", type=float, nargs="+", default=[0.01, 0.02, 0.03, 0.05])
+    parser.add_argument("--profile", nargs="+", default=["ratings"])
+    parser.add_argument("--devig", nargs="+", default=["none"])
+    parser.add_argument("--stake", choices=["kelly", "flat"], default="kelly")
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--out", default=str(BACKTEST_CSV))
+    args = parser.parse_args()
+
+    rows = sweep(
+        args.snapshots,
+        args.results,
+        sorted(args.min_edge),
+        args.profile,
+        args.devig,
+        args.stake,
+        args.workers or None,
+    )
+    print(
+        f"\n{'profile':<16}{'devig':<16}{'edge':>6}{'bets':>7}{'ROI%':>8}"
+        f"{'hit%':>7}{'maxDD%':>8}{'profit':>10}"
+    )
+    for r in rows:
+        print(
+            f"{r['profile']:<16}{r['devig_method']:<16}{r['min_edge']:>6.3f}{r['bets']:>7}"
+            f"{r['roi_percent']:>8.2f}{r['hit_rate_percent']:>7.1f}"
+            f"{r['max_drawdown_percent']:>8.2f}{r['profit']:>10.2f}"
+        )
+    if rows:
+        write_backtest(rows, args.out)
+
+
+if __name__ == "__main__":
+    main()
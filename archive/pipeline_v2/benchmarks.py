@@ -0,0 +1,875 @@
+"""
+PIPELINE BENCHMARKS
+Synthetic-slate benchmarks for the EV calculator stages.
+
+Usage (from the directory containing pipeline_v2/):
+    python -m pipeline_v2.benchmarks db_read --rows 100000 1000000
+    python -m pipeline_v2.benchmarks devig --markets 1000000
+    python -m pipeline_v2.benchmarks ev --rows 200000
+    python -m pipeline_v2.benchmarks alternates --games 15 150
+    python -m pipeline_v2.benchmarks portfolio --opps 5000
+    python -m pipeline_v2.benchmarks backtest --snapshots 2000
+    python -m pipeline_v2.benchmarks clv --history 1000000 5000000
+    python -m pipeline_v2.benchmarks writer --opps 50000 --books 60
+    python -m pipeline_v2.benchmarks api --opps 50000
+
+Each measured run happens in a fresh subprocess so peak RSS is per-method.
+"""
+
+import argparse
+import csv
+import math
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from pipeline_v2.calculate_opportunities import (
+    ORDERED_BOOKIE_COLS,
+    get_bookie_columns,
+    group_rows_wide,
+    partition_by_sport,
+    process_markets,
+    read_raw_odds_grouped,
+    run_sports,
+)
+from pipeline_v2.devig import DEVIG_METHODS, devig
+from pipeline_v2.portfolio import opportunity_keys, simultaneous_kelly, size_portfolio
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+BENCH_SPORTS = ["basketball_nba", "americanfootball_nfl", "icehockey_nhl", "soccer_epl"]
+
+
+def synthetic_rows(n_rows: int, n_books: int = 24, seed: int = 7) -> Iterator[Dict]:
+    """Raw-format rows (event-grouped totals ladders, ~70% of books priced)."""
+    rng = random.Random(seed)
+    books = ORDERED_BOOKIE_COLS[:n_books]
+    lines_per_event = 20
+    produced = 0
+    event_no = 0
+    while produced < n_rows:
+        sport = BENCH_SPORTS[event_no % len(BENCH_SPORTS)]
+        for line in range(lines_per_event):
+            point = 200.5 + line
+            base = 1.9 + rng.uniform(-0.1, 0.1)
+            for side in ("Over", "Under"):
+                row = {
+                    "timestamp": "2025-12-10T00:00:00+00:00",
+                    "sport": sport,
+                    "event_id": f"ev{event_no}",
+                    "away_team": "Away",
+                    "home_team": "Home",
+                    "commence_time": "2025-12-10T10:00:00Z",
+                    "market": "totals",
+                    "point": f"{point}",
+                    "selection": f"{side} +{point:.1f}",
+                }
+                for bk in books:
+                    if rng.random() < 0.7:
+                        row[bk] = f"{base + rng.uniform(-0.08, 0.12):.3f}"
+                    else:
+                        row[bk] = ""
+                yield row
+                produced += 1
+                if produced >= n_rows:
+                    return
+        event_no += 1
+
+
+def synthetic_h2h_rows(n_rows: int, n_books: int = 24, seed: int = 7) -> Iterator[Dict]:
+    """Raw-format 3-way soccer match result rows (Home / Draw / Away)."""
+    rng = random.Random(seed)
+    books = ORDERED_BOOKIE_COLS[:n_books]
+    for produced in range(n_rows):
+        event_no, outcome = divmod(produced, 3)
+        if outcome == 0:
+            bases = [2.1, 3.4, 3.6]
+            rng.shuffle(bases)
+        row = {
+            "timestamp": "2025-12-10T00:00:00+00:00",
+            "sport": "soccer_epl",
+            "event_id": f"ev{event_no}",
+            "away_team": "Away",
+            "home_team": "Home",
+            "commence_time": "2025-12-10T10:00:00Z",
+            "market": "h2h",
+            "point": "",
+            "selection": ("Home", "Draw", "Away")[outcome],
+        }
+        for bk in books:
+            if rng.random() < 0.7:
+                row[bk] = f"{bases[outcome] * (1 + rng.uniform(-0.05, 0.05)):.3f}"
+            else:
+                row[bk] = ""
+        yield row
+
+
+def synthetic_events(
+    n_games: int, n_lines: int = 30, sport: str = "basketball_nba", seed: int = 7
+) -> List[Dict]:
+    """Odds API shaped events: main spreads/totals plus alternate ladders of n_lines per book."""
+    from pipeline_v2.extract_odds import BOOKMAKER_TO_COLUMN
+
+    rng = random.Random(seed)
+    book_keys = list(dict.fromkeys(BOOKMAKER_TO_COLUMN))
+
+    def price(prob: float) -> float:
+        return round(max(1.01, 1.0 / (prob * 1.045) * (1 + rng.uniform(-0.03, 0.03))), 3)
+
+    events = []
+    for game in range(n_games):
+        home, away = f"Home {game}", f"Away {game}"
+        spread = -rng.choice(range(1, 12)) - 0.5
+        total = 200.5 + rng.choice(range(40))
+        bookmakers = []
+        for key in book_keys:
+            if rng.random() > 0.8:
+                continue
+
+            def spread_outcomes(lines):
+                out = []
+                for line in lines:
+                    # P(home covers at handicap `line`)
+                    p_home = 1.0 / (1.0 + math.exp(-0.15 * (line - spread) * 2))
+                    p_home = min(max(p_home, 0.03), 0.97)
+                    out.append({"name": home, "price": price(p_home), "point": line})
+                    out.append({"name": away, "price": price(1 - p_home), "point": -line})
+                return out
+
+            def total_outcomes(lines):
+                out = []
+                for line in lines:
+                    p_over = 1.0 / (1.0 + math.exp(0.08 * (line - total)))
+                    p_over = min(max(p_over, 0.03), 0.97)
+                    out.append({"name": "Over", "price": price(p_over), "point": line})
+                    out.append({"name": "Under", "price": price(1 - p_over), "point": line})
+                return out
+
+            offsets = [
+                k for k in range(-n_lines // 2, n_lines // 2 + 1) if k and rng.random() < 0.7
+            ]
+            markets = [
+                {"key": "spreads", "outcomes": spread_outcomes([spread])},
+                {"key": "totals", "outcomes": total_outcomes([total])},
+                {
+                    "key": "alternate_spreads",
+                    "outcomes": spread_outcomes([spread + k for k in offsets]),
+                },
+                {
+                    "key": "alternate_totals",
+                    "outcomes": total_outcomes([total + k for k in offsets]),
+                },
+            ]
+            bookmakers.append({"key": key, "markets": markets})
+        events.append(
+            {
+                "id": f"{sport}-{game}",
+                "sport_key": sport,
+                "home_team": home,
+                "away_team": away,
+                "commence_time": "2025-12-10T10:00:00Z",
+                "bookmakers": bookmakers,
+            }
+        )
+    return events
+
+
+def synthetic_snapshots(
+    n_snapshots: int, n_games: int = 10, n_books: int = 24, seed: int = 7
+) -> Tuple[List[Dict], List[Dict]]:
+    """Archived-snapshot rows for NBA slates (h2h, spreads, totals) plus final scores.
+
+    A new slate of n_games starts every 50 snapshots; books price each game's true
+    probabilities with 4.5% margin and +-3% noise, and scores are drawn from the
+    same margin / total distributions.
+    """
+    rng = random.Random(seed)
+    books = ORDERED_BOOKIE_COLS[:n_books]
+
+    def cover(mean: float, sd: float, line: float) -> float:
+        # P(X > line) for X ~ N(mean, sd)
+        return min(max(0.5 * (1 - math.erf((line - mean) / (sd * math.sqrt(2)))), 0.03), 0.97)
+
+    rows: List[Dict] = []
+    results: List[Dict] = []
+    games: List[Dict] = []
+    for snap in range(n_snapshots):
+        if snap % 50 == 0:
+            slate = snap // 50
+            games = []
+            for g in range(n_games):
+                margin, total = rng.gauss(0, 6), rng.gauss(225, 8)
+                game = {
+                    "event_id": f"nba-{slate}-{g}",
+                    "home_team": f"Home {slate}-{g}",
+                    "away_team": f"Away {slate}-{g}",
+                    "commence_time": f"2025-12-{10 + slate % 20:02d}T{g % 10 + 10:02d}:00:00Z",
+                    "margin": margin,
+                    "total": total,
+                    "spread": -round(margin) - 0.5,
+                    "line": round(total) + 0.5,
+                }
+                games.append(game)
+                home = rng.gauss(margin, 12)
+                points = rng.gauss(total, 18)
+                results.append(
+                    {
+                        "event_id": game["event_id"],
+                        "home_score": round((points + home) / 2),
+                        "away_score": round((points - home) / 2),
+                    }
+                )
+        timestamp = f"2025-12-10T00:00:00+00:00#{snap:06d}"
+        for game in games:
+            p_home_win = cover(game["margin"], 12, 0)
+            p_home_cover = cover(game["margin"], 12, -game["spread"])
+            p_over = cover(game["total"], 18, game["line"])
+            sides = [
+                ("h2h", "", game["home_team"], p_home_win),
+                ("h2h", "", game["away_team"], 1 - p_home_win),
+                ("spreads", game["spread"], game["home_team"], p_home_cover),
+                ("spreads", -game["spread"], game["away_team"], 1 - p_home_cover),
+                ("totals", game["line"], f"Over +{game['line']:.1f}", p_over),
+                ("totals", game["line"], f"Under +{game['line']:.1f}", 1 - p_over),
+            ]
+            for market, point, selection, prob in sides:
+                row = {
+                    "timestamp": timestamp,
+                    "sport": "basketball_nba",
+                    "event_id": game["event_id"],
+                    "away_team": game["away_team"],
+                    "home_team": game["home_team"],
+                    "commence_time": game["commence_time"],
+                    "market": market,
+                    "point": f"{point}",
+                    "selection": selection,
+                }
+                for bk in books:
+                    if rng.random() < 0.8:
+                        price = 1.0 / (prob * 1.045) * (1 + rng.uniform(-0.03, 0.03))
+                        row[bk] = f"{max(price, 1.01):.3f}"
+                    else:
+                        row[bk] = ""
+                rows.append(row)
+    return rows, results
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _build_sqlite(n_rows: int, path: Path):
+    db_engine = create_engine(f"sqlite:///{path}")
+    batch: List[Dict] = []
+    first = True
+    for row in synthetic_rows(n_rows):
+        batch.append(row)
+        if len(batch) >= 50000:
+            pd.DataFrame(batch).to_sql(
+                "raw_odds_pure", db_engine, if_exists="replace" if first else "append", index=False
+            )
+            batch, first = [], False
+    if batch:
+        pd.DataFrame(batch).to_sql(
+            "raw_odds_pure", db_engine, if_exists="replace" if first else "append", index=False
+        )
+
+
+def _db_read_worker(method: str, db_path: str):
+    """Run one read method and print 'seconds peak_rss_mb buckets'."""
+    db_url = f"sqlite:///{db_path}"
+    start = time.perf_counter()
+    if method == "legacy":
+        df = pd.read_sql(
+            "SELECT * FROM raw_odds_pure ORDER BY timestamp DESC", create_engine(db_url)
+        )
+        rows = df.to_dict("records")
+        buckets = sum(len(group_rows_wide(r)) for r in partition_by_sport(rows).values())
+    else:
+        _, grouped_by_sport, _ = read_raw_odds_grouped(db_url)
+        buckets = sum(len(g) for g in grouped_by_sport.values())
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed:.2f} {_peak_rss_mb():.0f} {buckets}")
+
+
+def _alternates_worker(stage: str, n_games: int, csv_path: str):
+    """One cron stage on a synthetic slate; prints 'seconds peak_rss_mb count'."""
+    start = time.perf_counter()
+    if stage == "extract":
+        from pipeline_v2.extract_odds import BASE_HEADERS, expand_to_rows
+
+        rows = expand_to_rows(synthetic_events(n_games), "2025-12-10T00:00:00+00:00")
+        books = sorted({col for row in rows for col in row} - set(BASE_HEADERS))
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=BASE_HEADERS + books)
+            writer.writeheader()
+            writer.writerows(rows)
+        count = len(rows)
+    else:
+        with open(csv_path, "r", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        bookie_cols = get_bookie_columns(rows[:1])
+        count = len(run_sports(partition_by_sport(rows), bookie_cols, max_workers=1))
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed:.2f} {_peak_rss_mb():.0f} {count}")
+
+
+def bench_alternates(game_counts: List[int]):
+    """Extract + EV stages for NBA slates with alternate lines vs the 30 min / 512 MB budget."""
+    env = dict(os.environ, PYTHONPATH=str(Path(__file__).parent.parent))
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_games in game_counts:
+            csv_path = str(Path(tmp) / f"raw_{n_games}.csv")
+            total = 0.0
+            for stage in ("extract", "calculate"):
+                out = subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        "pipeline_v2.benchmarks",
+                        "_alternates",
+                        stage,
+                        str(n_games),
+                        csv_path,
+                    ],
+                    capture_output=True,
+                    text=True,
+                    env=env,
+                )
+                if out.returncode != 0:
+                    print(f"  {stage:10} {n_games:>5} games: FAILED ({out.stderr.strip()[-200:]})")
+                    break
+                seconds, peak_mb, count = out.stdout.strip().splitlines()[-1].split()
+                total += float(seconds)
+                unit = "rows" if stage == "extract" else "hits"
+                print(
+                    f"  {stage:10} {n_games:>5} games: {float(seconds):7.2f}s  "
+                    f"peak RSS {peak_mb:>5} MB  ({count} {unit})"
+                    f"{'  [over 512 MB]' if float(peak_mb) > 512 else ''}"
+                )
+            print(f"  {'total':10} {n_games:>5} games: {total:7.2f}s of the 1800s cycle")
+
+
+def bench_db_read(row_counts: List[int], methods: List[str]):
+    env = dict(os.environ, PYTHONPATH=str(Path(__file__).parent.parent))
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in row_counts:
+            db_path = Path(tmp) / f"raw_{n_rows}.db"
+            print(f"[BENCH] Building {n_rows} row SQLite raw_odds_pure...")
+            _build_sqlite(n_rows, db_path)
+            for method in methods:
+                out = subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        "pipeline_v2.benchmarks",
+                        "_db_read",
+                        method,
+                        str(db_path),
+                    ],
+                    capture_output=True,
+                    text=True,
+                    env=env,
+                )
+                if out.returncode != 0:
+                    print(f"  {method:10} {n_rows:>9} rows: FAILED ({out.stderr.strip()[-200:]})")
+                    continue
+                seconds, peak_mb, buckets = out.stdout.strip().splitlines()[-1].split()
+                print(
+                    f"  {method:10} {n_rows:>9} rows: {float(seconds):7.2f}s  "
+                    f"peak RSS {peak_mb} MB  ({buckets} buckets)"
+                )
+
+
+def synthetic_odds(n_markets: int, n_outcomes: int, margin: float = 0.05, seed: int = 7):
+    """(markets x outcomes) decimal odds with a ~margin overround."""
+    rng = np.random.default_rng(seed)
+    true_p = rng.dirichlet(np.full(n_outcomes, 3.0), size=n_markets)
+    return 1.0 / (true_p * (1.0 + margin))
+
+
+def bench_devig(n_markets: int, repeats: int = 3):
+    for n_outcomes in (2, 3):
+        odds = synthetic_odds(n_markets, n_outcomes)
+        for method in DEVIG_METHODS:
+            best = float("inf")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                devig(odds, method)
+                best = min(best, time.perf_counter() - start)
+            print(
+                f"  {method:15} {n_outcomes}-way x {n_markets}: {best * 1000:8.1f} ms  "
+                f"{n_markets / best:>14,.0f} markets/sec"
+            )
+
+
+def bench_ev(n_rows: int, repeats: int = 3):
+    """process_markets throughput on 2-way totals and 3-way h2h slates."""
+    for label, rows in (
+        ("2-way totals", list(synthetic_rows(n_rows))),
+        ("3-way h2h", list(synthetic_h2h_rows(n_rows))),
+    ):
+        bookie_cols = get_bookie_columns(rows[:100])
+        grouped = group_rows_wide(rows)
+        for method in ("none", "shin"):
+            best = float("inf")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                found = process_markets(grouped, bookie_cols, devig_method=method)
+                best = min(best, time.perf_counter() - start)
+            print(
+                f"  {label:13} {method:5} {len(grouped):>8} markets: {best:7.2f}s  "
+                f"{len(grouped) / best:>10,.0f} markets/sec  ({len(found)} hits)"
+            )
+
+
+def bench_sensitivity(n_rows: int, n_tiers: int = 13, n_edges: int = 41):
+    """Sensitivity sweep: price once, then every (profile, devig, min sharps, edge) config."""
+    from pipeline_v2.sensitivity import default_profiles, precompute, sweep
+
+    rows = list(synthetic_rows(n_rows))
+    bookie_cols = get_bookie_columns(rows[:100])
+    grouped = group_rows_wide(rows)
+    methods = ["none", "shin"]
+    profiles = default_profiles(list(np.linspace(0.2, 0.8, n_tiers)))
+    min_edges = list(np.linspace(0.0, 0.10, n_edges))
+
+    start = time.perf_counter()
+    matrix = precompute(grouped, bookie_cols, methods)
+    priced = time.perf_counter()
+    results = sweep(matrix, profiles, methods, [2, 3, 4, 5, 6], min_edges)
+    done = time.perf_counter()
+    print(
+        f"  {len(grouped)} markets: priced once in {priced - start:.2f}s, "
+        f"{len(results):,} configs in {done - priced:.2f}s "
+        f"({len(results) / (done - priced):,.0f} configs/sec)"
+    )
+
+
+def synthetic_opportunities(n_opps: int, per_event: int = 25, seed: int = 7) -> List[Dict]:
+    """EV hits shaped like process_markets output, per_event hits per game."""
+    rng = random.Random(seed)
+    opps = []
+    for i in range(n_opps):
+        fair = rng.uniform(1.5, 4.0)
+        market = rng.choice(["totals", "spreads", "h2h"])
+        selection = {"totals": ["Over", "Under"], "spreads": ["Home", "Away"]}.get(
+            market, ["Home", "Away", "Draw"]
+        )
+        opps.append(
+            {
+                "sport": "basketball_nba",
+                "event_id": f"ev{i // per_event}",
+                "market": market,
+                "line": "" if market == "h2h" else f"{rng.choice([-2.5, -1.5, 1.5, 2.5])}",
+                "selection": rng.choice(selection),
+                "away_team": "Away",
+                "home_team": "Home",
+                "best_book": rng.choice(["Sportsbet", "Tab", "Neds"]),
+                "odds_decimal": fair * rng.uniform(1.01, 1.10),
+                "fair_odds": fair,
+            }
+        )
+    return opps
+
+
+def bench_portfolio(n_opps: int, repeats: int = 5):
+    opps = synthetic_opportunities(n_opps)
+    timings = {"keys": float("inf"), "solver": float("inf"), "total": float("inf")}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        bucket, _, _ = opportunity_keys(opps)
+        timings["keys"] = min(timings["keys"], time.perf_counter() - start)
+
+        prob = np.array([1.0 / o["fair_odds"] for o in opps])
+        odds = np.array([o["odds_decimal"] for o in opps])
+        start = time.perf_counter()
+        simultaneous_kelly(prob, odds, bucket)
+        timings["solver"] = min(timings["solver"], time.perf_counter() - start)
+
+        start = time.perf_counter()
+        stakes = size_portfolio(opps, 1000, 0.25)
+        timings["total"] = min(timings["total"], time.perf_counter() - start)
+    print(
+        f"  {n_opps} opportunities: keys {timings['keys'] * 1000:.1f} ms, "
+        f"solver {timings['solver'] * 1000:.2f} ms, size_portfolio {timings['total'] * 1000:.1f} ms"
+        f"  (${stakes.sum():.0f} staked)"
+    )
+
+
+def _write_dict_csv(path: Path, data: List[Dict]):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(data[0]))
+        writer.writeheader()
+        writer.writerows(data)
+
+
+def bench_backtest(n_snapshots: int, min_edges: List[float]):
+    """Backtest replay throughput over synthetic archived snapshots."""
+    from pipeline_v2.backtest import run_backtest
+
+    rows, results = synthetic_snapshots(n_snapshots)
+    with tempfile.TemporaryDirectory() as tmp:
+        snap_path, results_path = Path(tmp) / "snapshots.csv", Path(tmp) / "results.csv"
+        _write_dict_csv(snap_path, rows)
+        _write_dict_csv(results_path, results)
+
+        started = time.perf_counter()
+        metrics = run_backtest([str(snap_path)], str(results_path), min_edges)
+        elapsed = time.perf_counter() - started
+
+    print(
+        f"  {n_snapshots} snapshots ({len(rows)} rows): {elapsed:.2f}s "
+        f"= {n_snapshots / elapsed * 60:,.0f} snapshots/min"
+    )
+    for m in metrics:
+        print(
+            f"    edge {m['min_edge']:.3f}: {m['bets']} bets, ROI {m['roi_percent']:.2f}%, "
+            f"hit {m['hit_rate_percent']:.1f}%, max DD {m['max_drawdown_percent']:.2f}%"
+        )
+
+
+def bench_calibrate(n_snapshots: int, n_books: int):
+    """Calibration scoring throughput over synthetic archived snapshots."""
+    from pipeline_v2.calibrate import run_calibration
+
+    rows, results = synthetic_snapshots(n_snapshots, n_books=n_books)
+    with tempfile.TemporaryDirectory() as tmp:
+        snap_path, results_path = Path(tmp) / "snapshots.csv", Path(tmp) / "results.csv"
+        _write_dict_csv(snap_path, rows)
+        _write_dict_csv(results_path, results)
+
+        started = time.perf_counter()
+        scores = run_calibration([str(snap_path)], str(results_path), max_workers=1)
+        elapsed = time.perf_counter() - started
+
+    quotes = int(scores["quotes"].sum())
+    print(
+        f"  {n_snapshots} snapshots ({len(rows)} rows x {n_books} books): {quotes:,} quotes "
+        f"scored in {elapsed:.2f}s = {quotes / elapsed:,.0f} quotes/sec"
+    )
+
+
+def bench_clv(n_history: int, n_opps: int = 20000):
+    """CLV as-of join over a fair history of n_history rows (read from CSV + join)."""
+    from pipeline_v2.clv import HISTORY_COLUMNS, LOG_COLUMNS, append_rows, clv_table
+
+    rng = np.random.default_rng(11)
+    n_events, n_outcomes = 2000, 40
+    snapshots = max(n_history // (n_events * n_outcomes), 1)
+    start = np.datetime64("2025-12-01T00:00:00")
+    kickoff = start + np.timedelta64(1, "D")
+
+    # History: every outcome of every event, one fair per snapshot (every 10 minutes)
+    event = np.tile(np.repeat(np.arange(n_events), n_outcomes), snapshots)
+    outcome = np.tile(np.arange(n_outcomes), n_events * snapshots)
+    snapshot = np.repeat(np.arange(snapshots), n_events * n_outcomes)
+    observed = start + snapshot * np.timedelta64(10, "m")
+    fair = rng.uniform(1.5, 3.0, len(event)).round(4)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history_path, log_path = Path(tmp) / "fair_history.csv", Path(tmp) / "log.csv"
+        pd.DataFrame(
+            {
+                "observed_at": observed.astype(str),
+                "event_id": event,
+                "market": "totals",
+                "point": outcome // 2 + 200.5,
+                "selection": np.where(outcome % 2 == 0, "Over", "Under"),
+                "fair_odds": fair,
+            },
+            columns=HISTORY_COLUMNS,
+        ).to_csv(history_path, index=False)
+
+        picks = rng.integers(0, n_events * n_outcomes, n_opps)
+        append_rows(
+            log_path,
+            LOG_COLUMNS,
+            (
+                (
+                    "2025-12-01T00:00:00",
+                    "basketball_nba",
+                    int(p // n_outcomes),
+                    f"{kickoff}Z",
+                    "totals",
+                    f"{p % n_outcomes // 2 + 200.5:g}",
+                    "Over" if p % 2 == 0 else "Under",
+                    "Sportsbet",
+                    2.1,
+                    2.0,
+                    5.0,
+                )
+                for p in picks.tolist()
+            ),
+        )
+
+        started = time.perf_counter()
+        table = clv_table(log_path, history_path)
+        elapsed = time.perf_counter() - started
+    closed = int(table["closing_fair"].notna().sum())
+    print(
+        f"  history {len(event):,} rows, {n_opps:,} opportunities: {elapsed:.2f}s "
+        f"({closed:,} closed), peak RSS {_peak_rss_mb():.0f} MB"
+    )
+
+
+def synthetic_built_opportunities(n_opps: int, n_books: int) -> Tuple[List[Dict], List[str]]:
+    """(opportunities as the calculator builds them, CSV headers) over n_books price columns."""
+    from pipeline_v2 import calculate_opportunities as calc
+
+    rng = random.Random(3)
+    books = (ORDERED_BOOKIE_COLS + [f"Book{i}" for i in range(n_books)])[:n_books]
+    opps = []
+    for i, base in enumerate(synthetic_opportunities(n_opps)):
+        prices = [round(rng.uniform(1.5, 4.0), 2) if rng.random() < 0.7 else 0.0 for _ in books]
+        opp = calc._build_opportunity(
+            {**base, "commence_time": f"2025-12-{10 + i % 5}T0{i % 8}:00:00Z"},
+            base["market"],
+            base["line"],
+            base["selection"],
+            base["best_book"],
+            base["odds_decimal"],
+            base["fair_odds"],
+            base["odds_decimal"] / base["fair_odds"] - 1,
+            3,
+            prices,
+            books,
+        )
+        opps.append(opp)
+    return opps, calc.build_headers(books)
+
+
+def bench_writer(n_opps: int, n_books: int):
+    """EV CSV + DB write: per-row format_row / ORM objects vs the bulk block writer (SQLite)."""
+    from sqlalchemy.orm import sessionmaker
+
+    from pipeline_v2 import calculate_opportunities as calc
+
+    opps, headers = synthetic_built_opportunities(n_opps, n_books)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_engine = create_engine(f"sqlite:///{Path(tmp) / 'ev.db'}")
+        calc.Base.metadata.create_all(db_engine)
+        session_factory = sessionmaker(bind=db_engine)
+
+        started = time.perf_counter()
+        with open(Path(tmp) / "rows.csv", "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=headers)
+            writer.writeheader()
+            for opp in opps:
+                writer.writerow(calc.format_row(opp, headers))
+        csv_rows = time.perf_counter() - started
+        db = session_factory()
+        db.query(calc.EVOpportunity).delete()
+        for opp in opps:
+            db.add(calc.build_ev_record(opp))
+        db.commit()
+        db.close()
+        per_row = time.perf_counter() - started
+
+        calc.EV_CSV, calc.SessionLocal = Path(tmp) / "bulk.csv", None
+        started = time.perf_counter()
+        calc.write_opportunities_stream(iter(opps), headers)
+        bulk_csv = time.perf_counter() - started
+
+        calc.engine, calc.SessionLocal = db_engine, session_factory
+        started = time.perf_counter()
+        calc.write_opportunities_stream(iter(opps), headers)
+        bulk = time.perf_counter() - started
+
+        same_csv = (Path(tmp) / "rows.csv").read_bytes() == (Path(tmp) / "bulk.csv").read_bytes()
+        with db_engine.connect() as conn:
+            stored = conn.execute(calc.EVOpportunity.__table__.select()).fetchall()
+
+    print(
+        f"  {n_opps} opportunities x {n_books} books: per-row {per_row:.2f}s "
+        f"(CSV {csv_rows:.2f}s), bulk {bulk:.2f}s (CSV {bulk_csv:.2f}s) -> {per_row / bulk:.1f}x "
+        f"(identical CSV: {same_csv}, {len(stored)} DB rows)"
+    )
+
+
+def _api_worker(db_path: str, seconds: float, interval: float = 0.005):
+    """Ping /health every interval while the admin EV CSV export runs; print latency summary.
+
+    Latency is measured from when each ping was due, so pings held back by a
+    blocked event loop count their full wait (no coordinated omission).
+    """
+    import asyncio
+
+    import httpx
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    sys.path.insert(0, str(REPO_ROOT))
+    import backend_api
+
+    async def run():
+        transport = httpx.ASGITransport(app=backend_api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            downloads: List[float] = []
+            health: List[float] = []
+            done = asyncio.Event()
+
+            async def download_loop():
+                while not done.is_set():
+                    started = time.perf_counter()
+                    response = await client.get(
+                        "/api/admin/ev-opportunities-csv", headers={"Authorization": "Bearer x"}
+                    )
+                    response.raise_for_status()
+                    downloads.append(time.perf_counter() - started)
+
+            task = asyncio.create_task(download_loop())
+            start, slot = time.perf_counter(), 0
+            while time.perf_counter() - start < seconds:
+                await asyncio.sleep(max(0.0, start + slot * interval - time.perf_counter()))
+                sent = time.perf_counter()
+                (await client.get("/health")).raise_for_status()
+                finished = time.perf_counter()
+                # Every ping that fell due before this one went out waited until now
+                while start + slot * interval <= sent:
+                    health.append(finished - (start + slot * interval))
+                    slot += 1
+            done.set()
+            await task
+        return health, downloads
+
+    health, downloads = asyncio.run(run())
+    p50, p99 = np.percentile(np.array(health) * 1000, [50, 99])
+    print(f"{p50:.2f} {p99:.2f} {max(health) * 1000:.2f} {len(downloads)} {np.mean(downloads):.2f}")
+
+
+def bench_api(n_opps: int, seconds: float = 5.0):
+    """/health latency under a concurrent admin CSV export (SQLite, in-process ASGI client)."""
+    from sqlalchemy.orm import sessionmaker
+
+    from pipeline_v2 import calculate_opportunities as calc
+
+    opps, _ = synthetic_built_opportunities(n_opps, 8)
+    env = dict(os.environ, PYTHONPATH=str(Path(__file__).parent.parent))
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "ev.db"
+        db_engine = create_engine(f"sqlite:///{db_path}")
+        calc.Base.metadata.create_all(db_engine)
+        db = sessionmaker(bind=db_engine)()
+        db.add_all(calc.build_ev_record(opp) for opp in opps)
+        db.commit()
+        db.close()
+        out = subprocess.run(
+            [sys.executable, "-m", "pipeline_v2.benchmarks", "_api", str(db_path), str(seconds)],
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+    if out.returncode != 0:
+        print(f"  api {n_opps} opportunities: FAILED ({out.stderr.strip()[-300:]})")
+        return
+    p50, p99, worst, n_downloads, download_s = out.stdout.strip().splitlines()[-1].split()
+    print(
+        f"  {n_opps} EV rows: /health p50 {p50} ms, p99 {p99} ms, max {worst} ms "
+        f"during {n_downloads} CSV exports ({download_s}s each)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EV pipeline benchmarks")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_db = sub.add_parser("db_read", help="raw_odds_pure read: legacy vs projected cursor")
+    p_db.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    p_db.add_argument("--methods", nargs="+", default=["legacy", "projected"])
+
+    p_devig = sub.add_parser("devig", help="devig throughput per method")
+    p_devig.add_argument("--markets", type=int, default=1000000)
+
+    p_ev = sub.add_parser("ev", help="EV engine throughput, 2-way vs 3-way markets")
+    p_ev.add_argument("--rows", type=int, default=200000)
+
+    p_alt = sub.add_parser("alternates", help="NBA slates with alternate lines, extract + EV")
+    p_alt.add_argument("--games", type=int, nargs="+", default=[15, 150])
+
+    p_alt_worker = sub.add_parser("_alternates")
+    p_alt_worker.add_argument("stage")
+    p_alt_worker.add_argument("games", type=int)
+    p_alt_worker.add_argument("csv_path")
+
+    p_sens = sub.add_parser("sensitivity", help="threshold / weight profile sweep")
+    p_sens.add_argument("--rows", type=int, default=200000)
+
+    p_port = sub.add_parser("portfolio", help="portfolio Kelly sizing latency")
+    p_port.add_argument("--opps", type=int, nargs="+", default=[5000])
+
+    p_bt = sub.add_parser("backtest", help="backtest replay throughput")
+    p_bt.add_argument("--snapshots", type=int, nargs="+", default=[2000])
+    p_bt.add_argument("--min-edge", type=float, nargs="+", default=[0.01, 0.02, 0.03, 0.05])
+
+    p_cal = sub.add_parser("calibrate", help="sharp-book calibration scoring throughput")
+    p_cal.add_argument("--snapshots", type=int, nargs="+", default=[2000])
+    p_cal.add_argument("--books", type=int, default=24)
+
+    p_clv = sub.add_parser("clv", help="CLV as-of join over the fair history")
+    p_clv.add_argument("--history", type=int, nargs="+", default=[1000000])
+    p_clv.add_argument("--opps", type=int, default=20000)
+
+    p_writer = sub.add_parser("writer", help="EV CSV + DB writer, per-row vs bulk")
+    p_writer.add_argument("--opps", type=int, default=50000)
+    p_writer.add_argument("--books", type=int, default=60)
+
+    p_api = sub.add_parser("api", help="/health latency during the admin EV CSV export")
+    p_api.add_argument("--opps", type=int, nargs="+", default=[50000])
+
+    p_api_worker = sub.add_parser("_api")
+    p_api_worker.add_argument("db_path")
+    p_api_worker.add_argument("seconds", type=float)
+
+    p_worker = sub.add_parser("_db_read")
+    p_worker.add_argument("method")
+    p_worker.add_argument("db_path")
+
+    args = parser.parse_args()
+    if args.cmd == "db_read":
+        bench_db_read(args.rows, args.methods)
+    elif args.cmd == "devig":
+        bench_devig(args.markets)
+    elif args.cmd == "ev":
+        bench_ev(args.rows)
+    elif args.cmd == "alternates":
+        bench_alternates(args.games)
+    elif args.cmd == "_alternates":
+        _alternates_worker(args.stage, args.games, args.csv_path)
+    elif args.cmd == "sensitivity":
+        bench_sensitivity(args.rows)
+    elif args.cmd == "portfolio":
+        for n_opps in args.opps:
+            bench_portfolio(n_opps)
+    elif args.cmd == "backtest":
+        for n_snapshots in args.snapshots:
+            bench_backtest(n_snapshots, sorted(args.min_edge))
+    elif args.cmd == "calibrate":
+        for n_snapshots in args.snapshots:
+            bench_calibrate(n_snapshots, args.books)
+    elif args.cmd == "clv":
+        for n_history in args.history:
+            bench_clv(n_history, args.opps)
+    elif args.cmd == "writer":
+        bench_writer(args.opps, args.books)
+    elif args.cmd == "api":
+        for n_opps in args.opps:
+            bench_api(n_opps)
+    elif args.cmd == "_api":
+        _api_worker(args.db_path, args.seconds)
+    elif args.cmd == "_db_read":
+        _db_read_worker(args.method, args.db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,19 +6,74 @@ writes EV-positive opportunities to CSV and PostgreSQL database.
 """
 
 import csv
+import io
 import os
 import sys
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from itertools import chain, islice, repeat
+from operator import itemgetter
 from pathlib import Path
 from statistics import median
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
 
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
-from sqlalchemy import Column, DateTime, Float, Integer, String, create_engine
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    select,
+)
 from sqlalchemy.orm import declarative_base, sessionmaker
 
-from pipeline_v2.ratings import BOOKMAKER_RATINGS, get_sport_weight  # keep only needed
+from pipeline_v2.alt_lines import (
+    ALT_LINE_MARKETS,
+    add_line_row,
+    new_line_store,
+    pair_lines,
+    store_size,
+)
+from pipeline_v2.api_artifacts import artifact_name, publish_artifact
+from pipeline_v2.arbitrage import scan_arbitrage, update_quote
+from pipeline_v2.clv import (
+    HISTORY_RETENTION_DAYS,
+    LOG_COLUMNS,
+    append_history,
+    append_rows,
+    clv_table,
+    outcome_point,
+    prune_history,
+    summarize,
+    write_clv,
+)
+from pipeline_v2.devig import DEVIG_METHODS, devig
+from pipeline_v2.leaderboard import (
+    leaderboards_document,
+    new_leaderboards,
+    offer,
+    write_leaderboards,
+)
+from pipeline_v2.line_index import SOURCE_NONE, fill_unpriced_lines
+from pipeline_v2.market_matrix import (
+    WIDTH_CLASSES,
+    ev_matrix,
+    outcome_mask,
+    outlier_mask,
+    priced_markets,
+    sharp_fair_prices,
+    width_class,
+)
+from pipeline_v2.middles import middle_value, middle_windows
+from pipeline_v2.portfolio import size_portfolio
+from pipeline_v2.ratings import market_class, sport_rows, weight_table
 
 # Add script directory to Python path for relative imports (needed for Render cron jobs)
 SCRIPT_DIR = Path(__file__).parent
@@ -61,6 +116,23 @@ class EVOpportunity(Base):
     kelly_fraction = Column(Float, default=0.25)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Covering indexes for the API's live COUNTs (min EV, optionally per sport)
+    __table_args__ = (
+        Index("ix_ev_opportunities_sport_ev", "sport", "ev_percent"),
+        Index("ix_ev_opportunities_ev", "ev_percent"),
+    )
+
+
+class EVSummary(Base):
+    """Per-sport hit count, top EV and publish time, rewritten with ev_opportunities."""
+
+    __tablename__ = "ev_summary"
+
+    sport = Column(String(50), primary_key=True)
+    hits = Column(Integer, nullable=False)
+    top_ev = Column(Float, nullable=False)
+    last_updated = Column(DateTime, nullable=False)
+
 
 # Load environment - look for .env in parent directory
 env_path = Path(__file__).parent.parent / ".env"
@@ -104,6 +176,12 @@ def get_data_dir():
 DATA_DIR = get_data_dir()
 RAW_CSV = DATA_DIR / "raw_odds_pure.csv"
 EV_CSV = DATA_DIR / "ev_hits.csv"
+ARB_CSV = DATA_DIR / "arb_hits.csv"
+MIDDLE_CSV = DATA_DIR / "middle_hits.csv"
+LEADERBOARD_JSON = DATA_DIR / "ev_leaderboards.json"
+FAIR_HISTORY_CSV = DATA_DIR / "fair_history.csv"
+OPPORTUNITY_LOG_CSV = DATA_DIR / "opportunity_log.csv"
+CLV_CSV = DATA_DIR / "clv.csv"
 
 # Database connection (optional - only if DATABASE_URL is set)
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -114,6 +192,9 @@ if DATABASE_URL:
         engine = create_engine(DATABASE_URL, pool_pre_ping=True)
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
         Base.metadata.create_all(engine)
+        # create_all skips indexes on tables that already exist
+        for index in EVOpportunity.__table__.indexes:
+            index.create(engine, checkfirst=True)
     except Exception as e:
         print(f"⚠️  Database connection failed: {e}")
         print("   Continuing with CSV output only...")
@@ -125,6 +206,42 @@ EV_MIN_EDGE = 0.01  # 1%
 BANKROLL = 1000
 KELLY_FRACTION = 0.25
 
+# Portfolio sizing: stake all hits together (simultaneous Kelly per market bucket) instead of
+# one kelly_stake per hit; per-event and whole-portfolio exposure caps as bankroll fractions
+PORTFOLIO_SIZING = os.getenv("PORTFOLIO_SIZING", "true").lower() == "true"
+MAX_EVENT_EXPOSURE = float(os.getenv("MAX_EVENT_EXPOSURE", "0.10"))
+MAX_PORTFOLIO_EXPOSURE = float(os.getenv("MAX_PORTFOLIO_EXPOSURE", "1.0"))
+
+# Top-K leaderboards (overall, per sport, per market) published for the API
+LEADERBOARD_K = int(os.getenv("LEADERBOARD_K", "50"))
+# Default /api/ev/hits request, published pre-encoded per sport (see api_artifacts.py)
+API_HITS_PAGE = {"limit": 50, "offset": 0, "min_ev": 0.01}
+
+# Arbitrage: buckets whose best prices across books sum to < 1 implied probability.
+# ARB_MIN_PROFIT is the minimum guaranteed return (0.005 = 0.5%), ARB_TOTAL_STAKE the
+# amount split across the legs.
+ENABLE_ARBITRAGE = os.getenv("ENABLE_ARBITRAGE", "true").lower() == "true"
+ARB_MIN_PROFIT = float(os.getenv("ARB_MIN_PROFIT", "0.005"))
+ARB_TOTAL_STAKE = float(os.getenv("ARB_TOTAL_STAKE", "100"))
+
+# Middles: Over/home leg at one line plus Under/away leg at a higher line of the same
+# event (spreads on the home-margin axis). Windows MIDDLE_MIN_WIDTH..MIDDLE_MAX_WIDTH
+# points wide are reported when the pair's combined EV is at least MIDDLE_MIN_EV.
+ENABLE_MIDDLES = os.getenv("ENABLE_MIDDLES", "true").lower() == "true"
+MIDDLE_MARKETS = {"spreads", "totals"}
+MIDDLE_MIN_WIDTH = float(os.getenv("MIDDLE_MIN_WIDTH", "0.5"))
+MIDDLE_MAX_WIDTH = float(os.getenv("MIDDLE_MAX_WIDTH", "10"))
+MIDDLE_MIN_EV = float(os.getenv("MIDDLE_MIN_EV", "0.0"))
+MIDDLE_TOTAL_STAKE = float(os.getenv("MIDDLE_TOTAL_STAKE", "100"))
+
+# Closing-line value: every run appends sharp fairs to FAIR_HISTORY_CSV's day files and
+# hits to OPPORTUNITY_LOG_CSV, then rewrites CLV_CSV (each hit vs the last fair before
+# kick-off) for the hits of the last CLV_HISTORY_RETENTION_DAYS
+ENABLE_CLV = os.getenv("ENABLE_CLV", "true").lower() == "true"
+
+# Per-bucket stages run alongside EV (collected per sport, see new_scans)
+ENABLE_SCANS = ENABLE_ARBITRAGE or ENABLE_MIDDLES or ENABLE_CLV
+
 # Metadata columns present in raw CSV
 META_COLS = {
     "timestamp",
@@ -153,6 +270,51 @@ EXCLUDE_MARKETS = {"spreads_lay", "totals_lay"}
 # Minimum bookmakers required to establish fair odds
 MIN_BOOKMAKER_COVERAGE = 2
 
+# Most outcomes priced per market bucket (3-way h2h, outrights); wider buckets are skipped
+MAX_MARKET_OUTCOMES = min(int(os.getenv("MAX_MARKET_OUTCOMES", "64")), WIDTH_CLASSES[-1])
+
+# Spread markets are bucketed by the home team's handicap so both sides pair up
+SPREAD_MARKETS = {"spreads", "spreads_lay"}
+
+# Lines without sharp fairs get one interpolated from sharp-priced lines of the same
+# (event, market, side): both neighbours within INTERP_MAX_GAP points (0 disables),
+# or the nearest one carried if within INTERP_CARRY_GAP (0 disables carry).
+INTERP_MARKETS = {"spreads", "totals"}
+INTERP_MAX_GAP = float(os.getenv("INTERP_MAX_GAP", "1.5"))
+INTERP_CARRY_GAP = float(os.getenv("INTERP_CARRY_GAP", "0"))
+FAIR_SOURCES = {SOURCE_NONE: "sharp", 1: "interp", 2: "carry"}
+
+# Sharp quotes far from their outcome's median across sharp books are dropped before
+# weighting (see market_matrix.outlier_mask): OUTLIER_METHOD "mad" (default), "relative"
+# (anything beyond OUTLIER_TOLERANCE of the median) or "none". Quotes within
+# OUTLIER_TOLERANCE are always kept; outcomes need OUTLIER_MIN_BOOKS sharp quotes.
+OUTLIER_METHOD = os.getenv("OUTLIER_METHOD", "mad").lower()
+OUTLIER_TOLERANCE = float(os.getenv("OUTLIER_TOLERANCE", "0.03"))
+OUTLIER_MAD_K = float(os.getenv("OUTLIER_MAD_K", "3.5"))
+OUTLIER_MIN_BOOKS = int(os.getenv("OUTLIER_MIN_BOOKS", "3"))
+
+# Devig method per sport for sharp fair prices.
+# "none" = weighted average of the sharps' own (vigged) prices, the original behaviour.
+# Otherwise one of DEVIG_METHODS: multiplicative, additive, power, shin.
+# Override with DEVIG_METHOD (all sports) or DEVIG_METHOD_<SPORT_KEY>.
+SPORT_DEVIG_METHODS = {
+    "default": "none",
+}
+
+# Worker processes for per-sport EV calculation (0 = one per CPU core)
+EV_WORKERS = int(os.getenv("EV_WORKERS", "0"))
+
+# Streaming mode: read/evaluate/write in event-aligned chunks (bounded memory)
+EV_STREAM = os.getenv("EV_STREAM", "false").lower() == "true"
+STREAM_CHUNK_ROWS = int(os.getenv("EV_STREAM_CHUNK_ROWS", "5000"))
+
+# EV writer: rows per formatted CSV block / DB COPY, and the CSV write buffer
+WRITE_BATCH_ROWS = int(os.getenv("EV_WRITE_BATCH_ROWS", "10000"))
+CSV_BUFFER_BYTES = 1 << 20
+
+# Rows fetched per server-side cursor round trip when reading raw_odds_pure
+DB_FETCH_ROWS = int(os.getenv("DB_FETCH_ROWS", "10000"))
+
 
 def devig_two_way(over_odds: float, under_odds: float) -> Tuple[float, float]:
     """
@@ -192,6 +354,19 @@ def calculate_fair_odds_two_way(
     return fair_over, fair_under
 
 
+def get_devig_method(sport: str | None) -> str:
+    """Resolve the devig method for a sport (env override > profile > default)."""
+    method = None
+    if sport:
+        method = os.getenv(f"DEVIG_METHOD_{sport.upper()}") or SPORT_DEVIG_METHODS.get(sport)
+    method = method or os.getenv("DEVIG_METHOD") or SPORT_DEVIG_METHODS["default"]
+    method = method.strip().lower()
+    if method != "none" and method not in DEVIG_METHODS:
+        print(f"[!] Invalid devig method '{method}' for {sport}, using 'none'")
+        return "none"
+    return method
+
+
 def kelly_stake(bankroll: float, fair_odds: float, bet_odds: float, kelly_frac: float) -> float:
     """Calculate Kelly Criterion stake."""
     if bet_odds <= 1 or fair_odds <= 1:
@@ -209,9 +384,13 @@ def kelly_stake(bankroll: float, fair_odds: float, bet_odds: float, kelly_frac:
     return max(0, min(stake, bankroll * 0.1))  # Cap at 10% of bankroll
 
 
-def read_raw_odds() -> List[Dict]:
-    """Read raw odds from database (primary) or CSV (fallback)."""
-    db_url = os.getenv("DATABASE_URL")
+def read_raw_odds(use_db: bool = True) -> List[Dict]:
+    """Read raw odds from database (primary) or CSV (fallback).
+
+    main() reads the database through read_raw_odds_grouped instead and only
+    calls this for the CSV path (use_db=False).
+    """
+    db_url = os.getenv("DATABASE_URL") if use_db else None
 
     # Priority 1: Read from database
     if db_url:
@@ -228,7 +407,7 @@ def read_raw_odds() -> List[Dict]:
         except Exception as e:
             print(f"[!] Database read failed: {e}")
             print(f"[!] Falling back to CSV...")
-    else:
+    elif use_db:
         print(f"[!] DATABASE_URL not set, using CSV fallback")
 
     # Fallback: Read from CSV
@@ -259,6 +438,148 @@ def read_raw_odds() -> List[Dict]:
         return []
 
 
+def projected_raw_odds_select(db_engine) -> Tuple:
+    """SELECT of only the key and known bookmaker columns of raw_odds_pure.
+
+    Returns (stmt, meta_cols, book_cols).
+    """
+    table = Table("raw_odds_pure", MetaData(), autoload_with=db_engine)
+    table_cols = [c.name for c in table.columns]
+    meta_cols = [c for c in table_cols if c in META_COLS]
+    book_cols = [c for c in bookie_columns_from_header(table_cols) if c in table.c]
+    return select(*[table.c[c] for c in meta_cols + book_cols]), meta_cols, book_cols
+
+
+def read_raw_odds_grouped(
+    db_url: str, batch_rows: int = DB_FETCH_ROWS
+) -> Tuple[List[str], Dict[str, Dict[Tuple[str, str, str, str, str], List[Dict]]], Dict[str, Dict]]:
+    """Read raw_odds_pure straight into per-sport market buckets.
+
+    Only the key columns the calculator uses and the known bookmaker columns
+    are selected (no ORDER BY), rows come through a server-side cursor in
+    batches of ``batch_rows``, and each row is stored sparsely (priced books
+    only) directly in its bucket - no DataFrame or list-of-dicts copy.
+    Alternate-line rows go into a compact per-sport line store instead.
+
+    Returns (bookie_cols, {sport: {bucket_key: [rows]}}, {sport: alt_line_store}).
+    """
+    db_engine = create_engine(db_url)
+    stmt, meta_cols, book_cols = projected_raw_odds_select(db_engine)
+    bookie_cols = bookie_columns_from_header(book_cols)
+    alt_stores: Dict[str, Dict] = {}
+
+    grouped_by_sport: Dict[str, Dict[Tuple[str, str, str, str, str], List[Dict]]] = {}
+    total = 0
+    with db_engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=batch_rows).execute(
+            stmt
+        )
+        n_meta = len(meta_cols)
+        # Meta values repeat across rows (sport, event, teams, times): share one string each
+        shared: Dict[str, str] = {}
+        for batch in result.partitions(batch_rows):
+            for rec in batch:
+                row = {}
+                for col, val in zip(meta_cols, rec[:n_meta]):
+                    text = "" if val is None else str(val)
+                    row[col] = shared.setdefault(text, text)
+                for bk, val in zip(book_cols, rec[n_meta:]):
+                    price = parse_float(val)
+                    if price > 1:
+                        row[bk] = price
+                if row.get("market") in ALT_LINE_MARKETS:
+                    sport = row.get("sport") or "unknown"
+                    if sport not in alt_stores:
+                        alt_stores[sport] = new_line_store(bookie_cols)
+                    if add_line_row(alt_stores[sport], row):
+                        continue
+                key = bucket_key(row)
+                grouped_by_sport.setdefault(key[0] or "unknown", {}).setdefault(key, []).append(row)
+            total += len(batch)
+
+    print(f"[DB] Streamed {total} rows ({len(meta_cols) + len(book_cols)} columns) into buckets")
+    return bookie_cols, grouped_by_sport, alt_stores
+
+
+def iter_event_chunks(rows: Iterable[Dict], chunk_rows: int) -> Iterator[List[Dict]]:
+    """Yield lists of at least ``chunk_rows`` rows, cut only at event boundaries.
+
+    The extractor writes rows grouped by event, so every market bucket of an
+    event lands in the same chunk. If an event reappears after its chunk was
+    emitted its buckets would be split; that is counted and reported.
+    """
+    chunk: List[Dict] = []
+    chunk_events: set = set()
+    done_events: set = set()
+    current_event = None
+    split_events = 0
+
+    for row in rows:
+        event_id = row.get("event_id", "")
+        if event_id != current_event:
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                done_events |= chunk_events
+                chunk, chunk_events = [], set()
+            if event_id in done_events:
+                split_events += 1
+            chunk_events.add(event_id)
+            current_event = event_id
+        chunk.append(row)
+
+    if chunk:
+        yield chunk
+    if split_events:
+        print(f"[!] {split_events} event(s) were not contiguous in the input - buckets split")
+
+
+def stream_raw_odds(chunk_rows: int = STREAM_CHUNK_ROWS) -> Tuple[List[str], Iterator[List[Dict]]]:
+    """Stream raw odds in event-aligned chunks from database (primary) or CSV (fallback).
+
+    Returns (columns, chunks) so bookmaker columns are known before any row is read.
+    """
+    db_url = os.getenv("DATABASE_URL")
+
+    if db_url:
+        try:
+            print(f"[DB] Streaming raw odds from database table: raw_odds_pure")
+            db_engine = create_engine(db_url)
+            stmt, _, _ = projected_raw_odds_select(db_engine)
+            conn = db_engine.connect().execution_options(stream_results=True)
+            frames = pd.read_sql(stmt, conn, chunksize=chunk_rows)
+
+            def db_rows() -> Iterator[Dict]:
+                try:
+                    for frame in frames:
+                        frame = frame.astype(object).where(frame.notna(), None)
+                        yield from frame.to_dict("records")
+                finally:
+                    conn.close()
+
+            rows_iter = db_rows()
+            first = next(rows_iter, None)
+            if first is not None:
+                columns = list(first.keys())
+                return columns, iter_event_chunks(chain([first], rows_iter), chunk_rows)
+            print(f"[!] Database table raw_odds_pure is empty")
+        except Exception as e:
+            print(f"[!] Database read failed: {e}")
+            print(f"[!] Falling back to CSV...")
+
+    if not RAW_CSV.exists():
+        print(f"[!] {RAW_CSV} not found")
+        return [], iter(())
+
+    with open(RAW_CSV, "r", encoding="utf-8") as f:
+        columns = next(csv.reader(f), [])
+
+    def csv_chunks() -> Iterator[List[Dict]]:
+        with open(RAW_CSV, "r", encoding="utf-8") as f:
+            yield from iter_event_chunks(csv.DictReader(f), chunk_rows)
+
+    return columns, csv_chunks()
+
+
 def parse_float(val: str) -> float:
     try:
         return float(val)
@@ -285,73 +606,111 @@ def group_rows_wide(rows: List[Dict]) -> Dict[Tuple[str, str, str, str, str], Li
     """
     grouped: Dict[Tuple[str, str, str, str, str], List[Dict]] = {}
     for row in rows:
-        market = row.get("market", "")
-        selection = row.get("selection", "")
-        player_name = _player_key(selection) if market.startswith("player_") else ""
-
-        key = (
-            row.get("sport", ""),
-            row.get("event_id", ""),
-            market,
-            row.get("point", ""),
-            player_name,
-        )
-        grouped.setdefault(key, []).append(row)
+        grouped.setdefault(bucket_key(row), []).append(row)
     return grouped
 
 
-def extract_sides(rows: List[Dict]) -> Tuple[Dict, Dict]:
-    """Return two sides (A, B) from the grouped rows.
+def bucket_key(row: Dict) -> Tuple[str, str, str, str, str]:
+    """Bucket key (sport, event_id, market, point, player_name) for one raw row.
 
-    If multiple rows exist for same side (different timestamps),
-    prefer the one with most bookmaker coverage.
-    
-    For h2h markets: reject if 3+ unique selections (e.g., Home/Away/Draw).
-    Always requires exactly 2 sides for valid 2-way market.
+    Spread sides carry opposite-signed points (Home -3.5 / Away +3.5), so their key
+    point is the home handicap; the row keeps its own point.
     """
+    market = row.get("market", "")
+    selection = row.get("selection", "")
+    player_name = _player_key(selection) if market.startswith("player_") else ""
+    point = home_line(row) if market in SPREAD_MARKETS else row.get("point", "")
+
+    return (
+        row.get("sport", ""),
+        row.get("event_id", ""),
+        market,
+        point,
+        player_name,
+    )
+
+
+def home_line(row: Dict) -> str:
+    """Spread point from the home team's side (away rows are negated)."""
+    point = row.get("point", "")
+    if point in ("", None):
+        return ""
+    line = parse_float(point)
+    if row.get("selection", "") == row.get("away_team"):
+        line = -line
+    return str(line + 0.0)
+
+
+def side_label(selection: str) -> str:
+    """Side of a line market without its point: "Over" / "Under" for totals, else the selection."""
+    if _is_over(selection) and not selection.lower().endswith(" over"):
+        return "Over"
+    if _is_under(selection) and not selection.lower().endswith(" under"):
+        return "Under"
+    return selection
 
-    def is_over(sel: str) -> bool:
-        s = sel.lower()
-        return s.startswith("over") or s.endswith(" over")
 
-    def is_under(sel: str) -> bool:
-        s = sel.lower()
-        return s.startswith("under") or s.endswith(" under")
+def _is_over(sel: str) -> bool:
+    s = sel.lower()
+    return s.startswith("over") or s.endswith(" over")
 
-    def count_bookmaker_odds(row: Dict) -> int:
-        """Count non-zero bookmaker odds in this row."""
-        count = 0
-        for key, val in row.items():
-            if key not in META_COLS and val:
-                try:
-                    if float(val) > 1:
-                        count += 1
-                except:
-                    pass
-        return count
-
-    # CRITICAL: Always check for exactly 2 selections (reject 3-way markets with draw)
-    unique_selections = set(r.get("selection", "") for r in rows)
-    if len(unique_selections) != 2:
-        return None, None
 
-    # Get all over/under rows
-    over_rows = [r for r in rows if is_over(r.get("selection", ""))]
-    under_rows = [r for r in rows if is_under(r.get("selection", ""))]
+def _is_under(sel: str) -> bool:
+    s = sel.lower()
+    return s.startswith("under") or s.endswith(" under")
+
+
+def count_bookmaker_odds(row: Dict) -> int:
+    """Count non-zero bookmaker odds in this row."""
+    count = 0
+    for key, val in row.items():
+        if key not in META_COLS and val:
+            try:
+                if float(val) > 1:
+                    count += 1
+            except:
+                pass
+    return count
+
 
-    # Pick the row with most bookmaker coverage (handles duplicate timestamps)
-    over_row = max(over_rows, key=count_bookmaker_odds) if over_rows else None
-    under_row = max(under_rows, key=count_bookmaker_odds) if under_rows else None
+def extract_outcomes(rows: List[Dict], max_outcomes: int | None = None) -> List[Dict]:
+    """Return one row per outcome from the grouped rows, or [] if not a priceable market.
+
+    If multiple rows exist for the same selection (different timestamps),
+    prefer the one with most bookmaker coverage.
+
+    Needs 2..max_outcomes distinct selections (default MAX_MARKET_OUTCOMES), so
+    2-way totals/props, 3-way h2h (Home/Away/Draw) and outrights all qualify.
+    Outcomes are ordered Over, Under, then the rest by coverage (most first).
+    """
+    max_outcomes = max_outcomes or MAX_MARKET_OUTCOMES
+    by_selection: Dict[str, List[Dict]] = {}
+    for row in rows:
+        by_selection.setdefault(row.get("selection", ""), []).append(row)
+    if not 2 <= len(by_selection) <= max_outcomes:
+        return []
 
-    if over_row and under_row:
-        return over_row, under_row
+    picked = [
+        dupes[0] if len(dupes) == 1 else max(dupes, key=count_bookmaker_odds)
+        for dupes in by_selection.values()
+    ]
+    overs: List[Dict] = []
+    unders: List[Dict] = []
+    rest: List[Dict] = []
+    for row in picked:
+        sel = row.get("selection", "")
+        (overs if _is_over(sel) else unders if _is_under(sel) else rest).append(row)
+    if len(rest) > 1:
+        rest.sort(key=count_bookmaker_odds, reverse=True)
+    return overs + unders + rest
 
-    # Fallback: use first two rows (already validated to have exactly 2 selections)
-    if len(rows) >= 2:
-        sorted_rows = sorted(rows, key=count_bookmaker_odds, reverse=True)
-        return sorted_rows[0], sorted_rows[1]
 
-    return None, None
+def extract_sides(rows: List[Dict]) -> Tuple[Dict, Dict]:
+    """Return two sides (A, B) from the grouped rows, (None, None) unless exactly 2-way."""
+    outcomes = extract_outcomes(rows, max_outcomes=2)
+    if not outcomes:
+        return None, None
+    return outcomes[0], outcomes[1]
 
 
 ORDERED_BOOKIE_COLS = [
@@ -421,6 +780,13 @@ def get_bookie_columns(rows: List[Dict]) -> List[str]:
             if key not in META_COLS:
                 present.add(key)
 
+    return bookie_columns_from_header(present)
+
+
+def bookie_columns_from_header(columns: Iterable[str]) -> List[str]:
+    """Ordered bookmaker columns from a raw header (no rows needed)."""
+    present = {c for c in columns if c not in META_COLS}
+
     # Keep the explicit order above, dropping any missing columns, and always ensure Pinnacle first.
     ordered = [bk for bk in ORDERED_BOOKIE_COLS if bk in present]
     if "Pinnacle" not in ordered:
@@ -450,38 +816,56 @@ def fair_from_sharps(
     side_b: Dict,
     bookie_cols: List[str],
     sport_key: str | None = None,
+    devig_method: str = "none",
 ) -> Tuple[float, float, int]:
     """Compute fair odds for both sides using only sharp (3⭐/4⭐) books.
 
-    - Separate weight totals per side (over/under or A/B) using bookmaker rating * sport weight.
+    - Separate weight totals per side (over/under or A/B) using the compiled sport weights
+      (bookmaker rating * sport weight by default; see ratings.weight_table).
     - Requires at least two sharp books per side to compute a fair price.
     - Returns (fair_a, fair_b, sharp_count) where sharp_count is the count of sharp books present
       on the weaker-covered side (minimum of the two sides).
+    - With a devig_method other than "none", each sharp book quoting both sides is devigged
+      first and the weighted average is taken over its fair probabilities; sharp_count is
+      then the number of such books.
     """
 
-    def collect(side: Dict) -> List[Tuple[str, float, int]]:
-        bucket: List[Tuple[str, float, int]] = []
-        for bk in bookie_cols:
-            rating = BOOKMAKER_RATINGS.get(bk, 0)
-            if rating < 3:
+    sport_key = sport_key or side_a.get("sport") or side_b.get("sport") or ""
+    table = weight_table(bookie_cols)
+    cls = market_class(side_a.get("market") or side_b.get("market") or "")
+    sharp_weights = table["matrix"][sport_rows(table, [sport_key], [cls])[0]]
+
+    def collect(side: Dict) -> List[Tuple[str, float, float]]:
+        bucket: List[Tuple[str, float, float]] = []
+        for bk, weight in zip(table["sharp_books"], sharp_weights):
+            if weight <= 0:
                 continue
             price = parse_float(side.get(bk, "0"))
             if price <= 1:
                 continue
-            bucket.append((bk, price, rating))
+            bucket.append((bk, price, weight))
         return bucket
 
-    sport_key = sport_key or side_a.get("sport") or side_b.get("sport") or ""
-    sport_weight = get_sport_weight(str(sport_key)) if sport_key else 1.0
-
     sharp_a = collect(side_a)
     sharp_b = collect(side_b)
 
-    def fair(bucket: List[Tuple[str, float, int]]) -> float:
+    if devig_method != "none":
+        prices_b = {bk: price for bk, price, _ in sharp_b}
+        paired = [(price, prices_b[bk], weight) for bk, price, weight in sharp_a if bk in prices_b]
+        if len(paired) < 2:
+            return 0.0, 0.0, len(paired)
+        probs = devig(np.array([[a, b] for a, b, _ in paired]), devig_method)
+        book_weights = np.array([weight for _, _, weight in paired])
+        prob_a, prob_b = (probs * book_weights[:, np.newaxis]).sum(axis=0) / book_weights.sum()
+        if prob_a <= 0 or prob_b <= 0:
+            return 0.0, 0.0, len(paired)
+        return 1.0 / prob_a, 1.0 / prob_b, len(paired)
+
+    def fair(bucket: List[Tuple[str, float, float]]) -> float:
         if len(bucket) < 2:
             return 0.0
-        total_weight = sum(rating * sport_weight for _, _, rating in bucket)
-        weighted_sum = sum((1.0 / price) * (rating * sport_weight) for _, price, rating in bucket)
+        total_weight = sum(weight for _, _, weight in bucket)
+        weighted_sum = sum((1.0 / price) * weight for _, price, weight in bucket)
         if total_weight == 0 or weighted_sum <= 0:
             return 0.0
         return 1.0 / (weighted_sum / total_weight)
@@ -493,109 +877,214 @@ def fair_from_sharps(
     return fair_a, fair_b, sharp_count
 
 
-def process_two_way_markets(
-    grouped: Dict, bookie_cols: List[str], verbose: bool = False
+def reject_sharp_outliers(
+    sharp_odds: np.ndarray, sharp_books: List[str]
+) -> Tuple[np.ndarray, Dict[str, int]]:
+    """Sharp odds tensor with outlier quotes blanked, plus rejections per book."""
+    rejected = outlier_mask(
+        sharp_odds, OUTLIER_METHOD, OUTLIER_TOLERANCE, OUTLIER_MAD_K, OUTLIER_MIN_BOOKS
+    )
+    per_book = rejected.reshape(-1, len(sharp_books)).sum(axis=0)
+    counts = {bk: int(n) for bk, n in zip(sharp_books, per_book) if n}
+    return np.where(rejected, 0.0, sharp_odds), counts
+
+
+def merge_counts(total: Dict[str, int], counts: Dict[str, int]):
+    """Add per-book counters into a running total."""
+    for bk, n in counts.items():
+        total[bk] = total.get(bk, 0) + n
+
+
+def format_counts(counts: Dict[str, int]) -> str:
+    """Per-book counters, largest first ("Pinnacle 3, Betmgm 1")."""
+    return ", ".join(f"{bk} {n}" for bk, n in sorted(counts.items(), key=lambda kv: -kv[1]))
+
+
+def _weighted_sharp_odds(sharp_odds: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Blank quotes of sharps with no weight in a market's sport (profile book weights)."""
+    if (weights > 0).all():
+        return sharp_odds
+    return np.where(weights[:, np.newaxis, :] > 0, sharp_odds, 0.0)
+
+
+def _row_prices(row: Dict, bookie_cols: List[str]) -> List[float]:
+    return [parse_float(row.get(bk, "0")) for bk in bookie_cols]
+
+
+def price_market_batch(
+    markets: List[Tuple[Tuple, List[Dict]]],
+    width: int,
+    bookie_cols: List[str],
+    devig_method: str = "none",
+    sharp_weights: Dict[str, float] | None = None,
+) -> Dict[str, np.ndarray]:
+    """Odds tensor and fair prices for one width class of (bucket key, outcomes) markets.
+
+    Sharp books are weighted by the compiled per-sport vectors of ratings.weight_table,
+    or by ``sharp_weights`` (book -> weight, e.g. get_sharp_books_only(profile)) times
+    the sport scaler when given. Outlier sharp
+    quotes are dropped first (see reject_sharp_outliers). Returns a dict with prices
+    (markets, width, books), n_outcomes, fair (markets, width), sharp_count, priced
+    (bool per market), source (per-market FAIR_SOURCES code; width-2 spreads/totals
+    lines without sharps are interpolated) and outliers (rejected quotes per book).
+    """
+    table = weight_table(bookie_cols)
+    sharp_idx = table["sharp_idx"]
+    prices = np.zeros((len(markets), width, len(bookie_cols)))
+    n_outcomes = np.empty(len(markets), dtype=np.int64)
+    for m, (_, outcomes) in enumerate(markets):
+        n_outcomes[m] = len(outcomes)
+        for o, row in enumerate(outcomes):
+            prices[m, o] = _row_prices(row, bookie_cols)
+
+    classes = [market_class(key[2]) for key, _ in markets]
+    codes = sport_rows(table, [key[0] for key, _ in markets], classes)
+    if sharp_weights is None:
+        weights = table["matrix"][codes]
+    else:
+        overrides = np.array([sharp_weights.get(bk, 0.0) for bk in table["sharp_books"]])
+        weights = table["scale"][codes][:, np.newaxis] * overrides[np.newaxis, :]
+
+    sharp_odds, outliers = reject_sharp_outliers(
+        _weighted_sharp_odds(prices[:, :, sharp_idx], weights), table["sharp_books"]
+    )
+    fair, sharp_count = sharp_fair_prices(sharp_odds, weights, n_outcomes, devig_method)
+    priced = priced_markets(fair, sharp_count, n_outcomes)
+    source = np.full(len(markets), SOURCE_NONE, dtype=np.int8)
+    if width == 2 and INTERP_MAX_GAP > 0:
+        source = _interpolate_line_fairs(markets, fair, priced)
+    return {
+        "prices": prices,
+        "n_outcomes": n_outcomes,
+        "fair": fair,
+        "sharp_count": sharp_count,
+        "priced": priced,
+        "source": source,
+        "outliers": outliers,
+    }
+
+
+def process_markets(
+    grouped: Dict,
+    bookie_cols: List[str],
+    verbose: bool = False,
+    target_books: List[str] | None = None,
+    devig_method: str = "none",
+    fair_log: List[Tuple] | None = None,
 ) -> List[Dict]:
-    opportunities: List[Dict] = []
+    """Find EV opportunities in N-outcome market buckets (2-way, 3-way h2h, outrights).
+
+    Buckets are batched by padded width (see market_matrix) and each batch is priced
+    with array operations: one (markets, width, books) odds tensor, fair prices from
+    the sharp columns, EV for every target price at once. Only the hits are turned
+    back into dicts, in bucket / outcome / book order.
+
+    Spreads/totals lines without sharp fairs are then filled from neighbouring
+    sharp-priced lines (see _interpolate_line_fairs); such hits have fair_source
+    "interp" or "carry" instead of "sharp".
 
-    # Diagnostic counters
+    Pass a list as ``fair_log`` to collect every sharp-priced outcome as a
+    HISTORY_COLUMNS tuple (observed at the row's timestamp) for the CLV price history.
+    """
     stats = {
         "total_buckets": len(grouped),
         "missing_sides": 0,
         "no_sharps": 0,
+        "interpolated": 0,
+        "outliers": {},
         "checked_opportunities": 0,
         "below_threshold": 0,
         "found_ev": 0,
     }
 
     # Use target books (1⭐) present in this dataset
-    target_books = [b for b in bookie_cols if b in TARGET_BOOKS]
+    allowed_targets = set(target_books) if target_books is not None else set(TARGET_BOOKS)
+    target_books = [b for b in bookie_cols if b in allowed_targets]
+    target_idx = [i for i, bk in enumerate(bookie_cols) if bk in allowed_targets]
 
     if verbose:
         print(f"\n[EV DETAIL] Target AU bookmakers detected: {len(target_books)}")
         print(f"   {', '.join(target_books)}")
 
-    for (sport, event_id, market, point, player_name), rows in grouped.items():
+    # Bucket -> outcome rows, batched by padded width
+    batches: Dict[int, List[Tuple[Tuple, List[Dict]]]] = {}
+    for key, rows in grouped.items():
         # Skip exchange-only markets
-        if market in EXCLUDE_MARKETS:
+        if key[2] in EXCLUDE_MARKETS:
             stats["no_sharps"] += 1
             continue
-
-        side_a, side_b = extract_sides(rows)
-        if not side_a or not side_b:
+        outcomes = extract_outcomes(rows)
+        if not outcomes:
             stats["missing_sides"] += 1
             continue
-
-        fair_a, fair_b, sharp_count = fair_from_sharps(side_a, side_b, bookie_cols, sport)
-        if fair_a <= 1 or fair_b <= 1 or sharp_count == 0:
-            stats["no_sharps"] += 1
-            continue
-
-        sel_a = side_a.get("selection", "")
-        sel_b = side_b.get("selection", "")
-
-        # Combine away/home teams into Teams column
-        away = side_a.get("away_team", "")
-        home = side_a.get("home_team", "")
-        teams = f"{away} V {home}" if away and home else ""
-
-        base_meta = {
-            "timestamp": side_a.get("timestamp", ""),
-            "sport": sport,
-            "event_id": event_id,
-            "commence_time": side_a.get("commence_time", ""),
-            "teams": teams,
-            "market": market,
-            "line": point,
-            "sharp_book_count": sharp_count,
-        }
-
-        def maybe_player(selection: str) -> str:
-            # For props selection contains player + Over/Under
-            s = selection.replace("Over", "").replace("Under", "").replace("+", "").strip()
-            return s
-
-        # Evaluate opportunities for both sides, AU books only
-        for side, fair, sel in [(side_a, fair_a, sel_a), (side_b, fair_b, sel_b)]:
-            for book in target_books:
-                odds = parse_float(side.get(book, "0"))
-                if odds <= 1:
-                    continue
-
-                stats["checked_opportunities"] += 1
-                ev = (odds / fair) - 1.0
-                if ev < EV_MIN_EDGE:
-                    stats["below_threshold"] += 1
-                    continue
-
-                stats["found_ev"] += 1
-                prob = 1.0 / fair
-                stake = kelly_stake(BANKROLL, fair, odds, KELLY_FRACTION)
-
-                # Store raw numbers (will format for CSV later)
-                opp = {
-                    **base_meta,
-                    "player": maybe_player(sel),
-                    "selection": sel,
-                    "best_book": book,
-                    "odds_decimal": odds,
-                    "fair_odds": fair,
-                    "ev_percent": ev * 100,  # Store as percentage number
-                    "implied_prob": prob * 100,  # Store as percentage number
-                    "stake": stake,
-                }
-
-                for bk in bookie_cols:
-                    val = parse_float(side.get(bk, "0"))
-                    opp[bk] = val if val > 0 else 0
-
-                opportunities.append(opp)
+        batches.setdefault(width_class(len(outcomes)), []).append((key, outcomes))
+
+    hits: List[Tuple[Tuple, int, int, Dict]] = []
+
+    for width, markets in batches.items():
+        batch = price_market_batch(markets, width, bookie_cols, devig_method)
+        prices, fair, sharp_count = batch["prices"], batch["fair"], batch["sharp_count"]
+        priced, source = batch["priced"], batch["source"]
+        stats["interpolated"] += int((source != SOURCE_NONE).sum())
+        stats["no_sharps"] += int((~priced).sum())
+        merge_counts(stats["outliers"], batch["outliers"])
+
+        ev = ev_matrix(prices[:, :, target_idx], np.where(priced[:, np.newaxis], fair, 0.0))
+        checked = ~np.isnan(ev)
+        found = checked & (ev >= EV_MIN_EDGE)
+        stats["checked_opportunities"] += int(checked.sum())
+        stats["below_threshold"] += int((checked & ~found).sum())
+        stats["found_ev"] += int(found.sum())
+        if fair_log is not None:
+            sharp = (priced & (source == SOURCE_NONE))[:, np.newaxis]
+            for m, o in zip(*np.nonzero(sharp & outcome_mask(batch["n_outcomes"], width))):
+                key, outcomes = markets[m]
+                row = outcomes[o]
+                point = outcome_point(row.get("point", key[3]))
+                fair_log.append(
+                    (row.get("timestamp", ""), key[1], key[2], point, row["selection"], fair[m, o])
+                )
+
+        for m, o, t in zip(*np.nonzero(found)):
+            key, outcomes = markets[m]
+            hits.append(
+                (
+                    key,
+                    int(o),
+                    int(t),
+                    _build_opportunity(
+                        outcomes[0],
+                        key[2],
+                        # Spread buckets are keyed by the home line; report the selection's own point
+                        outcomes[o].get("point", key[3]),
+                        outcomes[o].get("selection", ""),
+                        target_books[t],
+                        float(prices[m, o, target_idx[t]]),
+                        float(fair[m, o]),
+                        float(ev[m, o, t]),
+                        int(sharp_count[m]),
+                        prices[m, o].tolist(),
+                        bookie_cols,
+                        FAIR_SOURCES[int(source[m])],
+                    ),
+                )
+            )
+
+    # Same order as evaluating bucket by bucket
+    bucket_order = {key: i for i, key in enumerate(grouped)}
+    hits.sort(key=lambda hit: (bucket_order[hit[0]], hit[1], hit[2]))
+    opportunities = [opp for _, _, _, opp in hits]
 
     if verbose:
         print(f"\n[EV DETAIL] EV Calculation Breakdown:")
         print(f"   Total market buckets: {stats['total_buckets']}")
-        print(f"   Missing both sides: {stats['missing_sides']}")
+        print(f"   Missing outcomes: {stats['missing_sides']}")
         print(f"   No sharp coverage: {stats['no_sharps']}")
+        print(f"   Interpolated line fairs: {stats['interpolated']}")
+        outliers = stats["outliers"]
+        print(f"   Outlier sharp quotes rejected: {sum(outliers.values())}")
+        if outliers:
+            print(f"      by book: {format_counts(outliers)}")
         print(
             f"   Valid buckets checked: {stats['total_buckets'] - stats['missing_sides'] - stats['no_sharps']}"
         )
@@ -606,6 +1095,379 @@ def process_two_way_markets(
     return opportunities
 
 
+def _build_opportunity(
+    meta: Dict,
+    market: str,
+    point,
+    sel: str,
+    book: str,
+    odds: float,
+    fair: float,
+    ev: float,
+    sharp_count: int,
+    row_prices: List[float],
+    bookie_cols: List[str],
+    fair_source: str = "sharp",
+) -> Dict:
+    """Opportunity dict for one hit; meta is any row (or event meta) of the market."""
+    # Combine away/home teams into Teams column
+    away = meta.get("away_team", "")
+    home = meta.get("home_team", "")
+    teams = f"{away} V {home}" if away and home else ""
+
+    # For props selection contains player + Over/Under
+    player = sel.replace("Over", "").replace("Under", "").replace("+", "").strip()
+
+    # Store raw numbers (will format for CSV later)
+    opp = {
+        "timestamp": meta.get("timestamp", ""),
+        "sport": meta.get("sport", ""),
+        "event_id": meta.get("event_id", ""),
+        "commence_time": meta.get("commence_time", ""),
+        "away_team": away,
+        "home_team": home,
+        "teams": teams,
+        "market": market,
+        "line": point,
+        "sharp_book_count": sharp_count,
+        "fair_source": fair_source,
+        "player": player,
+        "selection": sel,
+        "best_book": book,
+        "odds_decimal": odds,
+        "fair_odds": fair,
+        "ev_percent": ev * 100,  # Store as percentage number
+        "implied_prob": (1.0 / fair) * 100,  # Store as percentage number
+        "stake": kelly_stake(BANKROLL, fair, odds, KELLY_FRACTION),
+    }
+    for bk, val in zip(bookie_cols, row_prices):
+        opp[bk] = val if val > 0 else 0
+    return opp
+
+
+def split_alternate_lines(rows: List[Dict], bookie_cols: List[str]) -> Tuple[List[Dict], Dict]:
+    """Move alternate-line rows into a compact line store; returns (other_rows, store)."""
+    store = new_line_store(bookie_cols)
+    other = [row for row in rows if not add_line_row(store, row)]
+    return other, store
+
+
+def process_alternate_lines(
+    store: Dict,
+    verbose: bool = False,
+    target_books: List[str] | None = None,
+    devig_method: str = "none",
+    fair_log: List[Tuple] | None = None,
+) -> List[Dict]:
+    """Find EV opportunities in a compact alternate-line store (see alt_lines).
+
+    Every line of the store is paired and priced in one batch: sharp fairs, then
+    interpolation across each side's ladder of lines, then EV for all target prices.
+    Sharp-priced lines are collected into ``fair_log`` as in process_markets.
+    """
+    if not store_size(store):
+        return []
+    bookie_cols = store["bookie_cols"]
+    paired = pair_lines(store)
+    rows = paired["rows"]
+    if verbose:
+        print(f"\n[ALT LINES] {store_size(store)} rows -> {len(rows)} paired lines")
+    if not len(rows):
+        return []
+
+    allowed_targets = set(target_books) if target_books is not None else set(TARGET_BOOKS)
+    target_books = [b for b in bookie_cols if b in allowed_targets]
+    target_idx = [i for i, bk in enumerate(bookie_cols) if bk in allowed_targets]
+    table = weight_table(bookie_cols)
+
+    events = store["events"]
+    event_codes = np.frombuffer(store["event"], dtype=np.int32)[rows[:, 0]]
+    sports = [e["sport"] for e in events]
+    weights = table["matrix"][sport_rows(table, sports, repeat("alternate"))[event_codes]]
+    prices = paired["prices"]
+    n_outcomes = np.full(len(rows), 2)
+    sharp_odds, outliers = reject_sharp_outliers(
+        _weighted_sharp_odds(prices[:, :, table["sharp_idx"]], weights), table["sharp_books"]
+    )
+    fair, sharp_count = sharp_fair_prices(sharp_odds, weights, n_outcomes, devig_method)
+    priced = priced_markets(fair, sharp_count, n_outcomes)
+    source = np.full(len(rows), SOURCE_NONE, dtype=np.int8)
+    if INTERP_MAX_GAP > 0:
+        source = fill_unpriced_lines(
+            fair, priced, paired["side"], paired["line"], INTERP_MAX_GAP, INTERP_CARRY_GAP
+        )
+
+    ev = ev_matrix(prices[:, :, target_idx], np.where(priced[:, np.newaxis], fair, 0.0))
+    found = ~np.isnan(ev) & (ev >= EV_MIN_EDGE)
+    market_codes = np.frombuffer(store["market"], dtype=np.int8)
+    selection_codes = np.frombuffer(store["selection"], dtype=np.int32)
+
+    if fair_log is not None:
+        for m in np.nonzero(priced & (source == SOURCE_NONE))[0]:
+            event = events[event_codes[m]]
+            for o in range(2):
+                row = rows[m, o]
+                fair_log.append(
+                    (
+                        event["timestamp"],
+                        event["event_id"],
+                        ALT_LINE_MARKETS[market_codes[row]],
+                        outcome_point(paired["line"][m, o]),
+                        store["selections"][selection_codes[row]],
+                        fair[m, o],
+                    )
+                )
+
+    opportunities: List[Dict] = []
+    for m, o, t in zip(*np.nonzero(found)):
+        row = rows[m, o]
+        opportunities.append(
+            _build_opportunity(
+                events[event_codes[m]],
+                ALT_LINE_MARKETS[market_codes[row]],
+                str(paired["line"][m, o]),
+                store["selections"][selection_codes[row]],
+                target_books[t],
+                float(prices[m, o, target_idx[t]]),
+                float(fair[m, o]),
+                float(ev[m, o, t]),
+                int(sharp_count[m]),
+                prices[m, o].tolist(),
+                bookie_cols,
+                FAIR_SOURCES[int(source[m])],
+            )
+        )
+
+    if verbose:
+        interpolated = int((source != SOURCE_NONE).sum())
+        print(f"   Priced lines: {int(priced.sum())} ({interpolated} interpolated)")
+        print(f"   Outlier sharp quotes rejected: {sum(outliers.values())}")
+        if outliers:
+            print(f"      by book: {format_counts(outliers)}")
+        print(f"   Found EV opportunities: {len(opportunities)}")
+    return opportunities
+
+
+def _interpolate_line_fairs(
+    markets: List[Tuple[Tuple, List[Dict]]], fair: np.ndarray, priced: np.ndarray
+) -> np.ndarray:
+    """Fill fairs of unpriced 2-way spreads/totals from the sorted line index (in place).
+
+    Sharp-priced outcomes are the anchors, indexed per (event, market, side); every
+    unpriced line of the batch is looked up in one vectorized pass (line_index).
+    Returns the per-market source code (SOURCE_NONE = sharp-priced or left unpriced).
+    """
+    side_codes: Dict[Tuple, int] = {}
+    side_ids = np.full(fair.shape, -1, dtype=np.int64)
+    lines = np.zeros(fair.shape)
+    for m, ((sport, event_id, market, _, player_name), outcomes) in enumerate(markets):
+        if market not in INTERP_MARKETS:
+            continue
+        for o, row in enumerate(outcomes):
+            point = row.get("point", "")
+            if point in ("", None):
+                continue
+            side = (sport, event_id, market, player_name, side_label(row.get("selection", "")))
+            side_ids[m, o] = side_codes.setdefault(side, len(side_codes))
+            lines[m, o] = parse_float(point)
+    return fill_unpriced_lines(fair, priced, side_ids, lines, INTERP_MAX_GAP, INTERP_CARRY_GAP)
+
+
+# Original name from when only two-outcome markets were priced
+process_two_way_markets = process_markets
+
+
+def is_exhaustive_market(sport: str, market: str, outcomes: List[Dict]) -> bool:
+    """True if the outcomes cover every result, so backing all of them is a sure bet.
+
+    Outrights are skipped (a quoted field is rarely the full field) and soccer h2h
+    needs its Draw; everything else must be a plain 2-way pair.
+    """
+    if market in EXCLUDE_MARKETS or market == "outrights":
+        return False
+    if market == "h2h" and len(outcomes) == 3:
+        return any(row.get("selection") == "Draw" for row in outcomes)
+    if market == "h2h" and "soccer" in (sport or "").lower():
+        return False
+    return len(outcomes) == 2
+
+
+def build_best_price_index(
+    grouped: Dict[Tuple, List[Dict]], bookie_cols: List[str]
+) -> Tuple[Dict, Dict]:
+    """Best price per side of every exhaustive bucket, in one pass over the quotes.
+
+    Returns (index, outcomes): index is the arbitrage.update_quote structure keyed by
+    the group_rows_wide bucket key; outcomes maps the same key to its outcome rows.
+    """
+    index: Dict = {}
+    bucket_outcomes: Dict = {}
+    for key, rows in grouped.items():
+        outcomes = extract_outcomes(rows)
+        if not outcomes or not is_exhaustive_market(key[0], key[2], outcomes):
+            continue
+        bucket_outcomes[key] = outcomes
+        for row in outcomes:
+            selection = row.get("selection", "")
+            for bk in bookie_cols:
+                price = parse_float(row.get(bk, ""))
+                if price > 1:
+                    update_quote(index, key, selection, bk, price)
+    return index, bucket_outcomes
+
+
+def find_arbitrage(
+    grouped: Dict[Tuple, List[Dict]],
+    bookie_cols: List[str],
+    min_profit: float = ARB_MIN_PROFIT,
+    total_stake: float = ARB_TOTAL_STAKE,
+) -> List[Dict]:
+    """Cross-book arbs in the grouped buckets, most profitable first."""
+    index, bucket_outcomes = build_best_price_index(grouped, bookie_cols)
+    arbs: List[Dict] = []
+    for key, arb in scan_arbitrage(index, total_stake, min_profit):
+        outcomes = bucket_outcomes[key]
+        points = {row.get("selection", ""): row.get("point", "") for row in outcomes}
+        meta = outcomes[0]
+        for leg in arb["legs"]:
+            leg["point"] = points.get(leg["selection"], "")
+        arbs.append(
+            {
+                "timestamp": meta.get("timestamp", ""),
+                "sport": meta.get("sport", ""),
+                "event_id": meta.get("event_id", ""),
+                "commence_time": meta.get("commence_time", ""),
+                "away_team": meta.get("away_team", ""),
+                "home_team": meta.get("home_team", ""),
+                "market": key[2],
+                "line": key[3],
+                "player": key[4],
+                **arb,
+            }
+        )
+    arbs.sort(key=lambda a: a["profit_percent"], reverse=True)
+    return arbs
+
+
+def _middle_leg(market: str, row: Dict) -> Tuple[int, float] | None:
+    """(kind, threshold) of one outcome on its ladder: 0 = Over / home, 1 = Under / away."""
+    point = row.get("point", "")
+    if point in ("", None):
+        return None
+    line = parse_float(point)
+    selection = row.get("selection", "")
+    if market in SPREAD_MARKETS:
+        if selection == row.get("home_team"):
+            return 0, -line
+        if selection == row.get("away_team"):
+            return 1, line
+        return None
+    if _is_over(selection):
+        return 0, line
+    if _is_under(selection):
+        return 1, line
+    return None
+
+
+def find_middles(
+    grouped: Dict[Tuple, List[Dict]],
+    bookie_cols: List[str],
+    target_books: List[str] | None = None,
+    devig_method: str = "none",
+    min_ev: float = MIDDLE_MIN_EV,
+    total_stake: float = MIDDLE_TOTAL_STAKE,
+) -> List[Dict]:
+    """Middles between lines of the same event's spreads/totals, best combined EV first.
+
+    Each outcome's leg is its best target-book price; fair probabilities come from
+    the same sharp / interpolated fairs as process_markets (see middles.py).
+    """
+    markets = []
+    for key, rows in grouped.items():
+        if key[2] in MIDDLE_MARKETS:
+            outcomes = extract_outcomes(rows)
+            if len(outcomes) == 2:
+                markets.append((key, outcomes))
+    if not markets:
+        return []
+
+    allowed_targets = set(target_books) if target_books is not None else set(TARGET_BOOKS)
+    target_idx = [i for i, bk in enumerate(bookie_cols) if bk in allowed_targets]
+    if not target_idx:
+        return []
+    batch = price_market_batch(markets, 2, bookie_cols, devig_method)
+    targets = batch["prices"][:, :, target_idx]
+    best = targets.argmax(axis=2)
+    best_odds = np.take_along_axis(targets, best[:, :, np.newaxis], axis=2)[:, :, 0]
+    fair = np.where(batch["priced"][:, np.newaxis], batch["fair"], 0.0)
+
+    # One leg per priced outcome with a target price
+    ladder_codes: Dict[Tuple, int] = {}
+    legs = []
+    for m, (key, outcomes) in enumerate(markets):
+        for o, row in enumerate(outcomes):
+            leg = _middle_leg(key[2], row)
+            if leg is None or best_odds[m, o] <= 1 or fair[m, o] <= 1:
+                continue
+            ladder = ladder_codes.setdefault((key[0], key[1], key[2], key[4]), len(ladder_codes))
+            legs.append((ladder, leg[0], leg[1], m, o))
+    if not legs:
+        return []
+
+    ladder, kind, threshold, leg_m, leg_o = (np.array(col) for col in zip(*legs))
+    low, high = middle_windows(ladder, kind, threshold, MIDDLE_MIN_WIDTH, MIDDLE_MAX_WIDTH)
+    odds = best_odds[leg_m, leg_o]
+    prob = 1.0 / fair[leg_m, leg_o]
+    value = middle_value(odds[low], odds[high], prob[low], prob[high])
+
+    # Per-leg details once; each middle only adds its stakes
+    leg_info = []
+    for leg, (m, o) in enumerate(zip(leg_m.tolist(), leg_o.tolist())):
+        row = markets[m][1][o]
+        leg_info.append(
+            {
+                "selection": row.get("selection", ""),
+                "point": row.get("point", ""),
+                "book": bookie_cols[target_idx[best[m, o]]],
+                "odds": float(odds[leg]),
+                "fair_odds": float(fair[m, o]),
+            }
+        )
+
+    hits = np.flatnonzero(value["ev"] >= min_ev)
+    hits = hits[np.argsort(-value["ev"][hits], kind="stable")]
+    columns = {name: values[hits].tolist() for name, values in value.items()}
+    middles: List[Dict] = []
+    for n, (lo, hi) in enumerate(zip(low[hits].tolist(), high[hits].tolist())):
+        key, outcomes = markets[leg_m[lo]]
+        meta = outcomes[0]
+        middles.append(
+            {
+                "timestamp": meta.get("timestamp", ""),
+                "sport": meta.get("sport", ""),
+                "event_id": meta.get("event_id", ""),
+                "commence_time": meta.get("commence_time", ""),
+                "away_team": meta.get("away_team", ""),
+                "home_team": meta.get("home_team", ""),
+                "market": key[2],
+                "player": key[4],
+                "window_low": float(threshold[lo]),
+                "window_high": float(threshold[hi]),
+                "window_width": float(threshold[hi] - threshold[lo]),
+                "middle_prob": columns["middle_prob"][n],
+                "ev_percent": columns["ev"][n] * 100,
+                "miss_percent": columns["miss_return"][n] * 100,
+                "hit_percent": columns["hit_return"][n] * 100,
+                "total_stake": total_stake,
+                "legs": [
+                    {**leg_info[lo], "stake": columns["stake_low"][n] * total_stake},
+                    {**leg_info[hi], "stake": columns["stake_high"][n] * total_stake},
+                ],
+            }
+        )
+    return middles
+
+
 def build_headers(bookie_cols: List[str]) -> List[str]:
     # Ensure Pinnacle column is present even if empty
     cols = list(bookie_cols)
@@ -692,8 +1554,239 @@ def format_commence_time(date_str: str) -> str:
         return date_str
 
 
-def write_opportunities(opportunities: List[Dict], headers: List[str]):
-    """Write EV opportunities to CSV and database.
+# Display header -> opportunity field (bookmaker columns are read under their own name)
+FIELD_MAP = {
+    "Start Time": "commence_time",
+    "Sport": "sport",
+    "Teams": "teams",
+    "Market": "market",
+    "Line": "line",
+    "Selection": "selection",
+    "Sharps": "sharp_book_count",
+    "Book": "best_book",
+    "Odds": "odds_decimal",
+    "Fair": "fair_odds",
+    "EV%": "ev_percent",
+    "Prob": "implied_prob",
+    "Stake": "stake",
+}
+
+
+def format_cell(col: str, val):
+    """Format one value for a display-header CSV column."""
+    if col == "Start Time" and val:
+        return format_commence_time(val)
+    if col == "Sport" and val:
+        return format_sport_abbrev(val)
+    if col == "Market" and val:
+        return format_market_name(val)
+    if col in ("EV%", "Prob") and isinstance(val, (int, float)):
+        return f"{val:.2f}%"
+    if col == "Stake" and isinstance(val, (int, float)):
+        return f"${int(val)}"
+    if col in ("Odds", "Fair") and isinstance(val, (int, float)):
+        return f"{val:.4f}"
+    if isinstance(val, float):
+        return f"{val:.4f}" if val > 0 else ""
+    return val if val else ""
+
+
+def format_row(opp: Dict, headers: List[str]) -> Dict:
+    """Format one opportunity into a display-header CSV row."""
+    return {col: format_cell(col, opp.get(FIELD_MAP.get(col, col), "")) for col in headers}
+
+
+def _price_texts(opportunities: List[Dict], books: List[str]) -> np.ndarray:
+    """(opportunities, books) CSV text of bookmaker prices; each distinct price formatted once."""
+    getter = itemgetter(*books)
+    try:
+        values = np.array([getter(opp) for opp in opportunities], dtype=float)
+    except KeyError:
+        values = np.array(
+            [[opp.get(bk, 0.0) for bk in books] for opp in opportunities], dtype=float
+        )
+    values = np.nan_to_num(values.reshape(len(opportunities), len(books)))
+    uniques, inverse = np.unique(values, return_inverse=True)
+    texts = np.array([f"{v:.4f}" if v > 0 else "" for v in uniques.tolist()], dtype=object)
+    return texts[inverse.reshape(values.shape)]
+
+
+def _cached_column(col: str) -> Callable[[List], List[str]]:
+    # Few distinct values per run (kick-off times, sports, markets)
+    def column(values: List) -> List[str]:
+        texts: Dict = {}
+        out = []
+        for val in values:
+            text = texts.get(val)
+            if text is None:
+                text = texts[val] = format_cell(col, val)
+            out.append(text)
+        return out
+
+    return column
+
+
+NUMBER_FORMATS = {"EV%": "{:.2f}%", "Prob": "{:.2f}%", "Odds": "{:.4f}", "Fair": "{:.4f}"}
+
+
+def _number_column(col: str) -> Callable[[List], List[str]]:
+    number = NUMBER_FORMATS[col].format
+
+    def column(values: List) -> List[str]:
+        return [number(v) if isinstance(v, (int, float)) else format_cell(col, v) for v in values]
+
+    return column
+
+
+def _field_column(col: str) -> Callable[[List], List[str]]:
+    def column(values: List) -> List[str]:
+        return [format_cell(col, v) for v in values]
+
+    return column
+
+
+def compile_row_plan(headers: List[str]) -> Dict:
+    """Column formatters per header, resolved once per write.
+
+    Display headers get (position, opportunity field, column formatter); every other
+    header is a bookmaker price column, formatted as one matrix. The text is the
+    same as format_row's.
+    """
+    fields = []
+    for pos, col in enumerate(headers):
+        if col in ("Start Time", "Sport", "Market"):
+            fmt = _cached_column(col)
+        elif col in NUMBER_FORMATS:
+            fmt = _number_column(col)
+        elif col in FIELD_MAP:
+            fmt = _field_column(col)
+        else:
+            continue
+        fields.append((pos, FIELD_MAP[col], fmt))
+    book_pos = [pos for pos, col in enumerate(headers) if col not in FIELD_MAP]
+    return {
+        "width": len(headers),
+        "fields": fields,
+        "book_pos": book_pos,
+        "books": [headers[pos] for pos in book_pos],
+    }
+
+
+def format_block(opportunities: List[Dict], plan: Dict) -> List[List]:
+    """CSV rows for a block of opportunities, formatted a column at a time."""
+    table = np.empty((len(opportunities), plan["width"]), dtype=object)
+    for pos, field, fmt in plan["fields"]:
+        table[:, pos] = fmt([opp.get(field, "") for opp in opportunities])
+    if plan["books"]:
+        table[:, plan["book_pos"]] = _price_texts(opportunities, plan["books"])
+    return table.tolist()
+
+
+def ev_record_values(opp: Dict, now: datetime) -> Dict:
+    """ev_opportunities column values for one opportunity."""
+    commence_ts = None
+    if opp.get("commence_time"):
+        try:
+            commence_ts = datetime.fromisoformat(opp["commence_time"].replace("Z", "+00:00"))
+        except Exception:
+            commence_ts = None
+
+    return {
+        "detected_at": now,
+        "sport": opp.get("sport"),
+        "event_id": opp.get("event_id"),
+        "away_team": opp.get("away_team"),
+        "home_team": opp.get("home_team"),
+        "commence_time": commence_ts,
+        "market": opp.get("market"),
+        "player": opp.get("player") if opp.get("player") else None,
+        "point": float(opp["line"]) if opp.get("line") else None,
+        "selection": opp.get("selection"),
+        "best_book": opp.get("best_book"),
+        "best_odds": opp.get("odds_decimal"),
+        "fair_odds": opp.get("fair_odds"),
+        "ev_percent": opp.get("ev_percent"),
+        "implied_prob": opp.get("implied_prob"),
+        "sharp_book_count": int(opp.get("sharp_book_count", 0)),
+        "stake": opp.get("stake"),
+        "kelly_fraction": KELLY_FRACTION,
+        "created_at": now,
+    }
+
+
+def build_ev_record(opp: Dict) -> EVOpportunity:
+    """Build an EVOpportunity ORM record from an opportunity dict."""
+    return EVOpportunity(**ev_record_values(opp, datetime.utcnow()))
+
+
+EV_RECORD_COLUMNS = list(ev_record_values({}, datetime.utcnow()))
+
+
+def insert_ev_records(conn, opportunities: List[Dict]):
+    """Insert a block of opportunities: COPY on PostgreSQL, one executemany elsewhere."""
+    now = datetime.utcnow()
+    records = [ev_record_values(opp, now) for opp in opportunities]
+    if conn.dialect.name != "postgresql":
+        conn.execute(EVOpportunity.__table__.insert(), records)
+        return
+
+    # COPY ... CSV loads empty fields (None) as NULL
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow(
+            [val.isoformat() if isinstance(val, datetime) else val for val in record.values()]
+        )
+    buffer.seek(0)
+    columns = ", ".join(EV_RECORD_COLUMNS)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {EVOpportunity.__tablename__} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+    finally:
+        cursor.close()
+
+
+def tally_summary(summary: Dict[str, List], opportunities: List[Dict]):
+    """Add a block of opportunities to per-sport [hits, top EV] totals."""
+    for opp in opportunities:
+        sport, ev = opp.get("sport") or "", opp.get("ev_percent", 0.0)
+        totals = summary.setdefault(sport, [0, ev])
+        totals[0] += 1
+        if ev > totals[1]:
+            totals[1] = ev
+
+
+def write_ev_summary(conn, summary: Dict[str, List], now: datetime):
+    """Replace the ev_summary rows (call inside the ev_opportunities transaction)."""
+    conn.execute(EVSummary.__table__.delete())
+    if summary:
+        conn.execute(
+            EVSummary.__table__.insert(),
+            [
+                {"sport": sport, "hits": hits, "top_ev": top_ev, "last_updated": now}
+                for sport, (hits, top_ev) in summary.items()
+            ],
+        )
+
+
+def _open_ev_csv():
+    """EV_CSV opened for buffered writing, or a timestamped fallback if it is locked."""
+    path = EV_CSV
+    try:
+        f = open(path, "w", newline="", encoding="utf-8", buffering=CSV_BUFFER_BYTES)
+    except Exception as e:
+        print(f"[!] Error opening CSV (likely locked): {e}")
+        path = EV_CSV.with_name(f"ev_hits_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv")
+        f = open(path, "w", newline="", encoding="utf-8", buffering=CSV_BUFFER_BYTES)
+    return f, path
+
+
+def write_opportunities(
+    opportunities: List[Dict], headers: List[str], generation: datetime | None = None
+):
+    """Write EV opportunities to CSV and database (see write_opportunities_stream).
 
     If the primary CSV is locked (e.g., opened in Excel), write to a fallback
     filename with a timestamp suffix so users can keep their file open.
@@ -701,121 +1794,596 @@ def write_opportunities(opportunities: List[Dict], headers: List[str]):
     if not opportunities:
         print("[!] No opportunities to write")
         return
+    write_opportunities_stream(iter(opportunities), headers, generation)
 
-    def format_row(opp: Dict) -> Dict:
-        # Map internal field names to display headers
-        field_map = {
-            "Start Time": "commence_time",
-            "Sport": "sport",
-            "Teams": "teams",
-            "Market": "market",
-            "Line": "line",
-            "Selection": "selection",
-            "Sharps": "sharp_book_count",
-            "Book": "best_book",
-            "Odds": "odds_decimal",
-            "Fair": "fair_odds",
-            "EV%": "ev_percent",
-            "Prob": "implied_prob",
-            "Stake": "stake",
-        }
-        
-        row: Dict[str, str] = {}
-        for col in headers:
-            # Get the internal field name, or use col as-is for bookmaker columns
-            internal_col = field_map.get(col, col)
-            val = opp.get(internal_col, "")
-            
-            if col == "Start Time" and val:
-                row[col] = format_commence_time(val)
-            elif col == "Sport" and val:
-                row[col] = format_sport_abbrev(val)
-            elif col == "Market" and val:
-                row[col] = format_market_name(val)
-            elif col == "EV%" and isinstance(val, (int, float)):
-                row[col] = f"{val:.2f}%"
-            elif col == "Prob" and isinstance(val, (int, float)):
-                row[col] = f"{val:.2f}%"
-            elif col == "Stake" and isinstance(val, (int, float)):
-                row[col] = f"${int(val)}"
-            elif col in ["Odds", "Fair"] and isinstance(val, (int, float)):
-                row[col] = f"{val:.4f}"
-            elif isinstance(val, float):
-                row[col] = f"{val:.4f}" if val > 0 else ""
-            else:
-                row[col] = val if val else ""
-        return row
 
-    def write_csv(path: Path):
-        with open(path, "w", newline="", encoding="utf-8") as f:
+def write_opportunities_stream(
+    opportunities: Iterable[Dict], headers: List[str], generation: datetime | None = None
+) -> int:
+    """Write EV opportunities to CSV and database in blocks as they are produced.
+
+    Each block of WRITE_BATCH_ROWS is formatted a column at a time with a plan
+    compiled once from the headers, written with one writerows call, and sent to the
+    DB as one COPY (PostgreSQL) or executemany insert. Only one block is held at a
+    time. The DB delete and inserts share one transaction, so readers never see a
+    half-written table; the ev_summary rows are replaced in the same transaction,
+    stamped ``generation`` (the run's publish time, default now).
+    Returns the number of opportunities written.
+    """
+    f, csv_path = _open_ev_csv()
+    plan = compile_row_plan(headers)
+
+    conn = engine.connect() if SessionLocal and engine else None
+    db_ok = conn is not None
+    if db_ok:
+        try:
+            transaction = conn.begin()
+            conn.execute(EVOpportunity.__table__.delete())
+        except Exception as e:
+            print(f"[!] Database write error (non-fatal): {e}")
+            db_ok = False
+
+    written = 0
+    summary: Dict[str, List] = {}
+    try:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        iterator = iter(opportunities)
+        while True:
+            block = list(islice(iterator, WRITE_BATCH_ROWS))
+            if not block:
+                break
+            writer.writerows(format_block(block, plan))
+            written += len(block)
+            tally_summary(summary, block)
+
+            if db_ok:
+                try:
+                    insert_ev_records(conn, block)
+                except Exception as e:
+                    print(f"[!] Database write error (non-fatal): {e}")
+                    transaction.rollback()
+                    db_ok = False
+
+        if db_ok:
+            try:
+                write_ev_summary(conn, summary, generation or datetime.utcnow())
+                transaction.commit()
+                print(f"[OK] ✅ Wrote {written} opportunities to PostgreSQL database")
+            except Exception as e:
+                print(f"[!] Database write error (non-fatal): {e}")
+                transaction.rollback()
+        elif conn is None:
+            print("[OK] Database not connected - CSV output saved")
+    finally:
+        f.close()
+        if conn is not None:
+            conn.close()
+
+    print(f"✅ Wrote {written} EV rows to {csv_path}")
+    return written
+
+
+ARB_HEADERS = ["Start Time", "Sport", "Teams", "Market", "Line", "Profit %", "Payout"] + [
+    f"Leg {n}" for n in (1, 2, 3)
+]
+
+
+def format_leg(leg: Dict) -> str:
+    """One leg as 'Selection [point] @ Book odds ($stake)' (totals carry their own point)."""
+    label = leg["selection"]
+    if leg.get("point") not in ("", None) and not _is_over(label) and not _is_under(label):
+        label = f"{label} {parse_float(leg['point']):+g}"
+    return f"{label} @ {leg['book']} {leg['odds']:.2f} (${leg['stake']:.2f})"
+
+
+def format_arb_row(arb: Dict) -> Dict:
+    """One arb_hits.csv row, one column per leg."""
+    row = {
+        "Start Time": format_commence_time(arb.get("commence_time", "")),
+        "Sport": format_sport_abbrev(arb.get("sport", "")),
+        "Teams": f"{arb.get('away_team', '')} @ {arb.get('home_team', '')}",
+        "Market": format_market_name(arb.get("market", "")),
+        "Line": arb.get("line", ""),
+        "Profit %": f"{arb['profit_percent']:.2f}%",
+        "Payout": f"${arb['payout']:.2f}",
+    }
+    for n, leg in enumerate(arb["legs"][:3], 1):
+        row[f"Leg {n}"] = format_leg(leg)
+    return row
+
+
+MIDDLE_HEADERS = [
+    "Start Time",
+    "Sport",
+    "Teams",
+    "Market",
+    "Window",
+    "Width",
+    "Middle %",
+    "EV %",
+    "Miss %",
+    "Hit %",
+    "Leg 1",
+    "Leg 2",
+]
+
+
+def format_middle_row(middle: Dict) -> Dict:
+    """One middle_hits.csv row; spread windows are on the home team's winning margin."""
+    row = {
+        "Start Time": format_commence_time(middle.get("commence_time", "")),
+        "Sport": format_sport_abbrev(middle.get("sport", "")),
+        "Teams": f"{middle.get('away_team', '')} @ {middle.get('home_team', '')}",
+        "Market": format_market_name(middle.get("market", "")),
+        "Window": f"{middle['window_low']:g} to {middle['window_high']:g}",
+        "Width": f"{middle['window_width']:g}",
+        "Middle %": f"{middle['middle_prob'] * 100:.1f}%",
+        "EV %": f"{middle['ev_percent']:.2f}%",
+        "Miss %": f"{middle['miss_percent']:.2f}%",
+        "Hit %": f"{middle['hit_percent']:.2f}%",
+    }
+    for n, leg in enumerate(middle["legs"], 1):
+        row[f"Leg {n}"] = format_leg(leg)
+    return row
+
+
+def _write_scan_csv(path: Path, headers: List[str], rows: List[Dict], label: str):
+    """Write formatted scan rows to path (timestamped fallback if the file is locked)."""
+
+    def write_csv(target: Path):
+        with open(target, "w", newline="", encoding="utf-8") as f:
             writer = csv.DictWriter(f, fieldnames=headers)
             writer.writeheader()
-            for opp in opportunities:
-                writer.writerow(format_row(opp))
+            writer.writerows(rows)
 
-    # Try primary CSV; if locked, write a fallback file
     try:
-        write_csv(EV_CSV)
-        print(f"✅ Wrote {len(opportunities)} EV rows to {EV_CSV}")
+        write_csv(path)
+        print(f"✅ Wrote {len(rows)} {label} rows to {path}")
     except Exception as e:
-        print(f"[!] Error writing CSV (likely locked): {e}")
-        fallback = EV_CSV.with_name(f"ev_hits_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv")
+        print(f"[!] Error writing {label} CSV (likely locked): {e}")
+        fallback = path.with_name(
+            f"{path.stem}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}{path.suffix}"
+        )
         try:
             write_csv(fallback)
-            print(f"✅ Wrote fallback CSV to {fallback}")
+            print(f"✅ Wrote fallback {label} CSV to {fallback}")
         except Exception as e2:
-            print(f"[!] Fallback CSV write failed: {e2}")
+            print(f"[!] Fallback {label} CSV write failed: {e2}")
 
-    # Write to database (optional - only if connected)
-    if SessionLocal and engine:
-        try:
-            db = SessionLocal()
-            try:
-                # Clear old records - we keep only latest opportunities
-                db.query(EVOpportunity).delete()
-
-                # Insert new records - data is already in correct format
-                for opp in opportunities:
-                    commence_ts = None
-                    if opp.get("commence_time"):
-                        try:
-                            commence_ts = datetime.fromisoformat(
-                                opp["commence_time"].replace("Z", "+00:00")
-                            )
-                        except Exception:
-                            commence_ts = None
-
-                    record = EVOpportunity(
-                        detected_at=datetime.utcnow(),
-                        sport=opp.get("sport"),
-                        event_id=opp.get("event_id"),
-                        away_team=opp.get("away_team"),
-                        home_team=opp.get("home_team"),
-                        commence_time=commence_ts,
-                        market=opp.get("market"),
-                        player=opp.get("player") if opp.get("player") else None,
-                        point=float(opp["line"]) if opp.get("line") else None,
-                        selection=opp.get("selection"),
-                        best_book=opp.get("best_book"),
-                        best_odds=opp.get("odds_decimal"),
-                        fair_odds=opp.get("fair_odds"),
-                        ev_percent=opp.get("ev_percent"),
-                        implied_prob=opp.get("implied_prob"),
-                        sharp_book_count=int(opp.get("sharp_book_count", 0)),
-                        stake=opp.get("stake"),
-                        kelly_fraction=KELLY_FRACTION,
-                    )
-                    db.add(record)
 
-                db.commit()
-                print(f"[OK] ✅ Wrote {len(opportunities)} opportunities to PostgreSQL database")
-            finally:
-                db.close()
-        except Exception as e:
-            print(f"[!] Database write error (non-fatal): {e}")
-            print(f"[OK] CSV output saved as backup (no database connection or write failed)")
+def write_arbitrage(arbs: List[Dict]):
+    """Write arb opportunities to ARB_CSV."""
+    _write_scan_csv(ARB_CSV, ARB_HEADERS, [format_arb_row(arb) for arb in arbs], "arb")
+
+
+def write_middles(middles: List[Dict]):
+    """Write middles to MIDDLE_CSV."""
+    rows = [format_middle_row(middle) for middle in middles]
+    _write_scan_csv(MIDDLE_CSV, MIDDLE_HEADERS, rows, "middle")
+
+
+def new_scans() -> Dict[str, List]:
+    """Empty arb/middle/fair-history collections for run_sports / stream_opportunities."""
+    return {"arbs": [], "middles": [], "fairs": []}
+
+
+def scan_buckets(grouped: Dict, bookie_cols: List[str], profile: Dict) -> Dict[str, List[Dict]]:
+    """Arbitrage and middles found in one sport's grouped buckets (disabled stages stay empty)."""
+    scans = new_scans()
+    if ENABLE_ARBITRAGE:
+        scans["arbs"] = find_arbitrage(grouped, bookie_cols)
+    if ENABLE_MIDDLES:
+        scans["middles"] = find_middles(
+            grouped,
+            bookie_cols,
+            target_books=profile["target_books"],
+            devig_method=profile["devig_method"],
+        )
+    return scans
+
+
+def write_scans(scans: Dict[str, List[Dict]]):
+    """Sort and write the collected arbs and middles."""
+    scans["arbs"].sort(key=lambda a: a["profit_percent"], reverse=True)
+    scans["middles"].sort(key=lambda mid: mid["ev_percent"], reverse=True)
+    print(f"Arbitrage opportunities: {len(scans['arbs'])}")
+    print(f"Middles: {len(scans['middles'])}")
+    if ENABLE_ARBITRAGE:
+        write_arbitrage(scans["arbs"])
+    if ENABLE_MIDDLES:
+        write_middles(scans["middles"])
+
+
+def leaderboard_entry(opp: Dict) -> Dict:
+    """Opportunity in the API's hit shape: exactly the keys EVOpportunity.to_dict serves."""
+    line = opp.get("line")
+    best_odds = round(opp["odds_decimal"], 2) if opp.get("odds_decimal") else None
+    return {
+        "sport": opp.get("sport"),
+        "event_id": opp.get("event_id"),
+        "away_team": opp.get("away_team"),
+        "home_team": opp.get("home_team"),
+        "commence_time": opp.get("commence_time") or None,
+        "market": opp.get("market"),
+        "point": parse_float(line) if line not in ("", None) else None,
+        "selection": opp.get("selection"),
+        "player": opp.get("player") or None,
+        "fair_odds": round(opp["fair_odds"], 2) if opp.get("fair_odds") else None,
+        "best_odds": best_odds,
+        "best_book": opp.get("best_book"),
+        "ev_percent": round(opp.get("ev_percent", 0.0), 2),
+        "sharp_book_count": int(opp.get("sharp_book_count", 0)),
+        "implied_prob": round(opp["implied_prob"], 2) if opp.get("implied_prob") else None,
+        "stake": round(opp["stake"], 2) if opp.get("stake") else None,
+        "kelly_fraction": KELLY_FRACTION,
+        "detected_at": opp.get("timestamp") or None,
+        "created_at": opp.get("timestamp") or None,
+        # Aliases for backward compatibility with frontend
+        "bookmaker": opp.get("best_book"),
+        "odds_decimal": best_odds,
+    }
+
+
+def track_leaderboards(opportunities: Iterable[Dict], leaderboards: Dict) -> Iterator[Dict]:
+    """Pass opportunities through unchanged while offering each to the top-K boards."""
+    for opp in opportunities:
+        offer(
+            leaderboards,
+            opp,
+            opp.get("ev_percent", 0.0),
+            opp.get("sport", ""),
+            opp.get("market", ""),
+        )
+        yield opp
+
+
+def publish_leaderboards(leaderboards: Dict, generation: datetime | None = None):
+    """Write the top-K boards to LEADERBOARD_JSON (and the API artifacts built from them).
+
+    ``generation`` is the ev_summary stamp of the same run; the API only serves these
+    files instead of the database while it is still the database's current one.
+    """
+    doc = leaderboards_document(
+        leaderboards,
+        render=leaderboard_entry,
+        min_edge_percent=EV_MIN_EDGE * 100,
+        db_generation=generation.isoformat() if generation else None,
+    )
+    try:
+        write_leaderboards(LEADERBOARD_JSON, doc)
+        print(f"✅ Wrote top-{LEADERBOARD_K} leaderboards to {LEADERBOARD_JSON}")
+        publish_api_artifacts(doc)
+    except Exception as e:
+        print(f"[!] Leaderboard write failed (non-fatal): {e}")
+
+
+def publish_api_artifacts(doc: Dict) -> int:
+    """Pre-encode the default hits page (overall and per sport) and the summary.
+
+    Bodies match what backend_api builds from the same leaderboards; a hits page
+    is only published when the top-K board holds all of it. Returns the count.
+    """
+    published = 0
+    generated_at = doc.get("generated_at")
+    limit = API_HITS_PAGE["limit"]
+    if API_HITS_PAGE["min_ev"] * 100 <= doc.get("min_edge_percent", 0):
+        boards = [(None, doc["all"])] + list(doc.get("sport", {}).items())
+        for sport, board in boards:
+            name = artifact_name("ev_hits", sport)
+            rows = board["rows"][:limit]
+            if name is None or (len(rows) < limit and len(board["rows"]) < board["count"]):
+                continue
+            params = {**API_HITS_PAGE, "sport": sport}
+            body = {
+                "hits": rows,
+                "count": len(rows),
+                "total_count": board["count"],
+                "last_updated": generated_at,
+                "filters": params,
+            }
+            published += publish_artifact(DATA_DIR, name, body, params, EV_CSV) is not None
+
+    sports = {sport: board["count"] for sport, board in doc.get("sport", {}).items()}
+    total = sum(sports.values())
+    top_ev = doc["all"]["rows"][0]["ev_percent"] if doc["all"]["rows"] else 0
+    summary = {
+        "available": total > 0,
+        "total_hits": total,
+        "top_ev": round(top_ev, 2) if total else 0,
+        "sports": sports,
+        "last_updated": generated_at,
+    }
+    published += publish_artifact(DATA_DIR, "ev_summary", summary, {}, EV_CSV) is not None
+    print(f"✅ Published {published} pre-encoded API responses")
+    return published
+
+
+def clv_log_row(opp: Dict) -> Tuple:
+    """Opportunity as an opportunity-log (LOG_COLUMNS) row for CLV."""
+    return (
+        opp.get("timestamp", ""),
+        opp.get("sport", ""),
+        opp.get("event_id", ""),
+        opp.get("commence_time", ""),
+        opp.get("market", ""),
+        outcome_point(opp.get("line")),
+        opp.get("selection", ""),
+        opp.get("best_book", ""),
+        round(opp.get("odds_decimal", 0.0), 4),
+        round(opp.get("fair_odds", 0.0), 4),
+        round(opp.get("ev_percent", 0.0), 4),
+    )
+
+
+def track_clv(opportunities: Iterable[Dict], log: List[Tuple]) -> Iterator[Dict]:
+    """Pass opportunities through unchanged while collecting their CLV log rows."""
+    for opp in opportunities:
+        log.append(clv_log_row(opp))
+        yield opp
+
+
+def log_fairs(fairs: Iterable[Tuple]) -> int:
+    """Append sharp fairs to the fair history's day files; returns how many (0 on error)."""
+    now = datetime.utcnow().isoformat()
+    try:
+        return append_history(
+            FAIR_HISTORY_CSV, ((ts or now, *key, round(float(fair), 4)) for ts, *key, fair in fairs)
+        )
+    except Exception as e:
+        print(f"[!] CLV fair history append failed (non-fatal): {e}")
+        return 0
+
+
+def record_clv(log_rows: List[Tuple], fairs: Iterable[Tuple] = ()):
+    """Append this run's hits (and any sharp fairs not yet logged), then rewrite CLV_CSV.
+
+    Fair history days older than the retention window are deleted first, and only
+    the hits detected inside it are reported.
+    """
+    n_fairs = log_fairs(fairs)
+    now = datetime.utcnow()
+    since = now - timedelta(days=HISTORY_RETENTION_DAYS)
+    try:
+        n_logged = append_rows(
+            OPPORTUNITY_LOG_CSV,
+            LOG_COLUMNS,
+            ((row[0] or now.isoformat(), *row[1:]) for row in log_rows),
+        )
+        print(f"[CLV] Logged {n_logged} opportunities and {n_fairs} sharp fairs")
+        pruned = prune_history(FAIR_HISTORY_CSV, since)
+        if pruned:
+            print(f"[CLV] Deleted {pruned} fair history days older than {since.date()}")
+        table = clv_table(OPPORTUNITY_LOG_CSV, FAIR_HISTORY_CSV, now, since)
+        write_clv(CLV_CSV, table)
+        print(f"✅ Wrote CLV to {CLV_CSV}: {summarize(table)}")
+    except Exception as e:
+        print(f"[!] CLV stage failed (non-fatal): {e}")
+
+
+def partition_by_sport(rows: List[Dict]) -> Dict[str, List[Dict]]:
+    """Split raw rows into per-sport lists in one pass."""
+    partitions: Dict[str, List[Dict]] = {}
+    for row in rows:
+        partitions.setdefault(row.get("sport") or "unknown", []).append(row)
+    return partitions
+
+
+def build_weight_profile(sport: str) -> Dict:
+    """Resolve a sport's weight profile explicitly (no module globals are changed)."""
+    weights = load_weight_config(sport)
+    return {
+        "sport": sport,
+        "weights": weights,
+        "sharp_weights": get_sharp_books_only(weights),
+        "target_books": get_target_books_only(),
+        "devig_method": get_devig_method(sport),
+    }
+
+
+def process_sport(
+    sport: str,
+    rows: List[Dict],
+    bookie_cols: List[str],
+    grouped: Dict | None = None,
+    alt_store: Dict | None = None,
+    with_scans: bool = False,
+) -> List[Dict] | Tuple[List[Dict], List[Dict]]:
+    """Group and evaluate one sport's rows using that sport's weight profile.
+
+    Pass ``grouped`` (and ``alt_store``) instead of ``rows`` when the buckets were
+    already built by the reader. Alternate-line rows are evaluated from a compact
+    line store instead of buckets. With ``with_scans`` the same buckets are also
+    scanned for arbitrage and middles, the sharp fairs are kept for CLV, and
+    (opportunities, scans) is returned. Top-level
+    (picklable) so it can run inside a worker process.
+    """
+    print(f"\n{'='*70}")
+    print(f"Processing: {sport}")
+    print(f"{'='*70}")
+
+    profile = build_weight_profile(sport)
+    weights = profile["weights"]
+    print(f"[CONFIG] Weight profile for {sport}:")
+    print(
+        f"  4*: {weights[4]:.1%}  3*: {weights[3]:.1%}  2*: {weights[2]:.1%}  1*: {weights[1]:.1%}"
+    )
+    print(f"  devig: {profile['devig_method']}")
+
+    # Group and calculate EV
+    if grouped is None:
+        rows, alt_store = split_alternate_lines(rows, bookie_cols)
+        grouped = group_rows_wide(rows)
+    print(f"[PROC] Grouped into {len(grouped)} market/line buckets")
+
+    fair_log = [] if with_scans and ENABLE_CLV else None
+    opportunities = process_markets(
+        grouped,
+        bookie_cols,
+        verbose=True,
+        target_books=profile["target_books"],
+        devig_method=profile["devig_method"],
+        fair_log=fair_log,
+    )
+    if alt_store is not None and store_size(alt_store):
+        opportunities += process_alternate_lines(
+            alt_store,
+            verbose=True,
+            target_books=profile["target_books"],
+            devig_method=profile["devig_method"],
+            fair_log=fair_log,
+        )
+    print(f"[OK] Found {len(opportunities)} EV opportunities")
+    if not with_scans:
+        return opportunities
+    scans = scan_buckets(grouped, bookie_cols, profile)
+    scans["fairs"] = fair_log or []
+    print(f"[OK] Found {len(scans['arbs'])} arbs, {len(scans['middles'])} middles")
+    return opportunities, scans
+
+
+def run_sports(
+    partitions: Dict[str, List[Dict]] | Dict[str, Dict],
+    bookie_cols: List[str],
+    max_workers: int | None = None,
+    pregrouped: bool = False,
+    alt_stores: Dict[str, Dict] | None = None,
+    scans_out: Dict[str, List[Dict]] | None = None,
+) -> List[Dict]:
+    """Evaluate every sport partition, in parallel when more than one worker is available.
+
+    ``partitions`` maps sport -> raw rows, or sport -> buckets when ``pregrouped``
+    (with that sport's alternate-line store in ``alt_stores``). Pass a list as
+    ``scans_out`` (see new_scans) to also collect each sport's arbs and middles into it.
+    Results are merged in sorted sport order so output is stable regardless of
+    which worker finishes first. A sport that fails raises, serial or parallel, so
+    the writers never replace the published hits with a set missing that sport.
+    """
+    alt_stores = alt_stores or {}
+    sports = sorted(set(partitions) | set(alt_stores))
+    workers = min(max_workers or EV_WORKERS or os.cpu_count() or 1, len(sports))
+
+    with_scans = scans_out is not None
+
+    def job(sport: str) -> Tuple:
+        if pregrouped:
+            grouped, alt_store = partitions.get(sport, {}), alt_stores.get(sport)
+            return (sport, [], bookie_cols, grouped, alt_store, with_scans)
+        return (sport, partitions[sport], bookie_cols, None, None, with_scans)
+
+    results: Dict[str, List[Dict]] = {}
+    if workers <= 1:
+        for sport in sports:
+            results[sport] = process_sport(*job(sport))
     else:
-        print("[OK] Database not connected - CSV output saved")
+        print(f"\n[PARALLEL] Processing {len(sports)} sports across {workers} worker processes...")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(process_sport, *job(sport)): sport for sport in sports}
+            for future in as_completed(futures):
+                sport = futures[future]
+                try:
+                    results[sport] = future.result()
+                except Exception as e:
+                    # Like the serial path: a partial result must not replace the published one
+                    print(f"[!] {sport} failed: {e}")
+                    raise
+
+    merged: List[Dict] = []
+    for sport in sports:
+        result = results[sport]
+        if with_scans:
+            result, scans = result
+            for name, found in scans.items():
+                scans_out[name].extend(found)
+        merged.extend(result)
+    return merged
+
+
+def stream_opportunities(
+    chunks: Iterable[List[Dict]],
+    bookie_cols: List[str],
+    scans_out: Dict[str, List[Dict]] | None = None,
+) -> Iterator[Dict]:
+    """Evaluate event-aligned chunks one at a time, yielding opportunities as found.
+
+    Chunks are event-aligned, so each chunk's buckets are complete and can be scanned
+    for arbs and middles on their own (collected into ``scans_out`` when given). With
+    CLV on, each chunk's sharp fairs are appended to the fair history as it finishes
+    rather than held for the run.
+    """
+    profiles: Dict[str, Dict] = {}
+    fair_log = [] if scans_out is not None and ENABLE_CLV else None
+    for chunk_no, chunk in enumerate(chunks, 1):
+        found = 0
+        for sport, rows in sorted(partition_by_sport(chunk).items()):
+            if sport not in profiles:
+                profiles[sport] = build_weight_profile(sport)
+            rows, alt_store = split_alternate_lines(rows, bookie_cols)
+            grouped = group_rows_wide(rows)
+            if scans_out is not None:
+                for name, items in scan_buckets(grouped, bookie_cols, profiles[sport]).items():
+                    scans_out[name].extend(items)
+            for opp in process_markets(
+                grouped,
+                bookie_cols,
+                target_books=profiles[sport]["target_books"],
+                devig_method=profiles[sport]["devig_method"],
+                fair_log=fair_log,
+            ):
+                found += 1
+                yield opp
+            for opp in process_alternate_lines(
+                alt_store,
+                target_books=profiles[sport]["target_books"],
+                devig_method=profiles[sport]["devig_method"],
+                fair_log=fair_log,
+            ):
+                found += 1
+                yield opp
+        logged = ""
+        if fair_log:
+            logged = f", {log_fairs(fair_log)} sharp fairs logged"
+            fair_log.clear()
+        print(f"[STREAM] Chunk {chunk_no}: {len(chunk)} rows -> {found} EV opportunities{logged}")
+
+
+def main_stream():
+    """Streaming variant of main(): memory stays flat regardless of slate size.
+
+    Only the EV hits (and arbs / middles) are held, never the raw rows; sharp fairs
+    for CLV go to disk chunk by chunk.
+    """
+    print(f"[STREAM] Event-aligned chunks of >= {STREAM_CHUNK_ROWS} rows")
+
+    columns, chunks = stream_raw_odds(STREAM_CHUNK_ROWS)
+    if not columns:
+        sys.exit(1)
+
+    bookie_cols = bookie_columns_from_header(columns)
+    print(f"[OK] Detected {len(bookie_cols)} bookmaker columns")
+
+    headers = build_headers(bookie_cols)
+    scans = new_scans() if ENABLE_SCANS else None
+    opportunities = stream_opportunities(chunks, bookie_cols, scans_out=scans)
+    if PORTFOLIO_SIZING:
+        # Sizing needs every hit at once; hits are a small fraction of the rows
+        opportunities = iter(apply_portfolio_sizing(list(opportunities)))
+    leaderboards = new_leaderboards(LEADERBOARD_K)
+    clv_log: List[Tuple] = []
+    opportunities = track_clv(track_leaderboards(opportunities, leaderboards), clv_log)
+    generation = datetime.utcnow()
+    total = write_opportunities_stream(opportunities, headers, generation)
+    publish_leaderboards(leaderboards, generation)
+    if scans is not None:
+        write_scans(scans)
+        if ENABLE_CLV:
+            record_clv(clv_log)
+
+    print(f"\n{'='*70}")
+    print(f"FINAL RESULTS")
+    print(f"{'='*70}")
+    print(f"Total opportunities across all sports: {total}")
+    print("\n[DONE] Complete")
 
 
 def main():
@@ -841,60 +2409,101 @@ def main():
         print(f"[!] WARNING: Raw odds file is {raw_age_seconds/60:.1f} minutes old (expected < 60 min)")
         print("[!] Extract odds pipeline may not be running correctly")
 
-    raw_rows = read_raw_odds()
+    if EV_STREAM:
+        main_stream()
+        return
+
+    db_url = os.getenv("DATABASE_URL")
+    if db_url:
+        try:
+            print(f"[DB] Reading raw odds from database table: raw_odds_pure")
+            bookie_cols, grouped_by_sport, alt_stores = read_raw_odds_grouped(db_url)
+            if grouped_by_sport or alt_stores:
+                print(f"[OK] Detected {len(bookie_cols)} bookmaker columns")
+                sports = sorted(set(grouped_by_sport) | set(alt_stores))
+                print(f"[OK] Detected sports: {', '.join(sports)}")
+                scans = new_scans() if ENABLE_SCANS else None
+                all_opportunities = run_sports(
+                    grouped_by_sport,
+                    bookie_cols,
+                    pregrouped=True,
+                    alt_stores=alt_stores,
+                    scans_out=scans,
+                )
+                write_results(all_opportunities, bookie_cols, scans)
+                return
+            print(f"[!] Database table raw_odds_pure is empty")
+        except Exception as e:
+            print(f"[!] Database read failed: {e}")
+            print(f"[!] Falling back to CSV...")
+
+    raw_rows = read_raw_odds(use_db=False)
     if not raw_rows:
         sys.exit(1)
 
     bookie_cols = get_bookie_columns(raw_rows)
     print(f"[OK] Detected {len(bookie_cols)} bookmaker columns")
 
-    # Detect sports in data
-    sports_in_data = set(row.get("sport", "unknown") for row in raw_rows)
-    print(f"[OK] Detected sports: {', '.join(sorted(sports_in_data))}")
+    # Partition rows by sport in a single pass
+    partitions = partition_by_sport(raw_rows)
+    print(f"[OK] Detected sports: {', '.join(sorted(partitions))}")
 
-    # Process each sport with its own weight profile
-    all_opportunities = []
+    # Process each sport with its own weight profile (one worker process per sport)
+    scans = new_scans() if ENABLE_SCANS else None
+    all_opportunities = run_sports(partitions, bookie_cols, scans_out=scans)
+    write_results(all_opportunities, bookie_cols, scans)
 
-    for sport in sorted(sports_in_data):
-        print(f"\n{'='*70}")
-        print(f"Processing: {sport}")
-        print(f"{'='*70}")
 
-        # Load sport-specific weights
-        weights = load_weight_config(sport)
-        print(f"[CONFIG] Weight profile for {sport}:")
-        print(
-            f"  4*: {weights[4]:.1%}  3*: {weights[3]:.1%}  2*: {weights[2]:.1%}  1*: {weights[1]:.1%}"
-        )
-
-        # Update global weights for this sport
-        global SHARP_WEIGHTS, TARGET_BOOKS
-        SHARP_WEIGHTS = get_sharp_books_only(weights)
-        TARGET_BOOKS = get_target_books_only()
-
-        # Filter rows for this sport
-        sport_rows = [r for r in raw_rows if r.get("sport") == sport]
-
-        # Group and calculate EV
-        grouped = group_rows_wide(sport_rows)
-        print(f"[PROC] Grouped into {len(grouped)} market/line buckets")
+def apply_portfolio_sizing(opportunities: List[Dict]) -> List[Dict]:
+    """Replace each hit's standalone Kelly stake with its portfolio stake (see portfolio.py).
 
-        opportunities = process_two_way_markets(grouped, bookie_cols, verbose=True)
-        print(f"[OK] Found {len(opportunities)} EV opportunities")
+    The standalone stake is kept as single_stake.
+    """
+    if not PORTFOLIO_SIZING or not opportunities:
+        return opportunities
+    stakes = size_portfolio(
+        opportunities, BANKROLL, KELLY_FRACTION, MAX_EVENT_EXPOSURE, MAX_PORTFOLIO_EXPOSURE
+    )
+    single_total = 0.0
+    for opp, stake in zip(opportunities, stakes.tolist()):
+        single_total += opp.get("stake", 0.0)
+        opp["single_stake"] = opp.get("stake", 0.0)
+        opp["stake"] = stake
+    print(
+        f"[PORTFOLIO] {int((stakes > 0).sum())} bets staked: ${stakes.sum():.0f} total "
+        f"(standalone Kelly: ${single_total:.0f})"
+    )
+    return opportunities
 
-        all_opportunities.extend(opportunities)
 
+def write_results(
+    all_opportunities: List[Dict],
+    bookie_cols: List[str],
+    scans: Dict[str, List[Dict]] | None = None,
+):
+    """Report and write the merged opportunities (and arbs/middles, when scanned)."""
     print(f"\n{'='*70}")
     print(f"FINAL RESULTS")
     print(f"{'='*70}")
     print(f"Total opportunities across all sports: {len(all_opportunities)}")
+    apply_portfolio_sizing(all_opportunities)
 
     # Build headers from first opportunity
+    leaderboards = new_leaderboards(LEADERBOARD_K)
+    generation = datetime.utcnow()
     if all_opportunities:
         headers = build_headers(bookie_cols)
-        write_opportunities(all_opportunities, headers)
+        opportunities = list(track_leaderboards(all_opportunities, leaderboards))
+        write_opportunities(opportunities, headers, generation)
     else:
         print("[!] No opportunities found")
+    # After the hits, so the API can tell the leaderboards are at least as fresh
+    publish_leaderboards(leaderboards, generation)
+
+    if scans is not None:
+        write_scans(scans)
+        if ENABLE_CLV:
+            record_clv([clv_log_row(opp) for opp in all_opportunities], scans["fairs"])
 
     print("\n[DONE] Complete")
 
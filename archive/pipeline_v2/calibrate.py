@@ -0,0 +1,325 @@
+"""
+CALIBRATION
+Scores every book's devigged prices across archived snapshots against final
+results (or the sharp closing line) and learns per-sport sharp weights.
+
+Usage (from the directory containing pipeline_v2/):
+    python -m pipeline_v2.calibrate --snapshots "data/snapshots/*.csv" --results data/results.csv
+    python -m pipeline_v2.calibrate --snapshots ... --target close --devig shin
+
+Snapshots are raw wide CSVs (raw_odds_pure.csv format, see backtest). Per quote
+(book, snapshot, outcome) observed before kick-off:
+    p = the book's devigged probability (the book must quote every outcome of the market)
+    y = 1 / 0 from the results CSV (pushes and unsettled outcomes are dropped), or the
+        closing fair's probability from FAIR_HISTORY_CSV with --target close
+    log loss = -(y log p + (1 - y) log(1 - p)),   Brier = (p - y) ** 2
+
+Markets are devigged a width class at a time (one devig call per width over every
+book and snapshot), and scores are summed per (market class, book) with one
+bincount, so the cost is a few array passes however many quotes there are. Each
+sport is scored in its own worker process.
+
+Within a (sport, market class), books rated at least CALIBRATION_MIN_RATING with
+CALIBRATION_MIN_QUOTES scored quotes get a softmax weight of their mean log loss:
+    w ~ exp(-(log_loss - best_log_loss) / CALIBRATION_TEMPERATURE)
+The weights are written as a ratings profile (point RATINGS_PROFILE_PATH at it; see
+ratings.py): "main" class (h2h / spreads / totals) weights under the sport, the other
+classes under "sport|class", which the pricer uses for that sport's markets of the
+class. Every score goes to CALIBRATION_CSV.
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pipeline_v2.backtest import LOSS, WIN, load_results, settle
+from pipeline_v2.calculate_opportunities import (
+    DATA_DIR,
+    FAIR_HISTORY_CSV,
+    SPREAD_MARKETS,
+    _player_key,
+    bookie_columns_from_header,
+)
+from pipeline_v2.clv import _category_timestamps, closing_fairs, outcome_point, read_history
+from pipeline_v2.devig import DEVIG_METHODS, devig
+from pipeline_v2.ratings import BOOKMAKER_RATINGS, market_class
+
+CALIBRATION_CSV = DATA_DIR / "calibration_scores.csv"
+CALIBRATION_PROFILE_JSON = DATA_DIR / "ratings_profile.json"
+CALIBRATION_TEMPERATURE = float(os.getenv("CALIBRATION_TEMPERATURE", "0.01"))
+CALIBRATION_MIN_QUOTES = int(os.getenv("CALIBRATION_MIN_QUOTES", "200"))
+CALIBRATION_MIN_RATING = int(os.getenv("CALIBRATION_MIN_RATING", "3"))
+CALIBRATION_WORKERS = int(os.getenv("CALIBRATION_WORKERS", "0"))
+
+KEY_COLUMNS = [
+    "timestamp",
+    "sport",
+    "event_id",
+    "away_team",
+    "home_team",
+    "commence_time",
+    "market",
+    "point",
+    "selection",
+]
+MARKET_CLASSES = ("main", "alternate", "props", "other")
+SCORE_COLUMNS = ["sport", "market_class", "book", "quotes", "log_loss", "brier"]
+PROB_EPS = 1e-6
+
+
+def load_frame(patterns: List[str]) -> Tuple[List[str], pd.DataFrame]:
+    """Bookmaker columns and one frame of every archived snapshot row (glob patterns)."""
+    paths = sorted({p for pattern in patterns for p in glob.glob(pattern)})
+    frames = [
+        pd.read_csv(path, dtype={c: str for c in KEY_COLUMNS}, keep_default_na=False)
+        for path in paths
+    ]
+    if not frames:
+        return [], pd.DataFrame(columns=KEY_COLUMNS)
+    frame = pd.concat(frames, ignore_index=True)
+    books = [bk for bk in bookie_columns_from_header(frame.columns) if bk in frame.columns]
+    for bk in books:
+        frame[bk] = pd.to_numeric(frame[bk], errors="coerce")
+    print(f"[OK] Loaded {len(frame)} rows x {len(books)} books from {len(paths)} snapshot files")
+    return books, frame
+
+
+def market_groups(frame: pd.DataFrame) -> np.ndarray:
+    """Group id per row: the outcomes of one market (bucket_key) in one snapshot."""
+    line = pd.to_numeric(frame["point"], errors="coerce")
+    away = frame["market"].isin(SPREAD_MARKETS) & (frame["selection"] == frame["away_team"])
+    player = frame["selection"].where(frame["market"].str.startswith("player_"), "")
+    keys = pd.DataFrame(
+        {
+            "timestamp": frame["timestamp"],
+            "event_id": frame["event_id"],
+            "market": frame["market"],
+            "line": line.where(~away, -line),
+            "player": player.map({s: _player_key(s) for s in player.unique()}),
+        }
+    )
+    return keys.groupby(list(keys.columns), sort=False, dropna=False).ngroup().to_numpy()
+
+
+def devig_groups(odds: np.ndarray, groups: np.ndarray, devig_method: str) -> np.ndarray:
+    """Devigged probability per (row, book); NaN where the book misses part of the market."""
+    probs = np.full(odds.shape, np.nan)
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    sizes = np.diff(np.r_[starts, len(groups)])
+
+    for width in np.unique(sizes):
+        if width < 2:
+            continue
+        # (markets, width) row indices -> (markets, width, books) odds block
+        rows = order[starts[sizes == width][:, np.newaxis] + np.arange(width)]
+        block = odds[rows]
+        complete = (block > 1.0).all(axis=1)
+        block = np.where(complete[:, np.newaxis, :], block, np.nan)
+        by_book = block.transpose(0, 2, 1).reshape(-1, width)
+        fair = devig(by_book, devig_method).reshape(len(rows), -1, width)
+        probs[rows] = fair.transpose(0, 2, 1)
+    return probs
+
+
+def result_targets(outcomes: pd.DataFrame, results: Tuple[Dict, Dict]) -> np.ndarray:
+    """1 / 0 per outcome from final results (NaN for pushes and unsettled)."""
+    scores, explicit = results
+    codes = np.array([settle(o, scores, explicit) for o in outcomes.to_dict("records")])
+    return np.where(codes == WIN, 1.0, np.where(codes == LOSS, 0.0, np.nan))
+
+
+def close_targets(outcomes: pd.DataFrame, history_path) -> np.ndarray:
+    """Closing fair probability per outcome (NaN with no close in the history)."""
+    log = outcomes[["event_id", "commence_time", "market", "selection"]].copy()
+    log["point"] = outcomes["point"].map(outcome_point)
+    history = read_history(history_path, log["event_id"].unique())
+    closing = closing_fairs(log, history)["closing_fair"].to_numpy(dtype=float)
+    return np.where(closing > 1.0, 1.0 / closing, np.nan)
+
+
+def score_sport(
+    sport: str,
+    frame: pd.DataFrame,
+    books: List[str],
+    devig_method: str = "multiplicative",
+    results: Tuple[Dict, Dict] | None = None,
+    history_path=None,
+) -> List[Dict]:
+    """Mean log loss / Brier per (market class, book) for one sport's rows.
+
+    Targets come from ``results`` (load_results) when given, else from the fair
+    history at ``history_path``.
+    """
+    frame = frame.reset_index(drop=True)
+    outcome_cols = ["sport", "event_id", "home_team", "away_team", "commence_time"]
+    outcome_cols += ["market", "point", "selection"]
+    outcome_codes = frame.groupby(outcome_cols, sort=False).ngroup().to_numpy()
+    outcomes = frame.drop_duplicates(outcome_cols)[outcome_cols]
+    if results is not None:
+        targets = result_targets(outcomes, results)
+    else:
+        targets = close_targets(outcomes, history_path)
+    y = targets[outcome_codes]
+
+    # Only quotes observed before kick-off (unparseable timestamps are kept)
+    observed = _category_timestamps(frame["timestamp"])
+    commence = _category_timestamps(frame["commence_time"])
+    y[observed >= commence] = np.nan
+
+    odds = frame[books].to_numpy(dtype=float)
+    probs = devig_groups(odds, market_groups(frame), devig_method)
+
+    scored = np.isfinite(probs) & np.isfinite(y)[:, np.newaxis]
+    p = np.clip(probs, PROB_EPS, 1 - PROB_EPS)
+    y = y[:, np.newaxis]
+    log_loss = -(y * np.log(p) + (1 - y) * np.log(1 - p))
+    brier = (p - y) ** 2
+
+    # One bincount per statistic over (market class, book) cells
+    markets = frame["market"]
+    classes = markets.map({m: MARKET_CLASSES.index(market_class(m)) for m in markets.unique()})
+    classes = classes.to_numpy()
+    cells = classes[:, np.newaxis] * len(books) + np.arange(len(books))[np.newaxis, :]
+    n_cells = len(MARKET_CLASSES) * len(books)
+    quotes = np.bincount(cells[scored], minlength=n_cells)
+    ll_sum = np.bincount(cells[scored], weights=log_loss[scored], minlength=n_cells)
+    brier_sum = np.bincount(cells[scored], weights=brier[scored], minlength=n_cells)
+
+    return [
+        {
+            "sport": sport,
+            "market_class": MARKET_CLASSES[cell // len(books)],
+            "book": books[cell % len(books)],
+            "quotes": int(quotes[cell]),
+            "log_loss": ll_sum[cell] / quotes[cell],
+            "brier": brier_sum[cell] / quotes[cell],
+        }
+        for cell in np.flatnonzero(quotes)
+    ]
+
+
+def learn_weights(
+    scores: pd.DataFrame,
+    temperature: float = CALIBRATION_TEMPERATURE,
+    min_quotes: int = CALIBRATION_MIN_QUOTES,
+    min_rating: int = CALIBRATION_MIN_RATING,
+) -> pd.DataFrame:
+    """Scores with a weight column: log-loss softmax per (sport, market class)."""
+    scores = scores.copy()
+    ratings = scores["book"].map(BOOKMAKER_RATINGS).fillna(0)
+    eligible = (scores["quotes"] >= min_quotes) & (ratings >= min_rating)
+    cells = [scores["sport"], scores["market_class"]]
+    log_loss = scores["log_loss"].where(eligible)
+    best = log_loss.groupby(cells).transform("min")
+    raw = np.exp(-(log_loss - best) / temperature).fillna(0.0)
+    total = raw.groupby(cells).transform("sum")
+    scores["weight"] = np.where(total > 0, raw / total.where(total > 0, 1.0), 0.0)
+    return scores
+
+
+def weight_profile(scores: pd.DataFrame, **meta) -> Dict:
+    """Ratings profile (see ratings.load_profile_file) of the learned weights.
+
+    Main-class weights are keyed by sport, other classes by "sport|class".
+    """
+    kept = scores[scores["weight"] > 0][["sport", "market_class", "book", "weight"]]
+    book_weights: Dict[str, Dict[str, float]] = {}
+    for sport, cls, book, weight in kept.itertuples(index=False):
+        key = sport if cls == "main" else f"{sport}|{cls}"
+        book_weights.setdefault(key, {})[book] = round(float(weight), 6)
+    return {"generated_at": datetime.utcnow().isoformat(), **meta, "book_weights": book_weights}
+
+
+def run_calibration(
+    patterns: List[str],
+    results_path: str | None = None,
+    devig_method: str = "multiplicative",
+    history_path=FAIR_HISTORY_CSV,
+    max_workers: int | None = None,
+) -> pd.DataFrame:
+    """Score every sport of the archive (in parallel) and learn the weights.
+
+    Targets are final results when ``results_path`` is given, else closing fairs.
+    """
+    books, frame = load_frame(patterns)
+    if frame.empty:
+        return learn_weights(pd.DataFrame(columns=SCORE_COLUMNS))
+    results = load_results(results_path) if results_path else None
+    partitions = {sport: part for sport, part in frame.groupby("sport", sort=True)}
+    workers = min(max_workers or CALIBRATION_WORKERS or os.cpu_count() or 1, len(partitions))
+
+    def job(sport: str) -> Tuple:
+        return (sport, partitions[sport], books, devig_method, results, history_path)
+
+    rows: List[Dict] = []
+    if workers <= 1:
+        for sport in partitions:
+            rows.extend(score_sport(*job(sport)))
+    else:
+        print(f"[PARALLEL] Scoring {len(partitions)} sports across {workers} worker processes...")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(score_sport, *job(sport)): sport for sport in partitions}
+            for future in as_completed(futures):
+                try:
+                    rows.extend(future.result())
+                except Exception as e:
+                    print(f"[!] {futures[future]} calibration failed: {e}")
+
+    scores = pd.DataFrame(rows, columns=SCORE_COLUMNS)
+    scores = scores.sort_values(["sport", "market_class", "log_loss"], kind="stable")
+    return learn_weights(scores.reset_index(drop=True))
+
+
+def write_calibration(scores: pd.DataFrame, profile: Dict, csv_path, profile_path):
+    """Write the score table and the weight profile atomically."""
+    tmp = csv_path.with_name(f".{csv_path.name}.tmp")
+    scores.to_csv(tmp, index=False, float_format="%.6f")
+    os.replace(tmp, csv_path)
+    tmp = profile_path.with_name(f".{profile_path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2, sort_keys=True)
+    os.replace(tmp, profile_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Learn sharp book weights from history")
+    parser.add_argument("--snapshots", nargs="+", required=True, help="snapshot CSV globs")
+    parser.add_argument("--results", help="results CSV (required for --target results)")
+    parser.add_argument("--target", choices=["results", "close"], default="results")
+    parser.add_argument("--devig", choices=DEVIG_METHODS, default="multiplicative")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    if args.target == "results" and not args.results:
+        parser.error("--results is required with --target results")
+
+    started = time.perf_counter()
+    scores = run_calibration(
+        args.snapshots,
+        args.results if args.target == "results" else None,
+        args.devig,
+        max_workers=args.workers,
+    )
+    profile = weight_profile(scores, target=args.target, devig_method=args.devig)
+    write_calibration(scores, profile, CALIBRATION_CSV, CALIBRATION_PROFILE_JSON)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Scored {int(scores['quotes'].sum())} quotes in {elapsed:.2f}s")
+    for key, weights in sorted(profile["book_weights"].items()):
+        top = sorted(weights.items(), key=lambda kv: -kv[1])[:5]
+        print(f"   {key:32} " + ", ".join(f"{bk} {w:.1%}" for bk, w in top))
+    print(f"[OK] Wrote {CALIBRATION_CSV} and {CALIBRATION_PROFILE_JSON}")
+    print(f"     Price with it: RATINGS_PROFILE_PATH={CALIBRATION_PROFILE_JSON}")
+
+
+if __name__ == "__main__":
+    main()
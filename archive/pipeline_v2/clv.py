@@ -0,0 +1,261 @@
+"""
+Closing-line value (CLV) of logged EV opportunities.
+
+Every calculator run appends two logs:
+- fair history: the sharp fair price of every priced outcome, stamped observed_at,
+  in one file per observed day (fair_history.2025-12-10.csv); days older than
+  HISTORY_RETENTION_DAYS are deleted, so a run never parses more than that window
+- opportunity log: each hit's price, book and detected_at
+
+The closing fair of an opportunity is the last fair in the history for the same
+outcome (event, market, point, selection) observed strictly before its
+commence_time, once that has passed (an event that has not started has no close
+yet). It is found with one sorted as-of join (pandas.merge_asof by an integer
+outcome id) rather than a lookup per opportunity, so the cost is two sorts over
+the history, however many opportunities there are.
+
+    CLV % = (best_odds / closing_fair - 1) * 100
+"""
+
+import csv
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+HISTORY_COLUMNS = ["observed_at", "event_id", "market", "point", "selection", "fair_odds"]
+LOG_COLUMNS = [
+    "detected_at",
+    "sport",
+    "event_id",
+    "commence_time",
+    "market",
+    "point",
+    "selection",
+    "best_book",
+    "best_odds",
+    "fair_odds",
+    "ev_percent",
+]
+OUTCOME_COLUMNS = ["event_id", "market", "point", "selection"]
+CLV_COLUMNS = LOG_COLUMNS + ["closing_fair", "closed_at", "clv_percent"]
+HISTORY_CHUNK_ROWS = int(os.getenv("CLV_HISTORY_CHUNK_ROWS", "1000000"))
+HISTORY_RETENTION_DAYS = int(os.getenv("CLV_HISTORY_RETENTION_DAYS", "14"))
+
+
+def outcome_point(point) -> str:
+    """Canonical point text for outcome keys ("-3.5" and -3.50 match; no point is "")."""
+    if point in ("", None):
+        return ""
+    try:
+        return f"{float(point):g}"
+    except (TypeError, ValueError):
+        return str(point)
+
+
+def append_rows(path: Path, columns: List[str], rows: Iterable) -> int:
+    """Append row tuples (in ``columns`` order) to a CSV log, writing the header once."""
+    new_file = not path.exists() or path.stat().st_size == 0
+    written = 0
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+    return written
+
+
+def history_partitions(path: Path) -> List[Path]:
+    """Day files of a fair history (fair_history.2025-12-10.csv), oldest first."""
+    return sorted(path.parent.glob(f"{path.stem}.????-??-??{path.suffix}"))
+
+
+def append_history(path: Path, rows: Iterable) -> int:
+    """Append HISTORY_COLUMNS rows to the day file of their observed_at."""
+    by_day: Dict[str, List] = {}
+    for row in rows:
+        by_day.setdefault(str(row[0])[:10], []).append(row)
+    return sum(
+        append_rows(path.with_name(f"{path.stem}.{day}{path.suffix}"), HISTORY_COLUMNS, day_rows)
+        for day, day_rows in sorted(by_day.items())
+    )
+
+
+def prune_history(path: Path, since: datetime) -> int:
+    """Delete the day files observed entirely before ``since``; returns how many."""
+    cutoff = f"{path.stem}.{since.date().isoformat()}{path.suffix}"
+    old = [part for part in history_partitions(path) if part.name < cutoff]
+    for part in old:
+        part.unlink()
+    return len(old)
+
+
+def _read_log(path: Path, columns: List[str]) -> pd.DataFrame:
+    if not path.exists():
+        return pd.DataFrame(columns=columns)
+    # Outcome keys stay text ("" for no point), so both logs key outcomes identically
+    return pd.read_csv(path, dtype={c: str for c in OUTCOME_COLUMNS}, keep_default_na=False)
+
+
+def read_history(path: Path, event_ids: Iterable[str]) -> pd.DataFrame:
+    """Fair history rows of the given events, read in chunks so memory follows what is kept.
+
+    Reads ``path`` itself (an unpartitioned history) and its day files.
+    """
+    wanted = set(event_ids)
+    dtype = {c: "category" for c in OUTCOME_COLUMNS + ["observed_at"]}
+    parts = ([path] if path.exists() else []) + history_partitions(path)
+    kept = [
+        chunk[chunk["event_id"].isin(wanted)]
+        for part in parts
+        for chunk in pd.read_csv(
+            part, dtype=dtype, keep_default_na=False, chunksize=HISTORY_CHUNK_ROWS
+        )
+    ]
+    if not kept:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    # Per-chunk categories differ; concat falls back to text, re-encode once
+    history = pd.concat(kept, ignore_index=True)
+    for col in OUTCOME_COLUMNS + ["observed_at"]:
+        history[col] = history[col].astype("category")
+    return history
+
+
+def _timestamps(values: pd.Series) -> np.ndarray:
+    """UTC datetime64[ns] array; naive timestamps (datetime.utcnow().isoformat()) are UTC."""
+    parsed = pd.to_datetime(values, utc=True, errors="coerce", format="ISO8601")
+    return parsed.dt.tz_localize(None).to_numpy(dtype="datetime64[ns]")
+
+
+def _category_timestamps(values: pd.Series) -> np.ndarray:
+    """Timestamps of a column with few distinct values (one per run): parse each once."""
+    values = values.astype("category")
+    parsed = _timestamps(pd.Series(values.cat.categories, dtype=str))
+    codes = values.cat.codes.to_numpy()
+    return np.where(codes >= 0, parsed[codes], np.datetime64("NaT", "ns"))
+
+
+def outcome_ids(log: pd.DataFrame, history: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Integer outcome ids for log and history rows (-1: outcome not in the history).
+
+    Each key column is encoded against the history's categories and the codes are
+    combined mixed-radix, so equal outcomes get equal ids without hashing tuples.
+    """
+    log_ids = np.zeros(len(log), dtype=np.int64)
+    history_ids = np.zeros(len(history), dtype=np.int64)
+    missing = np.zeros(len(log), dtype=bool)
+    for col in OUTCOME_COLUMNS:
+        categories = history[col].astype("category").cat
+        log_codes = categories.categories.get_indexer(log[col])
+        radix = len(categories.categories)
+        history_ids = history_ids * radix + categories.codes.to_numpy()
+        log_ids = log_ids * radix + log_codes
+        missing |= log_codes < 0
+    log_ids[missing] = -1
+    return log_ids, history_ids
+
+
+def closing_fairs(
+    log: pd.DataFrame, history: pd.DataFrame, now: Optional[datetime] = None
+) -> pd.DataFrame:
+    """Log rows (original order) with closing_fair / closed_at from an as-of join.
+
+    Only events that commenced by ``now`` (naive UTC, default utcnow) have closed;
+    the others get NaN, however much history they already have.
+    """
+    # Only history for events that were bet can be a closing line
+    history = history[history["event_id"].isin(log["event_id"].unique())]
+    log_ids, history_ids = outcome_ids(log, history)
+    commence = _timestamps(log["commence_time"])
+    now_ts = _timestamps(pd.Series([(now or datetime.utcnow()).isoformat()]))[0]
+
+    left = pd.DataFrame({"row": np.arange(len(log)), "outcome": log_ids, "commence": commence})
+    right = pd.DataFrame(
+        {
+            "outcome": history_ids,
+            "closed_at": _category_timestamps(history["observed_at"]),
+            "closing_fair": pd.to_numeric(history["fair_odds"], errors="coerce").to_numpy(),
+        }
+    )
+    # NaT kick-offs compare False, so unparseable ones drop out with the open events
+    left = left[(log_ids >= 0) & (commence <= now_ts)].sort_values("commence", kind="stable")
+    right = right.dropna().sort_values("closed_at", kind="stable")
+
+    joined = pd.merge_asof(
+        left,
+        right,
+        left_on="commence",
+        right_on="closed_at",
+        by="outcome",
+        direction="backward",
+        allow_exact_matches=False,
+    )
+    # Back to log order; open events and rows without a kick-off or history get no close
+    joined = joined.set_index("row").reindex(np.arange(len(log)))
+    result = log.reset_index(drop=True)
+    result["closing_fair"] = joined["closing_fair"].to_numpy()
+    result["closed_at"] = pd.to_datetime(joined["closed_at"].to_numpy()).tz_localize("UTC")
+    return result
+
+
+def clv_table(
+    log_path: Path,
+    history_path: Path,
+    now: Optional[datetime] = None,
+    since: Optional[datetime] = None,
+) -> pd.DataFrame:
+    """Every logged opportunity with its closing fair and CLV % (NaN when no close yet).
+
+    With ``since``, only opportunities detected from then on (the fair history's
+    retention window) are reported.
+    """
+    log = _read_log(log_path, LOG_COLUMNS)
+    if since is not None and not log.empty:
+        log = log[_category_timestamps(log["detected_at"]) >= np.datetime64(since, "ns")]
+    history = read_history(history_path, log["event_id"].unique())
+    if log.empty:
+        return pd.DataFrame(columns=CLV_COLUMNS)
+    result = closing_fairs(log, history, now)
+    odds = pd.to_numeric(result["best_odds"], errors="coerce")
+    result["clv_percent"] = (odds / result["closing_fair"] - 1.0) * 100
+    return result[CLV_COLUMNS]
+
+
+def write_clv(path: Path, table: pd.DataFrame):
+    """Write the CLV table atomically."""
+    tmp = path.with_name(f".{path.name}.tmp")
+    table.to_csv(tmp, index=False, float_format="%.4f", date_format="%Y-%m-%dT%H:%M:%SZ")
+    os.replace(tmp, path)
+
+
+def summarize(table: pd.DataFrame) -> str:
+    """One-line CLV summary for the run log."""
+    closed = table["clv_percent"].dropna()
+    if closed.empty:
+        return f"{len(table)} opportunities logged, none closed yet"
+    return (
+        f"{len(closed)}/{len(table)} opportunities closed: mean CLV {closed.mean():+.2f}%, "
+        f"{(closed > 0).mean() * 100:.1f}% beat the close"
+    )
+
+
+def main():
+    from pipeline_v2.calculate_opportunities import CLV_CSV, FAIR_HISTORY_CSV, OPPORTUNITY_LOG_CSV
+
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    since = now - timedelta(days=HISTORY_RETENTION_DAYS)
+    table = clv_table(OPPORTUNITY_LOG_CSV, FAIR_HISTORY_CSV, now, since)
+    write_clv(CLV_CSV, table)
+    print(f"✅ Wrote CLV for {len(table)} opportunities to {CLV_CSV}")
+    print(f"[CLV] {summarize(table)} ({time.perf_counter() - started:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
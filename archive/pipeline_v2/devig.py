@@ -0,0 +1,144 @@
+"""
+Batch devig (margin removal) for whole arrays of markets.
+
+Input is a 2-D array of decimal odds, one row per market and one column per
+outcome. Missing outcomes (padding for markets with fewer outcomes) are NaN
+or any price <= 1. Every method returns fair probabilities of the same shape,
+NaN where the outcome is missing, with each valid row summing to 1. Rows with
+fewer than two priced outcomes come back all-NaN.
+
+Methods:
+- multiplicative: scale implied probabilities proportionally (classic devig)
+- additive:       subtract an equal share of the overround from each outcome
+- power:          p_i = q_i ** k, solving sum(p) = 1 for k
+- shin:           Shin (1993) insider-trading model, solving for z
+
+The iterative methods (power, shin) run Newton's method over all markets at
+once - each iteration is a handful of array operations, not a Python loop per
+market.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+DEVIG_METHODS = ("multiplicative", "additive", "power", "shin")
+
+NEWTON_TOL = 1e-12
+NEWTON_MAX_ITER = 50
+
+
+def implied_probabilities(odds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (implied, mask): 1/odds with invalid prices zeroed, and the validity mask.
+
+    Rows with fewer than two valid outcomes are masked out entirely.
+    """
+    odds = np.asarray(odds, dtype=np.float64)
+    if odds.ndim == 1:
+        odds = odds[np.newaxis, :]
+    mask = np.isfinite(odds) & (odds > 1.0)
+    mask &= mask.sum(axis=1, keepdims=True) >= 2
+    implied = np.zeros_like(odds)
+    np.divide(1.0, odds, out=implied, where=mask)
+    return implied, mask
+
+
+def _finish(probs: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    return np.where(mask, probs, np.nan)
+
+
+def devig_multiplicative(odds: np.ndarray) -> np.ndarray:
+    """Proportional devig: p_i = q_i / sum(q)."""
+    q, mask = implied_probabilities(odds)
+    total = q.sum(axis=1, keepdims=True)
+    probs = np.divide(q, total, out=np.zeros_like(q), where=total > 0)
+    return _finish(probs, mask)
+
+
+def devig_additive(odds: np.ndarray) -> np.ndarray:
+    """Additive devig: p_i = q_i - (sum(q) - 1) / n.
+
+    Long shots can go negative under large margins; those are floored at 0 and
+    the row is renormalised.
+    """
+    q, mask = implied_probabilities(odds)
+    n = mask.sum(axis=1, keepdims=True)
+    overround = q.sum(axis=1, keepdims=True) - 1.0
+    share = np.divide(overround, n, out=np.zeros_like(overround), where=n > 0)
+    probs = np.where(mask, np.maximum(q - share, 0.0), 0.0)
+    total = probs.sum(axis=1, keepdims=True)
+    probs = np.divide(probs, total, out=np.zeros_like(probs), where=total > 0)
+    return _finish(probs, mask)
+
+
+def devig_power(odds: np.ndarray, tol: float = NEWTON_TOL, max_iter: int = NEWTON_MAX_ITER):
+    """Power devig: find k per market with sum(q_i ** k) = 1, then p_i = q_i ** k."""
+    q, mask = implied_probabilities(odds)
+    n_markets = q.shape[0]
+    # log(q) with masked outcomes at -inf so q ** k == 0 for them
+    log_q = np.full_like(q, -np.inf)
+    np.log(q, out=log_q, where=mask)
+
+    k = np.ones((n_markets, 1))
+    active = mask.any(axis=1, keepdims=True)
+    for _ in range(max_iter):
+        powered = np.exp(k * log_q)
+        f = powered.sum(axis=1, keepdims=True) - 1.0
+        df = np.where(mask, powered * np.where(mask, log_q, 0.0), 0.0).sum(axis=1, keepdims=True)
+        step = np.divide(f, df, out=np.zeros_like(f), where=active & (df != 0))
+        k -= step
+        if np.max(np.abs(step), initial=0.0) < tol:
+            break
+
+    probs = np.exp(k * log_q)
+    return _finish(probs, mask)
+
+
+def devig_shin(odds: np.ndarray, tol: float = NEWTON_TOL, max_iter: int = NEWTON_MAX_ITER):
+    """Shin devig: solve for the insider share z per market.
+
+    p_i(z) = (sqrt(z^2 + 4 (1 - z) q_i^2 / Q) - z) / (2 (1 - z)),  Q = sum(q)
+    with z chosen so that sum(p_i) = 1.
+    """
+    q, mask = implied_probabilities(odds)
+    n_markets = q.shape[0]
+    big_q = q.sum(axis=1, keepdims=True)
+    q2 = np.divide(q * q, big_q, out=np.zeros_like(q), where=big_q > 0)
+
+    def probs_at(z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        root = np.sqrt(z * z + 4.0 * (1.0 - z) * q2)
+        p = np.where(mask, (root - z) / (2.0 * (1.0 - z)), 0.0)
+        return p, root
+
+    z = np.zeros((n_markets, 1))
+    active = mask.any(axis=1, keepdims=True)
+    for _ in range(max_iter):
+        p, root = probs_at(z)
+        g = p.sum(axis=1, keepdims=True) - 1.0
+        # d/dz of (root - z) / (2 (1 - z))
+        droot = np.divide(z - 2.0 * q2, root, out=np.zeros_like(root), where=root > 0)
+        dp = ((droot - 1.0) * (1.0 - z) + (root - z)) / (2.0 * (1.0 - z) ** 2)
+        dg = np.where(mask, dp, 0.0).sum(axis=1, keepdims=True)
+        step = np.divide(g, dg, out=np.zeros_like(g), where=active & (dg != 0))
+        z = np.clip(z - step, -0.5, 0.5)
+        if np.max(np.abs(step), initial=0.0) < tol:
+            break
+
+    probs, _ = probs_at(z)
+    return _finish(probs, mask)
+
+
+_METHODS = {
+    "multiplicative": devig_multiplicative,
+    "additive": devig_additive,
+    "power": devig_power,
+    "shin": devig_shin,
+}
+
+
+def devig(odds: np.ndarray, method: str = "multiplicative") -> np.ndarray:
+    """Devig a (markets x outcomes) odds array with the named method."""
+    try:
+        return _METHODS[method](odds)
+    except KeyError:
+        raise ValueError(f"Unknown devig method '{method}' (expected one of {DEVIG_METHODS})")
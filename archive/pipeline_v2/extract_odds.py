@@ -10,7 +10,9 @@ Configuration:
 - Regions: AU, US (optimized for cost)
 - Format: Decimal odds (oddsFormat=decimal)
 - Time filter: Events starting >5min from now, <48hrs from now
-- Filters: 2-way markets only (Over/Under), DK+FD coverage required
+- Filters: player props must be Over/Under pairs; h2h may be 2-way or 3-way (with Draw)
+- Alternates: alternate_spreads / alternate_totals per event (ENABLE_ALTERNATES=true)
+- Futures: OUTRIGHT_SPORTS (e.g. basketball_nba_championship_winner) fetch outrights only
 """
 
 import csv
@@ -19,12 +21,15 @@ import sys
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import Dict, List
 
 import pandas as pd
 import requests
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
 
+from pipeline_v2.api_artifacts import publish_artifact
+
 # Load environment - look for .env in project root
 env_paths = [
     Path(__file__).parent.parent.parent / ".env",  # src/pipeline_v2 -> root/.env
@@ -71,12 +76,16 @@ def get_data_dir():
 
 DATA_DIR = get_data_dir()
 RAW_CSV = DATA_DIR / "raw_odds_pure.csv"
+# Default /api/odds/raw page size, published pre-encoded after each write
+API_RAW_PAGE_LIMIT = 500
 
 # API Configuration
 ODDS_API_HOST = "https://api.the-odds-api.com"
 # Sports list - reads from SPORTS env var (comma-separated), or uses default
 DEFAULT_SPORTS = "basketball_nba,basketball_nbl,americanfootball_nfl,americanfootball_ncaaf,icehockey_nhl,baseball_mlb,soccer_epl,soccer_uefa_champs_league,tennis_atp,tennis_wta,cricket_big_bash,cricket_ipl"
 SPORTS = [s.strip() for s in os.getenv("SPORTS", DEFAULT_SPORTS).split(",")]
+# Futures sports keys (outright winner markets), comma-separated; default none
+OUTRIGHT_SPORTS = [s.strip() for s in os.getenv("OUTRIGHT_SPORTS", "").split(",") if s.strip()]
 # Include EU to ensure Pinnacle is returned by The Odds API
 # Cost note: adding EU increases credits vs au,us only
 REGIONS = os.getenv("REGIONS", "au,us,eu")
@@ -139,6 +148,11 @@ EPL_PROPS = [
     "player_to_receive_card",  # Yellow/red cards
 ] if ENABLE_PROPS else []
 
+# Alternate lines - every extra spread/total line a book offers, fetched per event like props.
+# 10-30x the rows of the main lines; enable via ENABLE_ALTERNATES=true (default: false)
+ENABLE_ALTERNATES = os.getenv("ENABLE_ALTERNATES", "false").lower() == "true"
+ALTERNATE_MARKETS = ["alternate_spreads", "alternate_totals"] if ENABLE_ALTERNATES else []
+
 # Base columns (same for all rows)
 BASE_HEADERS = [
     "timestamp",
@@ -361,6 +375,29 @@ def is_two_way_market(market_data: Dict) -> bool:
     return False
 
 
+def is_supported_market(market_data: Dict) -> bool:
+    """Check if the EV stage can price this market.
+
+    - h2h / h2h_lay: 2-way, or 3-way when one outcome is the Draw (soccer match result)
+    - spreads / totals: exactly 2 outcomes
+    - outrights: any field of 2+ runners (futures)
+    - alternate_spreads / alternate_totals: a ladder of lines, two outcomes per line
+    - everything else (player props): Over/Under pairs, see is_two_way_market
+    """
+    outcomes = market_data.get("outcomes", [])
+    market_key = market_data.get("key", "")
+
+    if market_key in ["h2h", "h2h_lay"]:
+        if len(outcomes) == 3:
+            return any(o.get("name", "").lower() == "draw" for o in outcomes)
+        return len(outcomes) == 2
+    if market_key == "outrights":
+        return len(outcomes) >= 2
+    if market_key in ["alternate_spreads", "alternate_totals"]:
+        return len(outcomes) >= 2 and len(outcomes) % 2 == 0
+    return is_two_way_market(market_data)
+
+
 def has_dk_and_fd_odds(bookmakers: List[Dict]) -> bool:
     """Check if this event/market has odds from BOTH Draftkings AND Fanduel.
     Filters to only markets with sharp book coverage to save API credits.
@@ -391,7 +428,7 @@ def fetch_raw_odds(sport_key: str, markets: List[str]) -> List[Dict]:
     Fetch raw odds from API with decimal format.
     Returns list of raw event data (one per event, not expanded).
     """
-    stable_markets = ["h2h", "spreads", "totals"]
+    stable_markets = ["h2h", "spreads", "totals", "outrights"]
     markets_to_fetch = [m for m in stable_markets if m in markets]
 
     if not markets_to_fetch:
@@ -433,13 +470,18 @@ def fetch_raw_odds(sport_key: str, markets: List[str]) -> List[Dict]:
         return list(all_events.values())
 
 
+def get_event_markets_for_sport(sport_key: str) -> List[str]:
+    """Markets only available per event: player props plus alternate lines."""
+    return get_props_for_sport(sport_key) + ALTERNATE_MARKETS
+
+
 def fetch_player_props(sport_key: str, events: List[Dict]) -> List[Dict]:
     """
-    Fetch player props for events within time window.
+    Fetch player props (and alternate lines) for events within time window.
     Uses per-event /events/{eventId}/odds endpoint.
     Filters to only events with DK+FD coverage for cost optimization.
     """
-    props_markets = get_props_for_sport(sport_key)
+    props_markets = get_event_markets_for_sport(sport_key)
     if not props_markets:
         print(f"[!] No props defined for {sport_key} – returning original events")
         return events  # Return core market events when props disabled
@@ -484,11 +526,11 @@ def fetch_player_props(sport_key: str, events: List[Dict]) -> List[Dict]:
                         for m in prop_bm.get("markets", []):
                             if m.get("key") not in [
                                 om.get("key") for om in orig_markets
-                            ] and is_two_way_market(m):
+                            ] and is_supported_market(m):
                                 orig_bm["markets"].append(m)
                     else:
                         filtered_markets = [
-                            m for m in prop_bm.get("markets", []) if is_two_way_market(m)
+                            m for m in prop_bm.get("markets", []) if is_supported_market(m)
                         ]
                         if filtered_markets:
                             prop_bm["markets"] = filtered_markets
@@ -590,6 +632,43 @@ def filter_rows_by_dk_fd(rows: List[Dict], verbose: bool = False) -> List[Dict]:
     return rows
 
 
+def raw_page_cell(col: str, val):
+    """A cell as /api/odds/raw serves it after a CSV round trip."""
+    if col in BASE_HEADERS:
+        return "" if val is None else str(val)
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return None
+
+
+def publish_raw_page(rows: List[Dict], headers: List[str]):
+    """Pre-encode the first /api/odds/raw page of the rows just written to RAW_CSV.
+
+    next_cursor uses the API's row-index generation (mtime_ns and size in hex).
+    """
+    page = [
+        {col: raw_page_cell(col, row.get(col)) for col in headers}
+        for row in rows[:API_RAW_PAGE_LIMIT]
+    ]
+    stamps = [str(row.get("timestamp") or row.get("commence_time") or "") for row in rows]
+    stat = RAW_CSV.stat()
+    more = len(rows) > API_RAW_PAGE_LIMIT
+    body = {
+        "rows": page,
+        "count": len(page),
+        "total_count": len(rows),
+        "columns": headers,
+        "last_updated": max(stamps, default="") or datetime.now(timezone.utc).isoformat(),
+        "next_cursor": (
+            f"{stat.st_mtime_ns:x}{stat.st_size:x}:{API_RAW_PAGE_LIMIT - 1}" if more else None
+        ),
+    }
+    params = {"limit": API_RAW_PAGE_LIMIT, "offset": 0}
+    if publish_artifact(DATA_DIR, "odds_raw", body, params, RAW_CSV):
+        print(f"[API] Published pre-encoded /api/odds/raw page 1 ({len(page)} rows)")
+
+
 def append_to_csv(rows: List[Dict]):
     """Write rows to CSV file (REPLACE mode to prevent bloat) and database."""
     if not rows:
@@ -623,6 +702,10 @@ def append_to_csv(rows: List[Dict]):
             print(f"[CSV] Wrote {len(rows)} rows (REPLACE mode - old data cleared)")
             print(f"[CSV] Headers ({len(final_headers)}): {', '.join(final_headers[:20])}...")
             csv_success = True
+        try:
+            publish_raw_page(rows, final_headers)
+        except Exception as e:
+            print(f"[!] API artifact publish failed (non-fatal): {e}")
 
     except PermissionError as e:
         fallback = (
@@ -694,7 +777,8 @@ def process_sport(sport_key: str, timestamp: str) -> List[Dict]:
     """Fetch and process a single sport (for parallel execution)."""
     print(f"\n=== {sport_key.upper()} ===")
 
-    core_markets = ["h2h", "spreads", "totals"]
+    is_outright = sport_key in OUTRIGHT_SPORTS
+    core_markets = ["outrights"] if is_outright else ["h2h", "spreads", "totals"]
     print(f"[API] Fetching core markets: {core_markets}")
 
     events = fetch_raw_odds(sport_key, core_markets)
@@ -704,8 +788,12 @@ def process_sport(sport_key: str, timestamp: str) -> List[Dict]:
 
     print(f"[OK] Got {len(events)} core market events")
 
-    print(f"[*] Fetching player props...")
-    events_with_props = fetch_player_props(sport_key, events)
+    if is_outright:
+        # Futures have no per-event props
+        events_with_props = events
+    else:
+        print(f"[*] Fetching player props...")
+        events_with_props = fetch_player_props(sport_key, events)
 
     rows = expand_to_rows(events_with_props, timestamp)
     print(f"[OK] Expanded to {len(rows)} rows")
@@ -739,11 +827,12 @@ def main():
     all_rows = []
 
     # Fetch all sports in parallel (4-5 concurrent threads)
-    print(f"\n[PARALLEL] Fetching {len(SPORTS)} sports concurrently...")
+    sports = SPORTS + [s for s in OUTRIGHT_SPORTS if s not in SPORTS]
+    print(f"\n[PARALLEL] Fetching {len(sports)} sports concurrently...")
     with ThreadPoolExecutor(max_workers=5) as executor:
         # Submit all sports at once
         futures = {
-            executor.submit(process_sport, sport_key, timestamp): sport_key for sport_key in SPORTS
+            executor.submit(process_sport, sport_key, timestamp): sport_key for sport_key in sports
         }
 
         # Collect results as they complete
@@ -0,0 +1,73 @@
+"""
+Bounded top-K leaderboards of EV opportunities.
+
+Each board is a min-heap of at most k (score, -seq, item) entries: a new item
+only displaces the heap's weakest entry, so keeping the top k of n items costs
+O(n log k) time and O(k) memory per board no matter how many opportunities
+stream past. Ties keep the item that arrived first (larger -seq wins).
+
+Boards are kept for the whole slate, per sport, per market and per
+(sport, market), and published as one JSON document sorted best first.
+"""
+
+import heapq
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+BOARD_GROUPS = ("all", "sport", "market", "sport_market")
+
+
+def new_leaderboards(k: int) -> Dict:
+    """Empty leaderboards keeping the top k items of every board."""
+    return {"k": k, "seq": 0, "boards": {group: {} for group in BOARD_GROUPS}, "counts": {}}
+
+
+def offer(leaderboards: Dict, item: Dict, score: float, sport: str, market: str):
+    """Offer one item to the overall, sport, market and sport/market boards."""
+    k = leaderboards["k"]
+    leaderboards["seq"] += 1
+    entry = (score, -leaderboards["seq"], item)
+    names = {"all": "all", "sport": sport, "market": market, "sport_market": f"{sport}|{market}"}
+    for group, name in names.items():
+        counts = leaderboards["counts"].setdefault(group, {})
+        counts[name] = counts.get(name, 0) + 1
+        heap = leaderboards["boards"][group].setdefault(name, [])
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+
+def ranked(heap: List) -> List[Dict]:
+    """Board items, best first."""
+    return [item for _, _, item in sorted(heap, key=lambda e: e[:2], reverse=True)]
+
+
+def leaderboards_document(leaderboards: Dict, render: Callable | None = None, **extra) -> Dict:
+    """JSON-ready leaderboards plus metadata.
+
+    Each board is {"count": items offered, "rows": top k best first}; "all" is one
+    board, the other groups map a sport / market / "sport|market" name to a board.
+    Rows are passed through ``render`` (only the k kept items are ever rendered).
+    """
+    render = render or (lambda item: item)
+    doc = {"generated_at": datetime.utcnow().isoformat(), "k": leaderboards["k"], **extra}
+    for group, boards in leaderboards["boards"].items():
+        counts = leaderboards["counts"].get(group, {})
+        doc[group] = {
+            name: {"count": counts.get(name, 0), "rows": [render(item) for item in ranked(heap)]}
+            for name, heap in sorted(boards.items())
+        }
+    doc["all"] = doc["all"].get("all", {"count": 0, "rows": []})
+    return doc
+
+
+def write_leaderboards(path: Path, document: Dict):
+    """Write the document atomically (readers never see a partial file)."""
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(document, f, separators=(",", ":"), default=str)
+    os.replace(tmp, path)
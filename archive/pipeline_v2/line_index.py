@@ -0,0 +1,130 @@
+"""
+Sorted line index for interpolating fair prices across spreads/totals lines.
+
+Every outcome that already has a sharp fair price is an anchor:
+(side_id, line, fair probability), where side_id identifies one
+(event, market, side) - e.g. the Over of an NBA game's totals, or one team's
+spread. Anchors are sorted once by (side_id, line) into a single composite
+key, so neighbours for the whole slate's unpriced lines come from one
+np.searchsorted call (O(log n) each) instead of a search per bucket.
+
+Lookup rules for an unpriced line x on a side:
+- interpolate: anchors on both sides of x, each within max_gap -> linear in probability
+- carry: otherwise, the nearest anchor if within carry_gap (0 disables carry)
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+SOURCE_NONE = 0
+SOURCE_INTERP = 1
+SOURCE_CARRY = 2
+
+
+def build_line_index(
+    side_ids: np.ndarray, lines: np.ndarray, probs: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Sort anchors by (side_id, line). Returns a dict of parallel arrays."""
+    side_ids = np.asarray(side_ids, dtype=np.int64)
+    lines = np.asarray(lines, dtype=np.float64)
+    order = np.lexsort((lines, side_ids))
+    index = {
+        "side": side_ids[order],
+        "line": lines[order],
+        "prob": np.asarray(probs, dtype=np.float64)[order],
+    }
+    index["key"] = _composite_key(index["side"], index["line"], *_key_range(index["line"]))
+    return index
+
+
+def _key_range(lines: np.ndarray) -> Tuple[float, float]:
+    if len(lines) == 0:
+        return 0.0, 1.0
+    low = float(lines.min())
+    return low, float(lines.max()) - low + 1.0
+
+
+def _composite_key(side: np.ndarray, line: np.ndarray, low: float, scale: float) -> np.ndarray:
+    # Lines are clipped into [low, low + scale) so a query never spills into the next side
+    offset = np.clip(line - low, -0.5, scale - 0.5) + 0.5
+    return side * (scale + 1.0) + offset
+
+
+def interpolate_lines(
+    index: Dict[str, np.ndarray],
+    side_ids: np.ndarray,
+    lines: np.ndarray,
+    max_gap: float,
+    carry_gap: float = 0.0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Fair probability for each (side_id, line) query from its anchored neighbours.
+
+    Returns (probs, source): probs is 0 where no estimate is allowed, source is
+    SOURCE_INTERP / SOURCE_CARRY / SOURCE_NONE per query.
+    """
+    side_ids = np.asarray(side_ids, dtype=np.int64)
+    lines = np.asarray(lines, dtype=np.float64)
+    probs = np.zeros(len(lines))
+    source = np.full(len(lines), SOURCE_NONE, dtype=np.int8)
+    n_anchors = len(index["key"])
+    if n_anchors == 0 or len(lines) == 0:
+        return probs, source
+
+    low, scale = _key_range(index["line"])
+    pos = np.searchsorted(index["key"], _composite_key(side_ids, lines, low, scale))
+    right = np.minimum(pos, n_anchors - 1)
+    left = np.maximum(pos - 1, 0)
+    has_right = (pos < n_anchors) & (index["side"][right] == side_ids)
+    has_left = (pos > 0) & (index["side"][left] == side_ids)
+
+    gap_left = np.where(has_left, lines - index["line"][left], np.inf)
+    gap_right = np.where(has_right, index["line"][right] - lines, np.inf)
+
+    interp = (gap_left <= max_gap) & (gap_right <= max_gap)
+    span = gap_left + gap_right
+    weight = np.divide(gap_left, span, out=np.zeros_like(span), where=interp & (span > 0))
+    interp_probs = index["prob"][left] + (index["prob"][right] - index["prob"][left]) * weight
+    probs[interp] = interp_probs[interp]
+    source[interp] = SOURCE_INTERP
+
+    nearest_left = gap_left <= gap_right
+    nearest_gap = np.where(nearest_left, gap_left, gap_right)
+    carry = ~interp & (nearest_gap <= carry_gap)
+    carry_probs = np.where(nearest_left, index["prob"][left], index["prob"][right])
+    probs[carry] = carry_probs[carry]
+    source[carry] = SOURCE_CARRY
+
+    return probs, source
+
+
+def fill_unpriced_lines(
+    fair: np.ndarray,
+    priced: np.ndarray,
+    side_ids: np.ndarray,
+    lines: np.ndarray,
+    max_gap: float,
+    carry_gap: float = 0.0,
+) -> np.ndarray:
+    """Fill fair prices of unpriced 2-way line markets from the priced ones, in place.
+
+    fair, side_ids and lines are (markets, outcomes); side_id < 0 marks an outcome
+    that is not on a line market. The priced outcomes are the anchors. A market is
+    filled only when every outcome gets an estimate, and priced is updated to match.
+    Returns the per-market source (SOURCE_NONE = sharp-priced or left unpriced).
+    """
+    is_line = side_ids >= 0
+    anchor = is_line & priced[:, np.newaxis]
+    index = build_line_index(side_ids[anchor], lines[anchor], 1.0 / fair[anchor])
+
+    query = is_line & ~priced[:, np.newaxis]
+    probs, found = interpolate_lines(index, side_ids[query], lines[query], max_gap, carry_gap)
+    estimate = np.zeros(fair.shape)
+    estimate[query] = probs
+    found_by_outcome = np.full(fair.shape, SOURCE_NONE, dtype=np.int8)
+    found_by_outcome[query] = found
+
+    filled = ~priced & (found_by_outcome != SOURCE_NONE).all(axis=1)
+    fair[filled] = 1.0 / estimate[filled]
+    priced |= filled
+    return np.where(filled, found_by_outcome.max(axis=1), SOURCE_NONE).astype(np.int8)
@@ -0,0 +1,143 @@
+"""
+Padded outcome matrices for N-way markets.
+
+Markets are batched into odds tensors of shape (markets, width, books), where
+width is the smallest WIDTH_CLASSES entry that fits the market's outcome count.
+Outcomes past a market's own count are padding and every price <= 1 (or NaN)
+is "not quoted", so 2-way totals, 3-way soccer h2h and futures all go through
+the same array code. Batching by width class keeps 2-way markets in a
+(markets, 2, books) tensor instead of padding them out to the widest market.
+
+Fair prices come from the sharp columns only:
+- devig_method "none": per outcome, 1 / weighted mean of 1/price over the sharp
+  books quoting it (the original two-way formula, at least 2 books per outcome)
+- otherwise: each sharp book quoting every outcome of the market is devigged
+  with pipeline_v2.devig and the weighted mean of its fair probabilities taken
+  (at least 2 such books)
+
+Before weighting, outlier_mask can drop sharp quotes far from the outcome's
+median across books (a stale or mistyped feed), for the whole tensor at once.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+from pipeline_v2.devig import devig
+
+WIDTH_CLASSES = (2, 3, 4, 8, 16, 32, 64)
+
+
+def width_class(n_outcomes: int) -> int:
+    """Smallest padded width holding n_outcomes (0 if too wide)."""
+    for width in WIDTH_CLASSES:
+        if n_outcomes <= width:
+            return width
+    return 0
+
+
+def outcome_mask(n_outcomes: np.ndarray, width: int) -> np.ndarray:
+    """(markets, width) mask of real (non-padding) outcomes."""
+    return np.arange(width)[np.newaxis, :] < np.asarray(n_outcomes)[:, np.newaxis]
+
+
+def _masked_median(values: np.ndarray, mask: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Median over the last axis of the masked-in values (0 where none)."""
+    ordered = np.sort(np.where(mask, values, np.inf), axis=-1)
+    low = np.take_along_axis(ordered, np.maximum((counts - 1) // 2, 0)[..., np.newaxis], -1)
+    high = np.take_along_axis(ordered, (counts // 2)[..., np.newaxis], -1)
+    return np.where(counts > 0, (low[..., 0] + high[..., 0]) / 2, 0.0)
+
+
+def outlier_mask(
+    odds: np.ndarray,
+    method: str = "mad",
+    tolerance: float = 0.03,
+    mad_k: float = 3.5,
+    min_books: int = 3,
+) -> np.ndarray:
+    """Quotes of a (markets, width, books) odds tensor that are outliers for their outcome.
+
+    Each outcome's quotes are compared with their median across books. A quote
+    within ``tolerance`` (a fraction of the median) is always kept. Beyond it,
+    "relative" rejects the quote, and "mad" rejects it only past mad_k robust
+    standard deviations (1.4826 * median absolute deviation). Outcomes quoted by
+    fewer than min_books books are left alone. "none" rejects nothing.
+    """
+    quoted = odds > 1.0
+    if method == "none":
+        return np.zeros(odds.shape, dtype=bool)
+    counts = quoted.sum(axis=-1)
+    median = _masked_median(odds, quoted, counts)
+    deviation = np.abs(odds - median[..., np.newaxis])
+    limit = tolerance * median
+    if method == "mad":
+        mad = _masked_median(deviation, quoted, counts)
+        limit = np.maximum(limit, mad_k * 1.4826 * mad)
+    elif method != "relative":
+        raise ValueError(f"Unknown outlier method: {method}")
+    return quoted & (counts >= min_books)[..., np.newaxis] & (deviation > limit[..., np.newaxis])
+
+
+def sharp_fair_prices(
+    sharp_odds: np.ndarray,
+    book_weights: np.ndarray,
+    n_outcomes: np.ndarray,
+    devig_method: str = "none",
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Fair decimal odds per outcome from a (markets, width, sharp_books) odds tensor.
+
+    book_weights is (markets, sharp_books): rating * sport weight.
+    Returns (fair, sharp_count): fair is (markets, width) with 0 where no fair price
+    exists (and on padding); sharp_count is per market, the count on the weakest
+    outcome ("none") or the number of complete books (devig methods).
+    """
+    n_markets, width, _ = sharp_odds.shape
+    real = outcome_mask(n_outcomes, width)
+    quoted = sharp_odds > 1.0
+    fair = np.zeros((n_markets, width))
+
+    if devig_method == "none":
+        weights = book_weights[:, np.newaxis, :]
+        inverse = np.divide(1.0, sharp_odds, out=np.zeros_like(sharp_odds), where=quoted)
+        weighted_sum = (inverse * weights).sum(axis=2)
+        total_weight = np.where(quoted, weights, 0.0).sum(axis=2)
+        counts = quoted.sum(axis=2)
+        ok = real & (counts >= 2) & (weighted_sum > 0) & (total_weight > 0)
+        fair[ok] = 1.0 / (weighted_sum[ok] / total_weight[ok])
+        sharp_count = np.where(real, counts, np.iinfo(np.int64).max).min(axis=1)
+        return fair, sharp_count
+
+    # A book is usable only if it quotes every real outcome of the market
+    complete = (quoted | ~real[:, :, np.newaxis]).all(axis=1)
+    sharp_count = complete.sum(axis=1)
+    by_book = np.where(quoted & complete[:, np.newaxis, :], sharp_odds, np.nan)
+    by_book = by_book.transpose(0, 2, 1).reshape(-1, width)
+    probs = devig(by_book, devig_method).reshape(n_markets, -1, width)
+
+    weights = np.where(complete, book_weights, 0.0)
+    total_weight = weights.sum(axis=1)
+    weighted = np.where(complete[:, :, np.newaxis], probs, 0.0) * weights[:, :, np.newaxis]
+    prob = np.divide(
+        weighted.sum(axis=1),
+        total_weight[:, np.newaxis],
+        out=np.zeros((n_markets, width)),
+        where=total_weight[:, np.newaxis] > 0,
+    )
+    ok = real & (sharp_count >= 2)[:, np.newaxis] & (prob > 0)
+    fair[ok] = 1.0 / prob[ok]
+    return fair, sharp_count
+
+
+def priced_markets(fair: np.ndarray, sharp_count: np.ndarray, n_outcomes: np.ndarray):
+    """Markets where every real outcome has a fair price > 1 and sharps are present."""
+    real = outcome_mask(n_outcomes, fair.shape[1])
+    return ((fair > 1.0) | ~real).all(axis=1) & (sharp_count > 0)
+
+
+def ev_matrix(target_odds: np.ndarray, fair: np.ndarray) -> np.ndarray:
+    """EV (odds / fair - 1) per (market, outcome, target book); NaN where not priced."""
+    valid = (target_odds > 1.0) & (fair > 1.0)[:, :, np.newaxis]
+    ev = np.full(target_odds.shape, np.nan)
+    np.divide(target_odds, fair[:, :, np.newaxis], out=ev, where=valid)
+    return ev - 1.0
@@ -0,0 +1,81 @@
+"""
+Middles across adjacent spreads/totals lines.
+
+A middle backs the low side of one line and the high side of a higher line, e.g.
+Over 210.5 at one book with Under 213.5 at another: any total strictly between
+the two lines wins both bets. Spreads are put on the same axis by normalizing to
+the home team's winning margin: Home -3.5 covers when margin > 3.5 (low leg,
+threshold -point), Away +6.5 covers when margin < 6.5 (high leg, threshold point).
+
+Each (event, market, player) is one ladder. Low and high legs are sorted once by
+(ladder, threshold) into a composite key; for every low leg at L the window
+partners are the high legs with L + min_width <= H <= L + max_width. Because both
+bounds only move forward as L increases, they are found with a two-pointer sweep
+(done for the whole slate at once with np.searchsorted over the sorted keys)
+instead of comparing every pair.
+
+Legs are staked to pay the same either way (stake ∝ 1/odds), so with fair
+probabilities p_low, p_high the combined EV is (p_low + p_high) * payout - 1,
+where payout = 1 / (1/o_low + 1/o_high) per unit staked, and the chance of
+landing in the window (both win) is p_low + p_high - 1.
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+def _ladder_keys(ladder: np.ndarray, threshold: np.ndarray, span: float) -> np.ndarray:
+    return ladder * span + threshold
+
+
+def middle_windows(
+    ladder: np.ndarray,
+    kind: np.ndarray,
+    threshold: np.ndarray,
+    min_width: float,
+    max_width: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(low, high) leg index pairs whose window width is within [min_width, max_width].
+
+    kind is 0 for a low leg (Over / home side), 1 for a high leg (Under / away side).
+    """
+    ladder = np.asarray(ladder, dtype=np.int64)
+    threshold = np.asarray(threshold, dtype=np.float64)
+    lows, highs = np.flatnonzero(kind == 0), np.flatnonzero(kind == 1)
+    if len(lows) == 0 or len(highs) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    # Shift thresholds to >= 0 and space ladders so a window never reaches the next ladder
+    low_threshold = threshold.min()
+    span = threshold.max() - low_threshold + max_width + 1.0
+    keys = _ladder_keys(ladder, threshold - low_threshold, span)
+    lows = lows[np.argsort(keys[lows], kind="stable")]
+    highs = highs[np.argsort(keys[highs], kind="stable")]
+
+    high_keys = keys[highs]
+    start = np.searchsorted(high_keys, keys[lows] + min_width, side="left")
+    end = np.searchsorted(high_keys, keys[lows] + max_width, side="right")
+    counts = np.maximum(end - start, 0)
+
+    # Expand each low leg's [start, end) run of high legs into pairs
+    total = int(counts.sum())
+    run_start = np.repeat(np.cumsum(counts) - counts, counts)
+    pos = np.arange(total) - run_start + np.repeat(start, counts)
+    return np.repeat(lows, counts), highs[pos]
+
+
+def middle_value(
+    odds_low: np.ndarray, odds_high: np.ndarray, prob_low: np.ndarray, prob_high: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Equal-payout stake split and combined EV per unit staked for each middle."""
+    inverse = 1.0 / odds_low + 1.0 / odds_high
+    payout = 1.0 / inverse
+    return {
+        "stake_low": (1.0 / odds_low) * payout,
+        "stake_high": (1.0 / odds_high) * payout,
+        "miss_return": payout - 1.0,
+        "hit_return": 2.0 * payout - 1.0,
+        "middle_prob": np.maximum(prob_low + prob_high - 1.0, 0.0),
+        "ev": (prob_low + prob_high) * payout - 1.0,
+    }
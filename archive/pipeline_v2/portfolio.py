@@ -0,0 +1,156 @@
+"""
+Portfolio stake sizing across all open EV opportunities.
+
+kelly_stake sizes every hit on its own, so a dozen hits on one game can stake
+far more than the 10% any single bet is capped at. This stage sizes the whole
+hit list together, vectorized over all hits:
+
+1. One bet per outcome: the same selection at several books is one outcome, so
+   only its best price is staked (the other books' rows get 0).
+2. Simultaneous Kelly per market bucket: a bucket's outcomes are mutually
+   exclusive (Over/Under, Home/Draw/Away, both sides of a spread), so they are
+   sized together with the Smoczynski-Tomkins algorithm - exact Kelly for one
+   race: sort by expected return p*o, keep adding outcomes while p*o exceeds
+   the reserve rate R = (1 - sum p) / (1 - sum 1/o), then f_i = p_i - R / o_i.
+3. Fractional Kelly, then proportional scaling so no event's total stake
+   exceeds max_event_exposure and the whole book stays under max_total_exposure.
+
+Buckets are treated as independent bets (buckets of one event share the event
+cap instead) - a fractional approximation of full simultaneous Kelly across
+events, which has no closed form.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+def _codes(keys: List) -> np.ndarray:
+    index: Dict = {}
+    return np.array([index.setdefault(k, len(index)) for k in keys], dtype=np.int64)
+
+
+def bucket_line(opp: Dict) -> str:
+    """Line identifying the opportunity's market bucket (spreads by home handicap)."""
+    line = opp.get("line", "")
+    if line in ("", None):
+        return ""
+    try:
+        value = float(line)
+    except (TypeError, ValueError):
+        return str(line)
+    if _market_family(opp.get("market", "")) == "spreads" and (
+        opp.get("selection") == opp.get("away_team")
+    ):
+        value = -value
+    return str(value + 0.0)
+
+
+def _market_family(market: str) -> str:
+    # alternate_spreads -3.5 and spreads -3.5 are the same bet
+    return market[len("alternate_") :] if market.startswith("alternate_") else market
+
+
+def opportunity_keys(opportunities: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Integer (bucket, outcome, event) codes for every opportunity."""
+    buckets = []
+    for opp in opportunities:
+        market = _market_family(opp.get("market", ""))
+        player = opp.get("player", "") if market.startswith("player_") else ""
+        buckets.append((opp.get("sport"), opp.get("event_id"), market, bucket_line(opp), player))
+    outcomes = [bucket + (opp.get("selection"),) for bucket, opp in zip(buckets, opportunities)]
+    events = [(opp.get("sport"), opp.get("event_id")) for opp in opportunities]
+    return _codes(buckets), _codes(outcomes), _codes(events)
+
+
+def best_price_mask(outcome: np.ndarray, odds: np.ndarray) -> np.ndarray:
+    """True for the single best-priced row of each outcome."""
+    order = np.lexsort((-odds, outcome))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = outcome[order[1:]] != outcome[order[:-1]]
+    mask = np.zeros(len(order), dtype=bool)
+    mask[order[first]] = True
+    return mask
+
+
+def simultaneous_kelly(prob: np.ndarray, odds: np.ndarray, bucket: np.ndarray) -> np.ndarray:
+    """Full-Kelly bankroll fractions for bets grouped into mutually exclusive buckets.
+
+    One entry per distinct outcome; each bucket is solved with Smoczynski-Tomkins.
+    """
+    n = len(prob)
+    fractions = np.zeros(n)
+    if n == 0:
+        return fractions
+
+    expected = prob * odds
+    order = np.lexsort((-expected, bucket))
+    b, p, inv, er = bucket[order], prob[order], 1.0 / odds[order], expected[order]
+
+    starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+    group = np.cumsum(np.r_[True, b[1:] != b[:-1]]) - 1
+
+    def within(values: np.ndarray) -> np.ndarray:
+        # Inclusive cumulative sum restarted at each bucket
+        total = np.cumsum(values)
+        return total - (total - values)[starts][group]
+
+    sum_p = within(p)
+    sum_inv = within(inv)
+    before_p, before_inv = sum_p - p, sum_inv - inv
+
+    # Outcome k joins while its expected return beats the reserve rate of the set before it
+    reserve_before = np.divide(
+        np.maximum(1.0 - before_p, 0.0),
+        1.0 - before_inv,
+        out=np.full(n, np.inf),
+        where=(1.0 - before_inv) > 0,
+    )
+    fails = (er <= reserve_before).astype(np.int64)
+    included = within(fails) == 0
+
+    n_included = np.bincount(group, weights=included, minlength=len(starts)).astype(np.int64)
+    last = starts + np.maximum(n_included, 1) - 1
+    reserve = np.divide(
+        np.maximum(1.0 - sum_p[last], 0.0),
+        1.0 - sum_inv[last],
+        out=np.zeros(len(starts)),
+        where=(1.0 - sum_inv[last]) > 0,
+    )
+    sized = np.where(included, np.maximum(p - reserve[group] * inv, 0.0), 0.0)
+    fractions[order] = sized
+    return fractions
+
+
+def size_portfolio(
+    opportunities: List[Dict],
+    bankroll: float,
+    kelly_fraction: float,
+    max_event_exposure: float = 0.10,
+    max_total_exposure: float = 1.0,
+) -> np.ndarray:
+    """Stake per opportunity (same order), sized as one portfolio."""
+    if not opportunities:
+        return np.zeros(0)
+    odds = np.array([float(o.get("odds_decimal") or 0) for o in opportunities])
+    fair = np.array([float(o.get("fair_odds") or 0) for o in opportunities])
+    bucket, outcome, event = opportunity_keys(opportunities)
+
+    bet = best_price_mask(outcome, odds) & (odds > 1) & (fair > 1)
+    stakes = np.zeros(len(opportunities))
+    idx = np.flatnonzero(bet)
+    stakes[idx] = (
+        simultaneous_kelly(1.0 / fair[idx], odds[idx], bucket[idx]) * kelly_fraction * bankroll
+    )
+
+    event_total = np.bincount(event, weights=stakes)
+    event_cap = max_event_exposure * bankroll
+    scale = np.divide(
+        event_cap, event_total, out=np.ones_like(event_total), where=event_total > event_cap
+    )
+    stakes *= scale[event]
+
+    total = stakes.sum()
+    if total > max_total_exposure * bankroll:
+        stakes *= max_total_exposure * bankroll / total
+    return stakes
@@ -5,8 +5,12 @@ Each bookmaker gets a 1-4 star rating (reliability/sharpness).
 Users can customize weights per rating tier via environment or code.
 """
 
+import json
 import os
-from typing import Dict, Optional
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
 
 # ============================================================================
 # BOOKMAKER RATINGS (1-4 stars)
@@ -235,8 +239,8 @@ def calculate_book_weight(book_name: str, weights: Dict[int, float]) -> float:
     rating = BOOKMAKER_RATINGS.get(book_name, 1)
     tier_weight = weights.get(rating, weights[1])
 
-    # Count how many books have this rating
-    books_in_tier = sum(1 for r in BOOKMAKER_RATINGS.values() if r == rating)
+    # Books per rating, counted once at import
+    books_in_tier = TIER_COUNTS[rating]
 
     if books_in_tier == 0:
         return 0.0
@@ -261,6 +265,175 @@ def get_sharp_books_only(weights: Optional[Dict[int, float]] = None) -> Dict[str
     return sharps
 
 
+TIER_COUNTS = Counter(BOOKMAKER_RATINGS.values())
+
+# ============================================================================
+# COMPILED WEIGHT TABLES (hot reloaded)
+# ============================================================================
+# The EV engine prices whole batches against one column order of books, so sharp
+# weights are compiled once per (column order, profile generation) into read-only
+# arrays indexed by book position: no dict or environment lookups while pricing.
+#
+# RATINGS_PROFILE_PATH may name a JSON profile overriding the defaults:
+#   {"ratings": {"Pinnacle": 4, ...},               # star ratings (>= 3 is sharp)
+#    "sport_weights": {"icehockey_nhl": 1.2, ...},  # sport scalers
+#    "book_weights": {"basketball_nba": {"Pinnacle": 0.31, ...}, "default": {...},
+#                     "basketball_nba|props": {"Pinnacle": 0.12, ...}}}
+# book_weights replace rating-based weights for a sport; books missing from that
+# sport's map get no weight there. A "sport|market class" entry (see market_class)
+# applies to that sport's markets of the class instead. The file is re-read when
+# its mtime changes.
+
+RATINGS_PROFILE_PATH = os.getenv("RATINGS_PROFILE_PATH", "")
+SHARP_MIN_RATING = 3
+
+_profile_state = {"generation": 0, "mtime": None, "profile": {}}
+_table_cache: Dict[tuple, Dict] = {}
+
+
+def market_class(market: str) -> str:
+    """Weight class of a market key: main (h2h / spreads / totals), alternate, props, other."""
+    if market in ("h2h", "spreads", "totals"):
+        return "main"
+    if market.startswith("alternate_"):
+        return "alternate"
+    if market.startswith("player_"):
+        return "props"
+    return "other"
+
+
+def _env_sport_weights() -> Dict[str, float]:
+    """SPORT_WEIGHT_<SPORT_KEY> overrides, read once per compile."""
+    weights = {}
+    for key, val in os.environ.items():
+        if not key.startswith("SPORT_WEIGHT_"):
+            continue
+        try:
+            weights[key[len("SPORT_WEIGHT_") :].lower()] = float(val)
+        except ValueError:
+            print(f"[!] Invalid {key}={val}, using default 1.0")
+    return weights
+
+
+def load_profile_file(path: str) -> Dict:
+    """Parse a ratings/weights profile JSON (see RATINGS_PROFILE_PATH)."""
+    with open(path, encoding="utf-8") as f:
+        profile = json.load(f)
+    return {
+        "ratings": {bk: int(r) for bk, r in profile.get("ratings", {}).items()},
+        "sport_weights": {s: float(w) for s, w in profile.get("sport_weights", {}).items()},
+        "book_weights": {
+            sport: {bk: float(w) for bk, w in books.items()}
+            for sport, books in profile.get("book_weights", {}).items()
+        },
+    }
+
+
+def refresh_profile(path: str | None = None) -> int:
+    """Reload the profile file if it changed; returns the current generation.
+
+    A missing or invalid file keeps the previous profile (a bad write never
+    takes pricing down).
+    """
+    path = RATINGS_PROFILE_PATH if path is None else path
+    mtime = None
+    if path:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = _profile_state["mtime"]
+    if mtime == _profile_state["mtime"] and _profile_state["generation"]:
+        return _profile_state["generation"]
+
+    profile = _profile_state["profile"]
+    if mtime is not None:
+        try:
+            profile = load_profile_file(path)
+            print(f"[OK] Loaded ratings profile {path}")
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print(f"[!] Invalid ratings profile {path}: {e}; keeping previous weights")
+    profile = {**profile, "env_sport_weights": _env_sport_weights()}
+    _profile_state.update(generation=_profile_state["generation"] + 1, mtime=mtime, profile=profile)
+    _table_cache.clear()
+    return _profile_state["generation"]
+
+
+def compile_weight_table(bookie_cols: List[str], profile: Dict) -> Dict:
+    """Sharp weight vectors per sport for one book column order.
+
+    Returns a dict with sharp_idx (positions of sharp books in bookie_cols),
+    sharp_books, sports (sport or "sport|market class" -> row; row 0 is the
+    default), scale (sport scaler per row) and matrix (rows, sharp books):
+    scale * rating, or scale * the profile's book weights for that row. Arrays
+    are read-only.
+    """
+    ratings = {**BOOKMAKER_RATINGS, **profile.get("ratings", {})}
+    book_weights = profile.get("book_weights", {})
+    sport_weights = {**profile.get("env_sport_weights", {}), **profile.get("sport_weights", {})}
+
+    weighted = {bk for books in book_weights.values() for bk, w in books.items() if w > 0}
+    sharp_idx = [
+        i
+        for i, bk in enumerate(bookie_cols)
+        if ratings.get(bk, 0) >= SHARP_MIN_RATING or bk in weighted
+    ]
+    sharp_books = [bookie_cols[i] for i in sharp_idx]
+
+    sports = ["default"] + sorted((set(book_weights) | set(sport_weights)) - {"default"})
+    matrix = np.zeros((len(sports), len(sharp_books)))
+    scale = np.ones(len(sports))
+    for row, sport in enumerate(sports):
+        scale[row] = sport_weights.get(sport.split("|")[0], 1.0)
+        books = book_weights.get(sport, book_weights.get("default"))
+        if books is None:
+            base = [float(ratings.get(bk, 0)) for bk in sharp_books]
+        else:
+            base = [books.get(bk, 0.0) for bk in sharp_books]
+        matrix[row] = scale[row] * np.array(base, dtype=float)
+
+    table = {
+        "sharp_idx": np.array(sharp_idx, dtype=np.int64),
+        "sharp_books": sharp_books,
+        "sports": {sport: row for row, sport in enumerate(sports)},
+        "scale": scale,
+        "matrix": matrix,
+        "partial": bool((matrix <= 0).any()),
+    }
+    for arr in (table["sharp_idx"], scale, matrix):
+        arr.setflags(write=False)
+    return table
+
+
+def weight_table(bookie_cols: Iterable[str]) -> Dict:
+    """Compiled weight table for a book column order (cached per profile generation)."""
+    bookie_cols = tuple(bookie_cols)
+    generation = refresh_profile()
+    key = (generation, bookie_cols)
+    table = _table_cache.get(key)
+    if table is None:
+        table = compile_weight_table(list(bookie_cols), _profile_state["profile"])
+        _table_cache[key] = table
+    return table
+
+
+def sport_rows(table: Dict, sports: Iterable, classes: Iterable | None = None) -> np.ndarray:
+    """Table row per sport (unknown sports use the default row).
+
+    With ``classes`` (a market_class per sport), the "sport|class" row is used where
+    the profile has one.
+    """
+    rows = table["sports"]
+    if classes is None or not any("|" in key for key in rows):
+        return np.array([rows.get(str(sport), 0) for sport in sports], dtype=np.int64)
+    return np.array(
+        [
+            rows.get(f"{sport}|{cls}", rows.get(str(sport), 0))
+            for sport, cls in zip(sports, classes)
+        ],
+        dtype=np.int64,
+    )
+
+
 AU_TARGET_BOOKS = [
     # AU corporates (primary targets)
     "Sportsbet",
@@ -0,0 +1,330 @@
+"""
+SENSITIVITY SWEEP
+Evaluates a grid of EV thresholds, sharp coverage minimums and weight profiles
+against one raw-odds snapshot without re-running the calculator per config.
+
+Usage (from the directory containing pipeline_v2/):
+    python -m pipeline_v2.sensitivity                      # current raw odds (DB or CSV)
+    python -m pipeline_v2.sensitivity --csv data/raw_odds_pure.csv --devig none shin \\
+        --min-edge 0 0.1 0.0025 --min-sharps 2 3 4 --tier4-share 0.3 0.5 0.7
+
+The snapshot is priced once into a precomputed matrix per width class: target
+odds (markets, width, targets) and, per devig method, each sharp's probability
+of each outcome (markets, width, sharps) plus where it counts. A weight profile
+is then one (markets, sharps) weight array: fair prices for the whole snapshot
+are two weighted sums broadcast over that matrix,
+    fair = sum(w * counted) / sum(w * prob)
+(prob is 1 / odds for "none" and the book's devigged probability otherwise, so
+this is the engine's weighted average in both cases). EV, coverage and Kelly
+stake of every quoted target price follow, and every (min sharps, min edge) cell
+is read from one 2-D histogram of the prices over (coverage, EV band) with suffix
+sums, so the size of the threshold grid barely matters.
+
+Profiles: "ratings" = the live compiled weights, "sport" = each sport's
+SPORT_WEIGHT_PROFILES entry, any SPORT_WEIGHT_PROFILES key applied to every
+sport, and "tier4=<share>" = 4-star books split <share> of the weight and
+3-star books the rest.
+"""
+
+import argparse
+import csv
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from pipeline_v2.calculate_opportunities import (
+    BANKROLL,
+    DATA_DIR,
+    EXCLUDE_MARKETS,
+    KELLY_FRACTION,
+    MIN_BOOKMAKER_COVERAGE,
+    TARGET_BOOKS,
+    extract_outcomes,
+    get_bookie_columns,
+    group_rows_wide,
+    price_market_batch,
+    read_raw_odds,
+    reject_sharp_outliers,
+    width_class,
+)
+from pipeline_v2.devig import devig
+from pipeline_v2.market_matrix import outcome_mask
+from pipeline_v2.ratings import (
+    SPORT_WEIGHT_PROFILES,
+    get_sharp_books_only,
+    load_weight_config,
+    market_class,
+    sport_rows,
+    weight_table,
+)
+
+SENSITIVITY_CSV = DATA_DIR / "sensitivity_sweep.csv"
+SWEEP_COLUMNS = [
+    "profile",
+    "devig_method",
+    "min_sharps",
+    "min_edge",
+    "hits",
+    "mean_ev_percent",
+    "turnover",
+]
+
+
+def precompute(
+    grouped: Dict,
+    bookie_cols: List[str],
+    devig_methods: List[str],
+    target_books: List[str] | None = None,
+) -> Dict:
+    """Price matrix of a grouped snapshot, independent of weights and thresholds.
+
+    Returns a dict with sharp_books and batches: per width class the distinct
+    (sport, market class) cells and each market's cell code, the real-outcome
+    mask, per devig method (prob, counted) arrays and the quoted target prices as
+    flat (market, market * width + outcome, odds) arrays.
+    """
+    allowed = set(target_books) if target_books is not None else set(TARGET_BOOKS)
+    target_idx = [i for i, bk in enumerate(bookie_cols) if bk in allowed]
+    table = weight_table(bookie_cols)
+
+    by_width: Dict[int, List] = {}
+    for key, rows in grouped.items():
+        if key[2] in EXCLUDE_MARKETS:
+            continue
+        outcomes = extract_outcomes(rows)
+        if outcomes:
+            by_width.setdefault(width_class(len(outcomes)), []).append((key, outcomes))
+
+    batches = []
+    for width, markets in sorted(by_width.items()):
+        prices = price_market_batch(markets, width, bookie_cols)
+        n_outcomes = prices["n_outcomes"]
+        real = outcome_mask(n_outcomes, width)
+        sharp_odds, _ = reject_sharp_outliers(
+            prices["prices"][:, :, table["sharp_idx"]], table["sharp_books"]
+        )
+        quoted = sharp_odds > 1.0
+        inverse = np.divide(1.0, sharp_odds, out=np.zeros_like(sharp_odds), where=quoted)
+
+        methods = {}
+        for method in devig_methods:
+            if method == "none":
+                methods[method] = (inverse, quoted.astype(float))
+                continue
+            complete = (quoted | ~real[:, :, np.newaxis]).all(axis=1)
+            counted = complete[:, np.newaxis, :] & real[:, :, np.newaxis]
+            by_book = np.where(quoted & counted, sharp_odds, np.nan)
+            by_book = by_book.transpose(0, 2, 1).reshape(-1, width)
+            probs = devig(by_book, method).reshape(len(markets), -1, width).transpose(0, 2, 1)
+            methods[method] = (np.nan_to_num(probs), counted.astype(float))
+
+        # Every quoted target price, flattened: only its fair changes between profiles
+        targets = prices["prices"][:, :, target_idx]
+        m, o, t = np.nonzero(targets > 1.0)
+        cells = [f"{key[0]}|{market_class(key[2])}" for key, _ in markets]
+        cells, sport_codes = np.unique(cells, return_inverse=True)
+        batches.append(
+            {
+                "sports": [cell.split("|")[0] for cell in cells],
+                "classes": [cell.split("|")[1] for cell in cells],
+                "sport_codes": sport_codes,
+                "real": real,
+                "methods": methods,
+                "target_market": m,
+                "target_cell": m * width + o,
+                "target_odds": targets[m, o, t],
+            }
+        )
+    return {"sharp_books": table["sharp_books"], "bookie_cols": bookie_cols, "batches": batches}
+
+
+def profile_weights(
+    profile: str, sports: List[str], matrix: Dict, classes: List[str] | None = None
+) -> np.ndarray:
+    """(sports, sharps) weights of one profile for a batch's distinct sports.
+
+    ``classes`` (market class per sport) selects "sport|class" ratings-profile rows.
+    """
+    sharp_books = matrix["sharp_books"]
+
+    def vector(tiers: Dict[int, float]) -> np.ndarray:
+        weights = get_sharp_books_only(tiers)
+        return np.array([weights.get(bk, 0.0) for bk in sharp_books])
+
+    if profile == "ratings":
+        table = weight_table(matrix["bookie_cols"])
+        return table["matrix"][sport_rows(table, sports, classes)]
+    if profile == "sport":
+        stacked = np.array([vector(load_weight_config(sport)) for sport in sports])
+        return stacked.reshape(len(sports), len(sharp_books))
+    if profile.startswith("tier4="):
+        share = float(profile.split("=", 1)[1])
+        tiers = {4: share, 3: 1.0 - share, 2: 0.0, 1: 0.0}
+    else:
+        tiers = SPORT_WEIGHT_PROFILES[profile]
+    return np.broadcast_to(vector(tiers), (len(sports), len(sharp_books)))
+
+
+def profile_hits(
+    matrix: Dict, profile: str, devig_method: str, min_edge: float = -np.inf
+) -> Dict[str, np.ndarray]:
+    """EV, sharp coverage and Kelly stake of priced target prices with EV >= min_edge."""
+    found: Dict[str, List[np.ndarray]] = {"ev": [], "coverage": [], "stake": []}
+    for batch in matrix["batches"]:
+        prob, counted = batch["methods"][devig_method]
+        weights = profile_weights(profile, batch["sports"], matrix, batch["classes"])
+        weights = weights[batch["sport_codes"]]
+
+        # Zero-weight sharps drop out of both sums and of the coverage count
+        weighted_prob = np.einsum("mos,ms->mo", prob, weights)
+        total_weight = np.einsum("mos,ms->mo", counted, weights)
+        fair = np.divide(
+            total_weight, weighted_prob, out=np.zeros_like(total_weight), where=weighted_prob > 0
+        )
+        counts = np.einsum("mos,ms->mo", counted, (weights > 0).astype(float))
+        real = batch["real"]
+        if devig_method == "none":
+            coverage = np.where(real, counts, np.inf).min(axis=1)
+        else:
+            coverage = counts.max(axis=1)
+        priced = ((fair > 1.0) | ~real).all(axis=1) & (coverage >= 2)
+
+        m, odds = batch["target_market"], batch["target_odds"]
+        fair_odds = fair.ravel()[batch["target_cell"]]
+        ev = odds / np.where(fair_odds > 1.0, fair_odds, np.inf) - 1.0
+        # Most prices are below any swept edge: drop them before the per-price work
+        keep = (ev >= min_edge) & priced[m] & (fair_odds > 1.0)
+        m, odds, fair_odds = m[keep], odds[keep], fair_odds[keep]
+        p = 1.0 / fair_odds
+        kelly = (odds * p - (1 - p)) / (odds - 1)
+        found["ev"].append(ev[keep])
+        found["coverage"].append(coverage[m].astype(np.int64))
+        found["stake"].append(np.clip(BANKROLL * kelly * KELLY_FRACTION, 0.0, BANKROLL * 0.1))
+    # Coverage indexes threshold_grid's lookup table, so it stays integer even when empty
+    empty = {"ev": np.zeros(0), "coverage": np.zeros(0, dtype=np.int64), "stake": np.zeros(0)}
+    return {name: np.concatenate(parts) if parts else empty[name] for name, parts in found.items()}
+
+
+def threshold_grid(
+    hits: Dict[str, np.ndarray], min_sharps: List[int], min_edges: List[float]
+) -> Dict[str, np.ndarray]:
+    """Hit count, mean EV and turnover per (min sharps, min edge) (both lists ascending).
+
+    Each price falls in one (coverage level, edge band) cell of a 2-D histogram;
+    suffix sums over both axes then give every "coverage >= c and EV >= e" cell.
+    """
+    edges, sharps = np.asarray(min_edges), np.asarray(min_sharps)
+    band = np.searchsorted(edges, hits["ev"], side="right") - 1
+    # Coverage is a small integer: map it to its level with a lookup table
+    lookup = np.searchsorted(sharps, np.arange(sharps.max() + 1), side="right") - 1
+    level = lookup[np.minimum(hits["coverage"], sharps.max())]
+    keep = (band >= 0) & (level >= 0)
+    cells = level[keep] * len(edges) + band[keep]
+    shape = (len(sharps), len(edges))
+
+    def grid(weights=None) -> np.ndarray:
+        counts = np.bincount(cells, weights=weights, minlength=shape[0] * shape[1])
+        # bincount returns int64 for empty weights; keep the sums float
+        counts = counts.astype(float).reshape(shape)[::-1, ::-1]
+        return counts.cumsum(axis=0).cumsum(axis=1)[::-1, ::-1]
+
+    counts = grid()
+    ev_sums = grid(hits["ev"][keep])
+    turnover = grid(hits["stake"][keep])
+    mean_ev = np.divide(ev_sums, counts, out=np.zeros_like(ev_sums), where=counts > 0)
+    return {"hits": counts.astype(np.int64), "mean_ev": mean_ev, "turnover": turnover}
+
+
+def sweep(
+    matrix: Dict,
+    profiles: List[str],
+    devig_methods: List[str],
+    min_sharps: List[int],
+    min_edges: List[float],
+) -> List[Dict]:
+    """One result row per (profile, devig method, min sharps, min edge)."""
+    results = []
+    for method in devig_methods:
+        for profile in profiles:
+            hits = profile_hits(matrix, profile, method, min(min_edges))
+            grid = threshold_grid(hits, min_sharps, min_edges)
+            for i, sharps in enumerate(min_sharps):
+                for j, edge in enumerate(min_edges):
+                    results.append(
+                        {
+                            "profile": profile,
+                            "devig_method": method,
+                            "min_sharps": sharps,
+                            "min_edge": edge,
+                            "hits": int(grid["hits"][i, j]),
+                            "mean_ev_percent": round(float(grid["mean_ev"][i, j]) * 100, 4),
+                            "turnover": round(float(grid["turnover"][i, j]), 2),
+                        }
+                    )
+    return results
+
+
+def default_profiles(tier4_shares: List[float]) -> List[str]:
+    """The live weights, the per-sport profiles, every named profile and tier splits."""
+    tiers = [f"tier4={share:g}" for share in tier4_shares]
+    return ["ratings", "sport"] + list(SPORT_WEIGHT_PROFILES) + tiers
+
+
+def write_sweep(rows: List[Dict], path=SENSITIVITY_CSV):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SWEEP_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"✅ Wrote {len(rows)} sweep rows to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EV threshold / weight sensitivity sweep")
+    parser.add_argument("--csv", help="raw odds CSV (default: the calculator's input)")
+    parser.add_argument("--no-db", action="store_true", help="read the raw odds CSV, not the DB")
+    parser.add_argument("--devig", nargs="+", default=["none"])
+    parser.add_argument("--profile", nargs="+", help="profiles (default: all, see module doc)")
+    parser.add_argument(
+        "--min-edge",
+        type=float,
+        nargs=3,
+        default=[0.0, 0.10, 0.0025],
+        metavar=("START", "STOP", "STEP"),
+    )
+    parser.add_argument(
+        "--min-sharps", type=int, nargs="+", default=list(range(MIN_BOOKMAKER_COVERAGE, 7))
+    )
+    parser.add_argument(
+        "--tier4-share", type=float, nargs="+", default=np.round(np.arange(0.2, 0.81, 0.05), 2)
+    )
+    args = parser.parse_args()
+
+    if args.csv:
+        with open(args.csv, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        rows = read_raw_odds(use_db=not args.no_db)
+    if not rows:
+        print("[!] No raw odds to sweep")
+        return
+
+    started = time.perf_counter()
+    bookie_cols = get_bookie_columns(rows)
+    matrix = precompute(group_rows_wide(rows), bookie_cols, args.devig)
+    priced_at = time.perf_counter()
+
+    start, stop, step = args.min_edge
+    min_edges = [round(float(e), 6) for e in np.arange(start, stop + step / 2, step)]
+    profiles = args.profile or default_profiles(list(args.tier4_share))
+    results = sweep(matrix, profiles, args.devig, sorted(args.min_sharps), min_edges)
+    done = time.perf_counter()
+
+    print(f"[OK] Priced {len(rows)} rows once in {priced_at - started:.2f}s")
+    print(f"[OK] Swept {len(results)} configurations in {done - priced_at:.2f}s")
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    write_sweep(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,25 +5,38 @@ Runs on Render as a Web Service (not cron job)
 """
 
 import csv
+import gzip
 import hashlib
+import json
 import os
-from datetime import datetime
+import re
+import time
+from bisect import bisect_right
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial, wraps
 from io import StringIO
+from operator import itemgetter
 from pathlib import Path
 from typing import Any, Optional
 
+import anyio
+import numpy as np
 from dotenv import load_dotenv
-from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy import (
     Column,
     DateTime,
     Boolean,
     Float,
+    Index,
     Integer,
     String,
     create_engine,
+    func,
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -67,6 +80,8 @@ def get_data_dir():
 DATA_DIR = get_data_dir()
 EV_CSV = DATA_DIR / "ev_hits.csv"
 RAW_CSV = DATA_DIR / "raw_odds_pure.csv"
+LEADERBOARD_JSON = DATA_DIR / "ev_leaderboards.json"
+ARTIFACT_DIR = DATA_DIR / "api"  # pre-encoded responses (pipeline_v2/api_artifacts.py)
 
 # ============================================================================
 # ADMIN CREDENTIALS (from env or hardcoded for simplicity)
@@ -88,6 +103,9 @@ def verify_admin_password(password: str) -> bool:
 # ============================================================================
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
 if not DATABASE_URL:
     print("âš ï¸  DATABASE_URL not set - running in CSV-only mode (no database)")
     engine = None
@@ -97,7 +115,14 @@ else:
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
     try:
-        engine = create_engine(DATABASE_URL, echo=False)
+        engine = create_engine(
+            DATABASE_URL,
+            echo=False,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=True,
+        )
     except Exception as e:
         print(f"âš ï¸  Database connection error: {e}")
         print("âš ï¸  Starting app without database - API will serve CSV only")
@@ -106,6 +131,25 @@ else:
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) if engine else None
 Base = declarative_base()
 
+# Blocking endpoint bodies (sync SQLAlchemy, CSV indexing) run in worker threads.
+# One thread per pooled connection, so a thread never waits on pool checkout.
+_blocking_limiter: dict = {"limiter": None}
+
+
+def offload(func):
+    """Run a sync endpoint in the worker threadpool so it never blocks the event loop."""
+
+    @wraps(func)
+    async def endpoint(*args, **kwargs):
+        if _blocking_limiter["limiter"] is None:
+            tokens = DB_POOL_SIZE + DB_MAX_OVERFLOW
+            _blocking_limiter["limiter"] = anyio.CapacityLimiter(tokens)
+        call = partial(func, *args, **kwargs)
+        return await anyio.to_thread.run_sync(call, limiter=_blocking_limiter["limiter"])
+
+    return endpoint
+
+
 # ============================================================================
 # DATABASE MODELS
 # ============================================================================
@@ -169,6 +213,12 @@ class EVOpportunity(Base):
     kelly_fraction = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Covering indexes for live COUNTs (min EV, optionally per sport)
+    __table_args__ = (
+        Index("ix_ev_opportunities_sport_ev", "sport", "ev_percent"),
+        Index("ix_ev_opportunities_ev", "ev_percent"),
+    )
+
     def to_dict(self):
         return {
             "sport": self.sport,
@@ -196,6 +246,17 @@ class EVOpportunity(Base):
         }
 
 
+class EVSummary(Base):
+    """Per-sport hit count and top EV, written by the calculator with each publish"""
+
+    __tablename__ = "ev_summary"
+
+    sport = Column(String, primary_key=True)
+    hits = Column(Integer, nullable=False)
+    top_ev = Column(Float, nullable=False)  # percent, like ev_opportunities.ev_percent
+    last_updated = Column(DateTime, nullable=False)
+
+
 class PriceHistory(Base):
     """Historical odds archive - enables line movement tracking"""
 
@@ -376,6 +437,182 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ============================================================================
+# HTTP CACHING (snapshot ETags, 304s, Cache-Control, compression)
+# ============================================================================
+
+try:
+    import brotli  # optional: "br" bodies for clients that accept them
+except ImportError:
+    brotli = None
+
+PIPELINE_INTERVAL_S = int(os.getenv("PIPELINE_INTERVAL_S", "1800"))  # render.yaml cron cadence
+CACHE_MAX_AGE_S = int(os.getenv("API_CACHE_MAX_AGE_S", "300"))
+COMPRESS_MIN_BYTES = int(os.getenv("API_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("API_GZIP_LEVEL", "6"))  # zlib default; starlette's 9 is ~2x slower
+
+
+DB_SNAPSHOT_PATHS = ("/api/ev/hits", "/api/ev/summary")  # served from the DB when configured
+# Handlers that may return a published (already gzip-encoded) artifact: their bodies are
+# compressed by snapshot_cache_headers, never by GZipMiddleware (see ArtifactSafeGZip)
+ARTIFACT_PATHS = DB_SNAPSHOT_PATHS + ("/api/odds/raw",)
+
+
+def snapshot_sources(path: str) -> list:
+    """Files whose version decides a read endpoint's response (empty: not cacheable)."""
+    if path in DB_SNAPSHOT_PATHS:
+        return [EV_CSV, LEADERBOARD_JSON]
+    if path == "/api/odds/raw":
+        return [RAW_CSV]
+    return []
+
+
+def snapshot_stats(sources: list) -> list:
+    """(name, mtime_ns, size) of each existing source file."""
+    stats = []
+    for source in sources:
+        try:
+            stat = source.stat()
+        except OSError:
+            continue
+        stats.append((source.name, stat.st_mtime_ns, stat.st_size))
+    return stats
+
+
+def db_generation() -> Optional[tuple]:
+    """(table, last_updated, rows) of the EV snapshot in the database; None if unknown.
+
+    The crons write the database from another host, so the API's local files say
+    nothing about it: ev_summary.last_updated is stamped in every publish transaction.
+    """
+    session = SessionLocal()
+    try:
+        table = "ev_summary"
+        updated, rows = session.query(func.max(EVSummary.last_updated), func.count()).one()
+        if not rows:  # calculator has not written ev_summary: version the hits themselves
+            table = "ev_opportunities"
+            detected = func.coalesce(EVOpportunity.detected_at, EVOpportunity.created_at)
+            updated, rows = session.query(func.max(detected), func.count()).one()
+    except Exception as e:
+        print(f"[!] Snapshot generation query failed: {e}")
+        return None
+    finally:
+        session.close()
+    return (table, updated, rows) if updated is not None else None
+
+
+@offload
+def db_snapshot_stats() -> list:
+    """The database generation as a snapshot_stats entry (empty if unknown)."""
+    generation = db_generation()
+    if generation is None:
+        return []
+    table, updated, rows = generation
+    return [(table, int(updated.replace(tzinfo=timezone.utc).timestamp() * 1e9), rows)]
+
+
+def cache_control(modified: float) -> str:
+    """Fresh until the next pipeline write is due (capped), then clients revalidate."""
+    remaining = modified + PIPELINE_INTERVAL_S - time.time()
+    max_age = int(min(max(remaining, 0), CACHE_MAX_AGE_S))
+    return f"public, max-age={max_age}, stale-while-revalidate=60"
+
+
+def not_modified(request: Request, etag: str, modified: float) -> bool:
+    """If-None-Match (weak comparison) wins; If-Modified-Since is checked only without it."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+async def encode_response(request: Request, response: Response) -> Response:
+    """The response compressed with br (when available and accepted), else gzip.
+
+    Bodies already encoded (published artifacts) and small bodies are sent as they are.
+    """
+    accepted = request.headers.get("accept-encoding", "")
+    usable = [e for e in ("br", "gzip") if e in accepted and (e != "br" or brotli is not None)]
+    if not usable or "content-encoding" in response.headers:
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = dict(response.headers)
+    headers.pop("content-length", None)
+    if len(body) >= COMPRESS_MIN_BYTES:
+        if usable[0] == "br":
+            body = brotli.compress(body, quality=5)
+        else:
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        headers["content-encoding"] = usable[0]
+        headers["vary"] = "Accept-Encoding"
+    return Response(
+        body, status_code=response.status_code, headers=headers, media_type=response.media_type
+    )
+
+
+@app.middleware("http")
+async def snapshot_cache_headers(request: Request, call_next):
+    """Validators tied to the snapshot generation; a matching poll gets 304 without any work.
+
+    The ETag hashes the path, the query and the source files' (mtime_ns, size), so
+    it changes exactly when the pipeline publishes a new snapshot. DB-backed endpoints
+    also hash the database generation, and are not cached when it cannot be read.
+    These are the ARTIFACT_PATHS, so their bodies are also compressed here.
+    """
+    path = request.url.path
+    if path not in ARTIFACT_PATHS:
+        return await call_next(request)  # GZipMiddleware compresses the rest
+    stats = snapshot_stats(snapshot_sources(path)) if request.method == "GET" else []
+    if request.method == "GET" and SessionLocal and path in DB_SNAPSHOT_PATHS:
+        generation = await db_snapshot_stats()
+        stats = stats + generation if generation else []
+    if not stats:
+        return await encode_response(request, await call_next(request))
+
+    query = sorted(request.query_params.multi_items())
+    key = repr((path, query, stats)).encode("utf-8")
+    etag = f'W/"{hashlib.sha1(key).hexdigest()[:20]}"'
+    modified = max(mtime_ns for _, mtime_ns, _ in stats) / 1e9
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(modified, usegmt=True),
+        "Cache-Control": cache_control(modified),
+    }
+    if not_modified(request, etag, modified):
+        return Response(status_code=304, headers={**headers, "Vary": "Accept-Encoding"})
+
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+    response.headers.update(headers)
+    return await encode_response(request, response)
+
+
+class ArtifactSafeGZip(GZipMiddleware):
+    """GZipMiddleware that leaves ARTIFACT_PATHS alone.
+
+    Starlette releases allowed by the fastapi floor gzip a body even when it already
+    has a Content-Encoding, which would encode the published artifacts twice.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in ARTIFACT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Outermost: compresses every response outside ARTIFACT_PATHS
+app.add_middleware(ArtifactSafeGZip, minimum_size=COMPRESS_MIN_BYTES, compresslevel=GZIP_LEVEL)
+
 
 @app.get("/health")
 async def health_check():
@@ -425,17 +662,385 @@ async def root_endpoint():  # Renamed from 'root' to avoid redefinition
     return {"message": "EV_ARB API v2.0", "docs": "/docs"}
 
 
+# ============================================================================
+# EV LEADERBOARDS (top-K per sport/market, precomputed by the calculator)
+# ============================================================================
+
+_leaderboard_cache: dict = {"mtime": None, "doc": None}
+
+
+def load_leaderboards() -> Optional[dict]:
+    """Published leaderboards, or None if missing or older than ev_hits.csv.
+
+    The file is re-parsed only when its mtime changes.
+    """
+    try:
+        mtime = LEADERBOARD_JSON.stat().st_mtime_ns
+        if EV_CSV.exists() and EV_CSV.stat().st_mtime_ns > mtime:
+            return None  # calculator wrote hits but not (yet) the leaderboards
+    except OSError:
+        return None
+    if _leaderboard_cache["mtime"] != mtime:
+        try:
+            with LEADERBOARD_JSON.open("r", encoding="utf-8") as f:
+                doc = json.load(f)
+        except Exception:
+            return None
+        _leaderboard_cache.update(mtime=mtime, doc=doc)
+    return _leaderboard_cache["doc"]
+
+
+def leaderboard_board(doc: dict, sport: Optional[str] = None, market: Optional[str] = None):
+    """The board for a sport and/or market filter (empty board if nothing matched)."""
+    empty = {"count": 0, "rows": []}
+    if sport and market:
+        return doc.get("sport_market", {}).get(f"{sport}|{market}", empty)
+    if sport:
+        return doc.get("sport", {}).get(sport, empty)
+    if market:
+        return doc.get("market", {}).get(market, empty)
+    return doc.get("all", empty)
+
+
+def leaderboard_page(
+    sport: Optional[str], market: Optional[str], min_ev: float, offset: int, limit: int
+) -> Optional[dict]:
+    """Serve a hits page straight from the leaderboards when they can answer it exactly.
+
+    Every published hit has at least min_edge_percent EV, so a lower min_ev filter is
+    a no-op; the page must lie inside the top K (or the board must hold every hit).
+    """
+    doc = load_leaderboards()
+    if not doc or min_ev * 100 > doc.get("min_edge_percent", 0):
+        return None
+    board = leaderboard_board(doc, sport, market)
+    rows = board["rows"]
+    if offset + limit > len(rows) and len(rows) < board["count"]:
+        return None
+    return {
+        "hits": rows[offset : offset + limit],
+        "count": len(rows[offset : offset + limit]),
+        "total_count": board["count"],
+        "last_updated": doc.get("generated_at"),
+    }
+
+
+def local_snapshot_current() -> bool:
+    """True if the local leaderboards and artifacts may answer for the served data.
+
+    Always in CSV mode. With a database they only do when the run that published
+    them also wrote the database's current ev_summary (its db_generation stamp).
+    """
+    if not SessionLocal:
+        return True
+    doc = load_leaderboards()
+    if not doc or not doc.get("db_generation"):
+        return False
+    generation = db_generation()
+    if generation is None or generation[0] != "ev_summary":
+        return False
+    return generation[1].isoformat() == doc["db_generation"]
+
+
+# ============================================================================
+# PUBLISHED API ARTIFACTS (gzip JSON bodies pre-encoded by the pipeline)
+# ============================================================================
+
+_artifact_meta_cache: dict = {}
+
+
+def artifact_name(base: str, sport: Optional[str] = None) -> Optional[str]:
+    """File stem of a published view (mirrors pipeline_v2.api_artifacts.artifact_name)."""
+    if not sport:
+        return base
+    return f"{base}.{sport}" if re.fullmatch(r"[A-Za-z0-9_\-]+", sport) else None
+
+
+def load_artifact(name: str, source: Path, params: dict) -> Optional[dict]:
+    """Sidecar of a published artifact, if it answers params and its source file is unchanged.
+
+    Sidecars are re-read only when their mtime changes.
+    """
+    meta_path = ARTIFACT_DIR / f"{name}.meta.json"
+    try:
+        mtime = meta_path.stat().st_mtime_ns
+        stat = source.stat()
+    except OSError:
+        return None
+    cached = _artifact_meta_cache.get(name)
+    if cached is None or cached[0] != mtime:
+        try:
+            cached = (mtime, json.loads(meta_path.read_text(encoding="utf-8")))
+        except Exception:
+            return None
+        _artifact_meta_cache[name] = cached
+    meta = cached[1]
+    if (meta.get("source_mtime_ns"), meta.get("source_size")) != (stat.st_mtime_ns, stat.st_size):
+        return None
+    return meta if meta.get("params") == params else None
+
+
+def artifact_response(
+    name: Optional[str], source: Path, params: dict, accept_encoding: Optional[str]
+) -> Optional[FileResponse]:
+    """The published gzip body as a file response (None: build the response dynamically)."""
+    if name is None or "gzip" not in (accept_encoding or ""):
+        return None
+    meta = load_artifact(name, source, params)
+    if meta is None:
+        return None
+    return FileResponse(
+        ARTIFACT_DIR / f"{name}.json.gz",
+        media_type="application/json",
+        headers={
+            "Content-Encoding": "gzip",
+            "Vary": "Accept-Encoding",
+            "ETag": f'"{meta["etag"]}"',
+        },
+    )
+
+
+@app.get("/api/ev/top")
+async def get_ev_top(
+    sport: Optional[str] = Query(None),
+    market: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Top EV opportunities per sport and/or market from the precomputed leaderboards."""
+    doc = load_leaderboards()
+    if not doc:
+        raise HTTPException(status_code=503, detail="Leaderboards not available yet")
+    board = leaderboard_board(doc, sport, market)
+    hits = board["rows"][:limit]
+    return {
+        "hits": hits,
+        "count": len(hits),
+        "total_count": board["count"],
+        "k": doc.get("k"),
+        "last_updated": doc.get("generated_at"),
+        "filters": {"sport": sport, "market": market, "limit": limit},
+    }
+
+
+# ============================================================================
+# EV HITS CSV SNAPSHOT (parsed once per ev_hits.csv version)
+# ============================================================================
+
+# Hit fields and the CSV headers they may come from (internal or display headers)
+EV_CSV_ALIASES = {
+    "sport": ["sport", "Sport"],
+    "teams": ["teams", "Teams"],
+    "away_team": ["away_team", "Away Team"],
+    "home_team": ["home_team", "Home Team"],
+    "event_id": ["event_id", "Event ID"],
+    "commence_time": ["commence_time", "Start Time"],
+    "market": ["market", "Market"],
+    "point": ["point", "Line"],
+    "selection": ["selection", "Selection"],
+    "player": ["player", "Player"],
+    "ev_percent": ["ev_percent", "EV%", "ev%", "ev"],
+    "best_book": ["best_book", "Book", "bookmaker"],
+    "best_odds": ["best_odds", "odds_decimal", "Odds"],
+    "fair_odds": ["fair_odds", "Fair"],
+    "implied_prob": ["implied_prob", "Prob"],
+    "stake": ["stake", "Stake"],
+    "sharp_book_count": ["sharp_book_count", "Sharps"],
+    "kelly_fraction": ["kelly_fraction"],
+    "detected_at": ["detected_at"],
+    "created_at": ["created_at"],
+}
+
+_ev_csv_cache: dict = {"key": None, "snapshot": None}
+
+
+def parse_csv_float(val):
+    """Number from a CSV cell ("$25" -> 25.0, "5%" -> 0.05); None if blank or invalid."""
+    if val is None:
+        return None
+    if isinstance(val, (int, float)):
+        return float(val)
+    s = str(val).strip()
+    if s == "":
+        return None
+    # Remove common adornments
+    s_raw = s
+    s = s.replace("%", "").replace("$", "")
+    try:
+        num = float(s)
+        # If original had % and value likely in percent, convert to decimal
+        if "%" in s_raw:
+            return num / 100.0
+        return num
+    except Exception:
+        return None
+
+
+def parse_csv_percent(val):
+    """Decimal fraction from a CSV percent cell ("5.2%" or 5.2 -> 0.052)."""
+    if val is None:
+        return None
+    if isinstance(val, (int, float)):
+        # Heuristic: if >= 1.0 assume already decimal? Keep as-is
+        return float(val) if float(val) <= 1.0 else float(val) / 100.0
+    s = str(val).strip()
+    if s == "":
+        return None
+    if s.endswith("%"):
+        try:
+            return float(s[:-1]) / 100.0
+        except Exception:
+            return None
+    try:
+        num = float(s)
+        return num if num <= 1.0 else num / 100.0
+    except Exception:
+        return None
+
+
+def resolve_ev_csv_aliases(header: list) -> dict:
+    """Field -> column indexes of its aliases present in the header (priority order)."""
+    # A repeated header keeps its last column, as csv.DictReader does
+    positions = {name: i for i, name in enumerate(header)}
+    return {
+        field: [positions[alias] for alias in aliases if alias in positions]
+        for field, aliases in EV_CSV_ALIASES.items()
+    }
+
+
+def parse_ev_csv_row(values: list, columns: dict) -> dict:
+    """One hit from a CSV row, using column indexes from resolve_ev_csv_aliases."""
+
+    def first(field):
+        for i in columns[field]:
+            if i < len(values) and values[i] != "":
+                return values[i]
+        return None
+
+    teams = first("teams") or ""
+    if " V " in teams:
+        away_team_val, home_team_val = (part.strip() for part in teams.split(" V ", 1))
+    else:
+        away_team_val = first("away_team") or None
+        home_team_val = first("home_team") or None
+
+    best_book_val = first("best_book") or ""
+    best_odds_val = parse_csv_float(first("best_odds"))
+    return {
+        "sport": first("sport") or "",
+        "event_id": first("event_id") or None,
+        "away_team": away_team_val,
+        "home_team": home_team_val,
+        "commence_time": first("commence_time") or None,
+        "market": first("market") or None,
+        "point": parse_csv_float(first("point")),
+        "selection": first("selection") or None,
+        "player": first("player") or None,
+        "fair_odds": parse_csv_float(first("fair_odds")),
+        "best_book": best_book_val,
+        "best_odds": best_odds_val,
+        "ev_percent": parse_csv_percent(first("ev_percent")) or 0.0,
+        "sharp_book_count": int(parse_csv_float(first("sharp_book_count")) or 0),
+        "implied_prob": parse_csv_percent(first("implied_prob")),
+        "stake": parse_csv_float(first("stake")),
+        "kelly_fraction": parse_csv_float(first("kelly_fraction")) or None,
+        "detected_at": first("detected_at") or None,
+        "created_at": first("created_at") or None,
+        # Aliases for frontend convenience
+        "bookmaker": best_book_val,
+        "odds_decimal": best_odds_val,
+    }
+
+
+def build_ev_snapshot(path: Path) -> dict:
+    """Parse ev_hits.csv into hit lists sorted by EV (overall and per sport).
+
+    Each view is (hits, negated EVs): the EVs ascend, so the hits passing a min_ev
+    filter are the prefix found by one bisect. Hits without a sport match every
+    sport filter, as they always have.
+    """
+    with path.open("r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        columns = resolve_ev_csv_aliases(next(reader, []))
+        hits = []
+        for values in reader:
+            try:
+                hits.append(parse_ev_csv_row(values, columns))
+            except Exception:
+                continue
+    hits.sort(key=lambda h: h["ev_percent"], reverse=True)
+
+    by_sport: dict = {h["sport"]: [] for h in hits if h["sport"]}
+    blank = []
+    for h in hits:
+        if h["sport"]:
+            by_sport[h["sport"]].append(h)
+        else:
+            blank.append(h)
+            for sport_hits in by_sport.values():
+                sport_hits.append(h)
+
+    def view(rows):
+        return rows, [-h["ev_percent"] for h in rows]
+
+    timestamps = [h["detected_at"] or h["created_at"] for h in hits]
+    sports: dict = {}
+    for h in hits:
+        sports[h["sport"]] = sports.get(h["sport"], 0) + 1
+    return {
+        "all": view(hits),
+        "sports": {sport: view(rows) for sport, rows in by_sport.items()},
+        "blank": view(blank),
+        # (hits per sport, top EV in percent, latest timestamp) for /api/ev/summary
+        "summary": (
+            sports,
+            hits[0]["ev_percent"] * 100 if hits else 0,
+            max(filter(None, timestamps), default=None),
+        ),
+    }
+
+
+def load_ev_snapshot() -> Optional[dict]:
+    """Parsed ev_hits.csv, rebuilt only when the file's mtime or size changes."""
+    try:
+        stat = EV_CSV.stat()
+    except OSError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+    if _ev_csv_cache["key"] != key:
+        try:
+            snapshot = build_ev_snapshot(EV_CSV)
+        except OSError:
+            return None
+        _ev_csv_cache.update(key=key, snapshot=snapshot)
+    return _ev_csv_cache["snapshot"]
+
+
+def ev_csv_page(sport: Optional[str], min_ev: float, offset: int, limit: int):
+    """(hits page, total matching) from ev_hits.csv, best EV first."""
+    snapshot = load_ev_snapshot()
+    if snapshot is None:
+        return [], 0
+    if sport:
+        hits, neg_ev = snapshot["sports"].get(sport, snapshot["blank"])
+    else:
+        hits, neg_ev = snapshot["all"]
+    total = bisect_right(neg_ev, -min_ev)
+    return hits[offset : min(offset + limit, total)], total
+
+
 # ============================================================================
 # EV HITS ENDPOINTS
 # ============================================================================
 
 
 @app.get("/api/ev/hits")
-async def get_ev_hits(
+@offload
+def get_ev_hits(
     limit: int = Query(50, ge=1, le=5000),
     offset: int = Query(0, ge=0),
     min_ev: float = Query(0.01, ge=0),
     sport: Optional[str] = Query(None),
+    accept_encoding: Optional[str] = Header(None),
 ):
     """
     Get EV opportunities filtered by criteria
@@ -448,120 +1053,21 @@ async def get_ev_hits(
 
     def csv_fallback():
         # Read from ev_hits.csv when database is unavailable or empty
-        if not EV_CSV.exists():
-            return [], 0
-
-        def first(row, keys):
-            for k in keys:
-                if k in row and row.get(k) not in (None, ""):
-                    return row.get(k)
-            return None
-
-        def parse_float(val):
-            if val is None:
-                return None
-            if isinstance(val, (int, float)):
-                return float(val)
-            s = str(val).strip()
-            if s == "":
-                return None
-            # Remove common adornments
-            s_raw = s
-            s = s.replace("%", "").replace("$", "")
-            try:
-                num = float(s)
-                # If original had % and value likely in percent, convert to decimal
-                if "%" in s_raw:
-                    return num / 100.0
-                return num
-            except Exception:
-                return None
-
-        def parse_percent(val):
-            if val is None:
-                return None
-            if isinstance(val, (int, float)):
-                # Heuristic: if >= 1.0 assume already decimal? Keep as-is
-                return float(val) if float(val) <= 1.0 else float(val) / 100.0
-            s = str(val).strip()
-            if s == "":
-                return None
-            if s.endswith("%"):
-                try:
-                    return float(s[:-1]) / 100.0
-                except Exception:
-                    return None
-            try:
-                num = float(s)
-                return num if num <= 1.0 else num / 100.0
-            except Exception:
-                return None
-
-        rows = []
-        with EV_CSV.open("r", encoding="utf-8", newline="") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    # Support both internal headers and display headers
-                    sport_val = first(row, ["sport", "Sport"]) or ""
-                    if sport and sport_val and sport_val != sport:
-                        continue
-
-                    teams = first(row, ["teams", "Teams"]) or ""
-                    away_team_val, home_team_val = None, None
-                    if " V " in teams:
-                        parts = teams.split(" V ", 1)
-                        away_team_val = parts[0].strip()
-                        home_team_val = parts[1].strip()
-                    else:
-                        away_team_val = first(row, ["away_team", "Away Team"]) or None
-                        home_team_val = first(row, ["home_team", "Home Team"]) or None
-
-                    ev_val = parse_percent(first(row, ["ev_percent", "EV%", "ev%", "ev"])) or 0.0
-                    if ev_val < min_ev:
-                        continue
-
-                    best_book_val = first(row, ["best_book", "Book", "bookmaker"]) or ""
-                    best_odds_val = parse_float(first(row, ["best_odds", "odds_decimal", "Odds"]))
-                    fair_val = parse_float(first(row, ["fair_odds", "Fair"]))
-                    prob_val = parse_percent(first(row, ["implied_prob", "Prob"]))
-                    stake_val = parse_float(first(row, ["stake", "Stake"]))
-                    sharps_val = parse_float(first(row, ["sharp_book_count", "Sharps"])) or 0
-                    line_val = parse_float(first(row, ["point", "Line"]))
-
-                    rows.append(
-                        {
-                            "sport": sport_val,
-                            "event_id": first(row, ["event_id", "Event ID"]) or None,
-                            "away_team": away_team_val,
-                            "home_team": home_team_val,
-                            "commence_time": first(row, ["commence_time", "Start Time"]) or None,
-                            "market": first(row, ["market", "Market"]) or None,
-                            "point": line_val,
-                            "selection": first(row, ["selection", "Selection"]) or None,
-                            "player": first(row, ["player", "Player"]) or None,
-                            "fair_odds": fair_val,
-                            "best_book": best_book_val,
-                            "best_odds": best_odds_val,
-                            "ev_percent": ev_val,
-                            "sharp_book_count": int(sharps_val or 0),
-                            "implied_prob": prob_val,
-                            "stake": stake_val,
-                            "kelly_fraction": parse_float(first(row, ["kelly_fraction"])) or None,
-                            "detected_at": first(row, ["detected_at"]) or None,
-                            "created_at": first(row, ["created_at"]) or None,
-                            # Aliases for frontend convenience
-                            "bookmaker": best_book_val,
-                            "odds_decimal": best_odds_val,
-                        }
-                    )
-                except Exception:
-                    continue
-        # Sort by ev_percent desc and apply offset/limit
-        rows = sorted(rows, key=lambda r: r.get("ev_percent", 0), reverse=True)
-        total = len(rows)
-        rows = rows[offset : offset + limit]
-        return rows, total
+        return ev_csv_page(sport, min_ev, offset, limit)
+
+    filters = {"limit": limit, "offset": offset, "min_ev": min_ev, "sport": sport}
+    if local_snapshot_current():
+        # The default page per sport is published pre-encoded by the calculator
+        name = artifact_name("ev_hits", sport)
+        published = artifact_response(name, EV_CSV, filters, accept_encoding)
+        if published is not None:
+            return published
+
+        # Top-of-board pages come straight from the precomputed leaderboards (no sort)
+        page = leaderboard_page(sport, None, min_ev, offset, limit)
+        if page is not None:
+            page["filters"] = filters
+            return page
 
     try:
         # If no database session available, use CSV directly
@@ -617,8 +1123,8 @@ async def get_ev_hits(
                 "filters": {"limit": limit, "offset": offset, "min_ev": min_ev, "sport": sport},
             }
 
-        # Get summary stats (still in DB path; optional)
-        all_hits = session.query(EVOpportunity).all()
+        # COUNT(*) over the same filters, answered from the (sport, ev_percent) index
+        total_count = query.with_entities(func.count()).scalar()
         session.close()
 
         last_updated = None
@@ -628,7 +1134,7 @@ async def get_ev_hits(
         return {
             "hits": [h.to_dict() for h in hits],
             "count": len(hits),
-            "total_count": len(all_hits),
+            "total_count": total_count,
             "last_updated": last_updated or datetime.utcnow().isoformat(),
             "filters": {"limit": limit, "offset": offset, "min_ev": min_ev, "sport": sport},
         }
@@ -663,105 +1169,72 @@ async def get_ev_hits(
             }
 
 
-@app.get("/api/ev/summary")
-async def get_ev_summary():
-    """Get summary stats about EV opportunities"""
-    try:
-        if not SessionLocal:
-            if not EV_CSV.exists():
-                return {
-                    "available": False,
-                    "total_hits": 0,
-                    "top_ev": 0,
-                    "sports": {},
-                    "last_updated": datetime.utcnow().isoformat(),
-                }
-
-            rows = []
-            with EV_CSV.open("r", encoding="utf-8", newline="") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    try:
-                        ev_val = float(row.get("ev_percent", 0))
-                        rows.append(row | {"ev_percent": ev_val})
-                    except Exception:
-                        continue
-
-            if not rows:
-                return {
-                    "available": False,
-                    "total_hits": 0,
-                    "top_ev": 0,
-                    "sports": {},
-                    "last_updated": datetime.utcnow().isoformat(),
-                }
-
-            sports_dict = {}
-            top_ev = 0
-            timestamps = []
-
-            for hit in rows:
-                sport_val = hit.get("sport")
-                if sport_val not in sports_dict:
-                    sports_dict[sport_val] = 0
-                sports_dict[sport_val] += 1
-
-                if hit.get("ev_percent", 0) > top_ev:
-                    top_ev = hit.get("ev_percent", 0)
-
-                ts = hit.get("detected_at") or hit.get("created_at")
-                if ts:
-                    timestamps.append(ts)
-
-            last_updated = max(timestamps) if timestamps else datetime.utcnow().isoformat()
-
-            return {
-                "available": True,
-                "total_hits": len(rows),
-                "top_ev": round(top_ev, 2),
-                "sports": sports_dict,
-                "last_updated": last_updated,
-            }
-
-        session = SessionLocal()
-
-        # Query all EV opportunities
-        all_hits = session.query(EVOpportunity).all()
-
-        if not all_hits:
-            return {
-                "available": False,
-                "total_hits": 0,
-                "top_ev": 0,
-                "sports": {},
-                "last_updated": datetime.utcnow().isoformat(),
-            }
-
-        # Calculate summary stats
-        sports_dict = {}
-        top_ev = 0
-
-        for hit in all_hits:
-            # Count by sport
-            if hit.sport not in sports_dict:
-                sports_dict[hit.sport] = 0
-            sports_dict[hit.sport] += 1
+def ev_summary_response(sports: dict, top_ev: float, last_updated) -> dict:
+    """/api/ev/summary body from per-sport hit counts."""
+    total = sum(sports.values())
+    return {
+        "available": total > 0,
+        "total_hits": total,
+        "top_ev": round(top_ev, 2) if total else 0,
+        "sports": sports,
+        "last_updated": last_updated or datetime.utcnow().isoformat(),
+    }
 
-            # Track highest EV
-            if hit.ev_percent > top_ev:
-                top_ev = hit.ev_percent
 
-        last_updated = max((h.detected_at or h.created_at) for h in all_hits).isoformat()
+def csv_ev_summary() -> dict:
+    """Summary from the calculator's leaderboards, else from the parsed ev_hits.csv."""
+    doc = load_leaderboards()
+    if doc:
+        sports = {sport: board["count"] for sport, board in doc.get("sport", {}).items()}
+        best = doc.get("all", {}).get("rows") or [{}]
+        return ev_summary_response(sports, best[0].get("ev_percent") or 0, doc.get("generated_at"))
+    snapshot = load_ev_snapshot()
+    if snapshot is None:
+        return ev_summary_response({}, 0, None)
+    return ev_summary_response(*snapshot["summary"])
+
+
+def db_ev_summary(session) -> dict:
+    """Summary from the ev_summary table; aggregate in SQL if the calculator has not written it."""
+    rows = session.query(EVSummary.sport, EVSummary.hits, EVSummary.top_ev, EVSummary.last_updated)
+    rows = rows.all()
+    if not rows:
+        rows = (
+            session.query(
+                EVOpportunity.sport,
+                func.count(),
+                func.max(EVOpportunity.ev_percent),
+                func.max(func.coalesce(EVOpportunity.detected_at, EVOpportunity.created_at)),
+            )
+            .group_by(EVOpportunity.sport)
+            .all()
+        )
+    if not rows:
+        return ev_summary_response({}, 0, None)
+    last_updated = max(row[3] for row in rows if row[3]) if any(row[3] for row in rows) else None
+    return ev_summary_response(
+        {row[0]: row[1] for row in rows},
+        max(row[2] for row in rows),
+        last_updated.isoformat() if last_updated else None,
+    )
 
-        session.close()
 
-        return {
-            "available": True,
-            "total_hits": len(all_hits),
-            "top_ev": round(top_ev, 2),
-            "sports": sports_dict,
-            "last_updated": last_updated,
-        }
+@app.get("/api/ev/summary")
+@offload
+def get_ev_summary(accept_encoding: Optional[str] = Header(None)):
+    """Get summary stats about EV opportunities (O(sports), precomputed at publish time)"""
+    if local_snapshot_current():
+        published = artifact_response("ev_summary", EV_CSV, {}, accept_encoding)
+        if published is not None:
+            return published
+    try:
+        if not SessionLocal:
+            return csv_ev_summary()
+        session = SessionLocal()
+        try:
+            return db_ev_summary(session)
+        finally:
+            session.close()
 
     except Exception as e:
         return {
@@ -774,13 +1247,219 @@ async def get_ev_summary():
         }
 
 
+# ============================================================================
+# RAW ODDS INDEX (byte offsets per raw_odds_pure.csv version)
+# ============================================================================
+
+RAW_META_COLUMNS = [
+    "timestamp",
+    "sport",
+    "event_id",
+    "away_team",
+    "home_team",
+    "commence_time",
+    "market",
+    "point",
+    "selection",
+]
+
+_raw_index_cache: dict = {"key": None, "index": None}
+
+
+def _raw_lines(f, position: list):
+    """Decoded lines of a binary file; position[0] is the byte offset after the last line."""
+    for line in f:
+        position[0] += len(line)
+        yield line.decode("utf-8")
+
+
+def parse_commence(val: str) -> Optional[float]:
+    """ISO commence_time as epoch seconds (None if unparseable)."""
+    try:
+        return datetime.fromisoformat(val.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+def label_postings(labels: list) -> dict:
+    """label -> ascending row numbers carrying it (one stable sort, no per-label scan)."""
+    lookup: dict = {}
+    codes = np.array([lookup.setdefault(val, len(lookup)) for val in labels], dtype=np.int64)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.cumsum(np.bincount(codes, minlength=len(lookup)))[:-1]
+    return dict(zip(lookup, np.split(order, bounds)))
+
+
+def build_raw_index(path: Path, generation: str) -> dict:
+    """One pass over raw_odds_pure.csv: byte span of every row plus secondary indexes.
+
+    Rows are numbered in file order. ``postings`` maps field -> value -> ascending
+    row numbers for sport, market, event_id and bookmaker (rows where that book has
+    a price). ``commence`` holds every row with a parseable commence_time sorted by
+    that time, so a time window is two bisects.
+    """
+    position = [0]
+    starts, ends = [], []
+    fields = ("sport", "market", "event_id", "commence_time")
+    labels: dict = {name: [] for name in fields}
+    priced = []
+    last_updated = None
+    with path.open("rb") as f:
+        reader = csv.reader(_raw_lines(f, position))
+        columns = next(reader, [])
+        if columns:
+            columns[0] = columns[0].lstrip("\ufeff")
+        col = {name: i for i, name in enumerate(columns)}
+        field_i = [(labels[name], col.get(name)) for name in fields]
+        books = [(name, i) for i, name in enumerate(columns) if name not in RAW_META_COLUMNS]
+        book_cells = itemgetter(*[i for _, i in books]) if books else lambda values: ()
+        ts_i = [col[name] for name in ("timestamp", "commence_time") if name in col]
+        start = position[0]
+        for values in reader:
+            if values:
+                starts.append(start)
+                ends.append(position[0])
+                if len(values) < len(columns):
+                    values = values + [""] * (len(columns) - len(values))
+                for out, i in field_i:
+                    out.append(values[i] if i is not None else "")
+                cells = book_cells(values)
+                priced.append(bytes(map(bool, (cells,) if len(books) == 1 else cells)))
+                ts_val = next((values[i] for i in ts_i if values[i]), None)
+                if ts_val and (last_updated is None or ts_val > last_updated):
+                    last_updated = ts_val
+            start = position[0]
+
+    commence_at = {val: parse_commence(val) for val in set(labels["commence_time"])}
+    when = np.array([commence_at[val] for val in labels["commence_time"]], dtype=float)
+    timed = np.flatnonzero(~np.isnan(when))
+    order = timed[np.argsort(when[timed], kind="stable")]
+    priced = np.frombuffer(b"".join(priced), dtype=bool).reshape(len(starts), len(books))
+
+    return {
+        "generation": generation,
+        "columns": columns,
+        "starts": np.array(starts, dtype=np.int64),
+        "ends": np.array(ends, dtype=np.int64),
+        "rows": np.arange(len(starts), dtype=np.int64),
+        "postings": {
+            "sport": label_postings(labels["sport"]),
+            "market": label_postings(labels["market"]),
+            "event_id": label_postings(labels["event_id"]),
+            "bookmaker": {
+                name: np.flatnonzero(priced[:, j]).astype(np.int64)
+                for j, (name, _) in enumerate(books)
+            },
+        },
+        "commence": (when[order], order.astype(np.int64)),
+        "last_updated": last_updated,
+    }
+
+
+def intersect_rows(groups: list) -> np.ndarray:
+    """Ascending rows matching every group, where a group is a list of postings (any matches).
+
+    Candidates come from the smallest group and are only looked up in the others,
+    so the cost follows that group's size rather than the file.
+    """
+    groups = sorted(groups, key=lambda postings: sum(map(len, postings)))
+    first = groups[0]
+    rows = first[0] if len(first) == 1 else np.unique(np.concatenate(first))
+    for postings in groups[1:]:
+        if not len(rows):
+            break
+        keep = np.zeros(len(rows), dtype=bool)
+        for other in postings:
+            pos = np.searchsorted(other, rows)
+            hit = pos < len(other)
+            hit[hit] = other[pos[hit]] == rows[hit]
+            keep |= hit
+        rows = rows[keep]
+    return rows
+
+
+def raw_index_rows(
+    index: dict,
+    filters: dict,
+    commence_from: Optional[float] = None,
+    commence_to: Optional[float] = None,
+) -> np.ndarray:
+    """Ascending row numbers matching every filter.
+
+    ``filters`` maps a postings field to a value or list of values (any of them
+    matches); ``commence_from``/``commence_to`` bound commence_time in epoch seconds.
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    groups = []
+    for field, wanted in filters.items():
+        if not wanted:
+            continue
+        values = [wanted] if isinstance(wanted, str) else wanted
+        groups.append([index["postings"][field].get(value, empty) for value in values])
+    if commence_from is not None or commence_to is not None:
+        when, order = index["commence"]
+        lo = 0 if commence_from is None else np.searchsorted(when, commence_from, side="left")
+        hi = len(when) if commence_to is None else np.searchsorted(when, commence_to, side="right")
+        groups.append([np.sort(order[lo:hi])])
+    if not groups:
+        return index["rows"]
+    return intersect_rows(groups)
+
+
+def load_raw_index() -> Optional[dict]:
+    """Row index of raw_odds_pure.csv, rebuilt only when its mtime or size changes."""
+    try:
+        stat = RAW_CSV.stat()
+    except OSError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+    if _raw_index_cache["key"] != key:
+        generation = f"{stat.st_mtime_ns:x}{stat.st_size:x}"
+        _raw_index_cache.update(key=key, index=build_raw_index(RAW_CSV, generation))
+    return _raw_index_cache["index"]
+
+
+def parse_raw_cell(val):
+    """Bookmaker cell as float (None if blank or not a number)."""
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_raw_rows(index: dict, row_ids: np.ndarray) -> list:
+    """Row dicts for ascending row numbers; each run of consecutive rows is one read."""
+    if not len(row_ids):
+        return []
+    columns = index["columns"]
+    breaks = np.flatnonzero(np.diff(row_ids) != 1) + 1
+    out = []
+    with RAW_CSV.open("rb") as f:
+        for run in np.split(row_ids, breaks):
+            start, end = index["starts"][run[0]], index["ends"][run[-1]]
+            f.seek(start)
+            text = f.read(end - start).decode("utf-8")
+            for values in csv.reader(StringIO(text, newline="")):
+                if not values:
+                    continue
+                values = values + [None] * (len(columns) - len(values))
+                out.append(
+                    {
+                        name: val if name in RAW_META_COLUMNS else parse_raw_cell(val)
+                        for name, val in zip(columns, values)
+                    }
+                )
+    return out
+
+
 # ============================================================================
 # ODDS ENDPOINTS
 # ============================================================================
 
 
 @app.get("/api/odds/latest")
-async def get_latest_odds(
+@offload
+def get_latest_odds(
     limit: int = Query(500, ge=1, le=5000),
     sport: Optional[str] = Query(None),
     event_id: Optional[str] = Query(None),
@@ -837,15 +1516,35 @@ async def get_latest_odds(
 
 
 @app.get("/api/odds/raw")
-async def get_raw_odds(
+@offload
+def get_raw_odds(
     limit: int = Query(500, ge=1, le=20000),
     offset: int = Query(0, ge=0),
     sport: Optional[str] = Query(None),
     market: Optional[str] = Query(None),
+    event_id: Optional[str] = Query(None),
+    bookmaker: Optional[str] = Query(None),
+    commence_from: Optional[str] = Query(None),
+    commence_to: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    accept_encoding: Optional[str] = Header(None),
 ):
     """
     Serve raw odds directly from raw_odds_pure.csv for frontend display when DB is unavailable.
+
+    Pages come from a per-version row index (see build_raw_index), so any offset
+    costs O(limit). Pass the previous page's next_cursor as ``cursor`` to page by
+    key instead of offset. Filters are answered from the index's posting lists;
+    ``bookmaker`` takes a comma list (rows where any of them has a price) and
+    ``commence_from``/``commence_to`` are inclusive ISO-8601 bounds. The unfiltered
+    first page is published pre-encoded by the extractor.
     """
+    filtered = (sport, market, event_id, bookmaker, commence_from, commence_to, cursor)
+    name = None if any(filtered) else "odds_raw"
+    page = {"limit": limit, "offset": offset}
+    published = artifact_response(name, RAW_CSV, page, accept_encoding)
+    if published is not None:
+        return published
     if not RAW_CSV.exists():
         return {
             "rows": [],
@@ -855,72 +1554,31 @@ async def get_raw_odds(
             "error": "raw_csv_not_found",
         }
 
-    def parse_float(val):
-        if val is None:
-            return None
-        try:
-            return float(val)
-        except Exception:
-            try:
-                s = str(val).strip()
-                if s == "":
-                    return None
-                return float(s)
-            except Exception:
-                return None
-
-    rows = []
-    row_index = 0  # Track which row we're on (for offset calculation)
-    total_count = 0
-    columns = []
-    last_ts = None
-
     try:
-        with RAW_CSV.open("r", encoding="utf-8", newline="") as f:
-            reader = csv.DictReader(f)
-            columns = reader.fieldnames or []
-            for row in reader:
-                if sport and row.get("sport") != sport:
-                    continue
-                if market and row.get("market") != market:
-                    continue
-
-                total_count += 1
-                row_index += 1
-
-                # Capture timestamp before processing (use either timestamp or commence_time)
-                ts_val = row.get("timestamp") or row.get("commence_time")
-                if ts_val:
-                    last_ts = ts_val
-
-                # Only include rows after the offset point
-                if row_index <= offset:
-                    continue
-
-                # Keep as-is but coerce numeric bookmaker columns to float where possible
-                clean_row = {}
-                for k, v in row.items():
-                    if k in [
-                        "timestamp",
-                        "sport",
-                        "event_id",
-                        "away_team",
-                        "home_team",
-                        "commence_time",
-                        "market",
-                        "point",
-                        "selection",
-                    ]:
-                        clean_row[k] = v
-                    else:
-                        clean_row[k] = parse_float(v)
-
-                rows.append(clean_row)
-
-                # Stop when we have enough rows
-                if len(rows) >= limit:
-                    break
-
+        index = load_raw_index()
+        if index is None:
+            raise FileNotFoundError(RAW_CSV)
+        window = [parse_commence(t) if t else None for t in (commence_from, commence_to)]
+        if any(t and w is None for t, w in zip((commence_from, commence_to), window)):
+            raise HTTPException(status_code=400, detail="commence_from/to must be ISO-8601")
+        books = [b.strip() for b in bookmaker.split(",") if b.strip()] if bookmaker else None
+        filters = {"sport": sport, "market": market, "event_id": event_id, "bookmaker": books}
+        matched = raw_index_rows(index, filters, *window)
+
+        if cursor:
+            generation, _, after = cursor.rpartition(":")
+            if generation != index["generation"] or not after.isdigit():
+                raise HTTPException(
+                    status_code=409, detail="Stale cursor: raw odds changed, restart from page 1"
+                )
+            first = int(np.searchsorted(matched, int(after), side="right"))
+        else:
+            first = offset
+        page_ids = matched[first : first + limit]
+        rows = read_raw_rows(index, page_ids)
+
+    except HTTPException:
+        raise
     except Exception as e:
         return {
             "rows": [],
@@ -931,12 +1589,14 @@ async def get_raw_odds(
             "last_updated": datetime.utcnow().isoformat(),
         }
 
+    has_more = first + limit < len(matched)
     return {
         "rows": rows,
         "count": len(rows),
-        "total_count": total_count,
-        "columns": columns,
-        "last_updated": last_ts or datetime.utcnow().isoformat(),
+        "total_count": len(matched),
+        "columns": index["columns"],
+        "last_updated": index["last_updated"] or datetime.utcnow().isoformat(),
+        "next_cursor": f"{index['generation']}:{page_ids[-1]}" if has_more else None,
     }
 
 
@@ -965,7 +1625,8 @@ async def admin_auth(password: str = Query(...)):
 
 
 @app.get("/api/admin/ev-opportunities-csv")
-async def download_ev_csv(authorization: Optional[str] = Header(None)):
+@offload
+def download_ev_csv(authorization: Optional[str] = Header(None)):
     """
     Download EV opportunities as CSV from database
     Admin/designer only access
@@ -1067,7 +1728,8 @@ async def download_ev_csv(authorization: Optional[str] = Header(None)):
 
 
 @app.get("/api/admin/raw-odds-csv")
-async def download_raw_odds_csv(authorization: Optional[str] = Header(None)):
+@offload
+def download_raw_odds_csv(authorization: Optional[str] = Header(None)):
     """
     Download raw odds as CSV from database
     Admin/designer only access
@@ -1159,7 +1821,8 @@ async def download_raw_odds_csv(authorization: Optional[str] = Header(None)):
 
 
 @app.get("/api/admin/database-stats")
-async def get_database_stats(authorization: Optional[str] = Header(None)):
+@offload
+def get_database_stats(authorization: Optional[str] = Header(None)):
     """
     Get database statistics - row counts and latest updates
     Admin/designer only
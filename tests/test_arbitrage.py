@@ -0,0 +1,91 @@
+"""
+Tests for the cross-book arbitrage stage.
+"""
+
+import sys
+from pathlib import Path
+
+# pipeline_v2 lives under archive/
+sys.path.insert(0, str(Path(__file__).parent.parent / "archive"))
+
+from pipeline_v2 import calculate_opportunities as calc
+from pipeline_v2.arbitrage import bucket_arb, scan_arbitrage, update_quote
+
+
+def test_best_price_updates_incrementally():
+    index = {}
+    key = ("nba", "e1", "totals", "210.5", "")
+    assert update_quote(index, key, "Over", "A", 1.90)
+    assert update_quote(index, key, "Over", "B", 2.05)
+    assert not update_quote(index, key, "Over", "A", 1.95)
+    side = index[key]["Over"]
+    assert (side["best_book"], side["best_price"]) == ("B", 2.05)
+
+    # Best book shortens: only then is the side rescanned
+    assert update_quote(index, key, "Over", "B", 1.80)
+    assert (side["best_book"], side["best_price"]) == ("A", 1.95)
+    # Withdrawn quotes drop out of the side
+    update_quote(index, key, "Over", "A", 0)
+    assert (side["best_book"], side["best_price"]) == ("B", 1.80)
+
+
+def test_withdrawal_never_becomes_the_best():
+    index = {}
+    key = ("nba", "e1", "totals", "210.5", "")
+    assert not update_quote(index, key, "Over", "A", 1.0)
+    side = index[key]["Over"]
+    assert (side["best_book"], side["best_price"], side["quotes"]) == ("", 0.0, {})
+
+    update_quote(index, key, "Over", "B", 2.0)
+    assert not update_quote(index, key, "Over", "A", 1.0)
+    assert update_quote(index, key, "Over", "B", 1.0)
+    assert (side["best_book"], side["best_price"], side["quotes"]) == ("", 0.0, {})
+
+
+def test_stake_split_pays_the_same_on_every_outcome():
+    index = {}
+    key = ("epl", "e1", "h2h", "", "")
+    for selection, book, price in [("Home", "A", 2.9), ("Draw", "B", 3.8), ("Away", "C", 3.4)]:
+        update_quote(index, key, selection, book, price)
+    arb = bucket_arb(index[key], 100.0)
+
+    inverse = 1 / 2.9 + 1 / 3.8 + 1 / 3.4
+    assert abs(arb["profit_percent"] - (1 / inverse - 1) * 100) < 1e-9
+    assert abs(sum(leg["stake"] for leg in arb["legs"]) - 100.0) < 1e-9
+    for leg in arb["legs"]:
+        assert abs(leg["stake"] * leg["odds"] - arb["payout"]) < 1e-9
+    assert scan_arbitrage(index, 100.0, min_profit=0.5) == []
+
+
+def test_find_arbitrage_on_grouped_buckets():
+    def row(sport, market, point, sel, **prices):
+        return {
+            "sport": sport,
+            "event_id": f"{sport}-1",
+            "away_team": "Away",
+            "home_team": "Home",
+            "commence_time": "2025-12-10T10:00:00Z",
+            "market": market,
+            "point": point,
+            "selection": sel,
+            **{bk: f"{price:.3f}" for bk, price in prices.items()},
+        }
+
+    rows = [
+        # Spread sides pair on the home handicap: 2.10 / 2.08 is an arb
+        row("basketball_nba", "spreads", "-3.5", "Home", Pinnacle=1.95, Sportsbet=2.10),
+        row("basketball_nba", "spreads", "3.5", "Away", Pinnacle=1.92, Tab=2.08),
+        # Soccer h2h without its Draw is not exhaustive
+        row("soccer_epl", "h2h", "", "Home", Pinnacle=2.50, Tab=2.60),
+        row("soccer_epl", "h2h", "", "Away", Pinnacle=2.60, Sportsbet=2.70),
+    ]
+    cols = ["Pinnacle", "Sportsbet", "Tab"]
+    arbs = calc.find_arbitrage(calc.group_rows_wide(rows), cols, min_profit=0.0)
+
+    assert len(arbs) == 1
+    assert arbs[0]["market"] == "spreads"
+    assert {(leg["selection"], leg["book"], leg["point"]) for leg in arbs[0]["legs"]} == {
+        ("Home", "Sportsbet", "-3.5"),
+        ("Away", "Tab", "3.5"),
+    }
+    assert calc.format_arb_row(arbs[0])["Leg 1"].startswith("Home -3.5 @ Sportsbet 2.10")
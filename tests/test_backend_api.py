@@ -0,0 +1,460 @@
+"""
+Tests for the API's cached CSV fallbacks.
+"""
+
+import csv
+import json
+import os
+import time
+import sys
+from pathlib import Path
+
+# backend_api lives at the repo root, pipeline_v2 under archive/
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "archive"))
+
+HEADERS = ["Start Time", "Sport", "Teams", "Market", "Line", "Selection", "Book", "Odds", "EV%"]
+
+
+def write_hits(path, rows, mtime_ns):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADERS)
+        writer.writerows(rows)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_ev_hits_csv_fallback_is_cached_per_version(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import backend_api
+
+    path = tmp_path / "ev_hits.csv"
+    monkeypatch.setattr(backend_api, "EV_CSV", path)
+    monkeypatch.setattr(backend_api, "LEADERBOARD_JSON", tmp_path / "missing.json")
+    monkeypatch.setattr(backend_api, "SessionLocal", None)
+    monkeypatch.setattr(backend_api, "_ev_csv_cache", {"key": None, "snapshot": None})
+    client = TestClient(backend_api.app)
+
+    def row(sport, selection, ev):
+        return ["Wed 10:00", sport, "Away V Home", "Totals", "210.5", selection, "Tab", "2.1", ev]
+
+    write_hits(
+        path,
+        [
+            row("NBA", "Over", "2.50%"),
+            row("NHL", "Under", "7.00%"),
+            row("", "Home", "4.00%"),
+            row("NBA", "Away", "0.50%"),
+            row("NBA", "Under", "12.00%"),
+        ],
+        1_000_000_000,
+    )
+    page = client.get("/api/ev/hits", params={"min_ev": 0.01, "limit": 2}).json()
+    assert [h["ev_percent"] for h in page["hits"]] == [0.12, 0.07]
+    assert page["total_count"] == 4
+    hit = page["hits"][0]
+    assert (hit["away_team"], hit["home_team"], hit["point"], hit["odds_decimal"]) == (
+        "Away",
+        "Home",
+        210.5,
+        2.1,
+    )
+
+    # Hits without a sport match every sport filter
+    page = client.get("/api/ev/hits", params={"sport": "NBA", "min_ev": 0.01, "offset": 1}).json()
+    assert [(h["sport"], h["ev_percent"]) for h in page["hits"]] == [("", 0.04), ("NBA", 0.025)]
+    assert page["total_count"] == 3
+    assert backend_api.ev_csv_page("NFL", 0.0, 0, 10)[1] == 1
+
+    snapshot = backend_api._ev_csv_cache["snapshot"]
+    client.get("/api/ev/hits", params={"min_ev": 0.05})
+    assert backend_api._ev_csv_cache["snapshot"] is snapshot
+
+    # A new file version is re-parsed
+    write_hits(path, [row("NBA", "Over", "3.00%")], 2_000_000_000)
+    page = client.get("/api/ev/hits", params={"min_ev": 0.0}).json()
+    assert [h["ev_percent"] for h in page["hits"]] == [0.03]
+
+
+def test_raw_odds_pages_from_row_index(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import backend_api
+
+    path = tmp_path / "raw_odds_pure.csv"
+    monkeypatch.setattr(backend_api, "RAW_CSV", path)
+    monkeypatch.setattr(backend_api, "_raw_index_cache", {"key": None, "index": None})
+    client = TestClient(backend_api.app)
+
+    header = ["timestamp", "sport", "event_id", "away_team", "home_team"]
+    header += ["commence_time", "market", "point", "selection", "Pinnacle", "Tab"]
+    rows = []
+    for i in range(30):
+        sport = "basketball_nba" if i % 3 else "icehockey_nhl"
+        market = "h2h" if i % 2 else "totals"
+        ts = f"2025-12-09T12:{i:02d}:00Z"
+        rows.append([ts, sport, f"e{i}", "Away, FC", "Home", ts, market, "", "Home", 1.9 + i, ""])
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+    page = client.get("/api/odds/raw", params={"offset": 28, "limit": 5}).json()
+    assert page["columns"] == header
+    assert page["total_count"] == 30 and page["count"] == 2
+    assert [r["event_id"] for r in page["rows"]] == ["e28", "e29"]
+    assert page["rows"][0]["away_team"] == "Away, FC"
+    assert (page["rows"][0]["Pinnacle"], page["rows"][0]["Tab"]) == (29.9, None)
+    assert page["last_updated"] == "2025-12-09T12:29:00Z"
+    assert page["next_cursor"] is None
+
+    # Keyset paging over a filtered view visits every match once
+    params = {"sport": "basketball_nba", "market": "h2h", "limit": 4}
+    seen, cursor = [], None
+    while True:
+        page = client.get("/api/odds/raw", params={**params, "cursor": cursor}).json()
+        assert page["total_count"] == 10
+        seen += [r["event_id"] for r in page["rows"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"e{i}" for i in range(30) if i % 3 and i % 2]
+
+    # Bookmaker, event and commence-window filters intersect with the others
+    page = client.get("/api/odds/raw", params={"bookmaker": "Tab,Pinnacle", "limit": 50}).json()
+    assert page["total_count"] == 30
+    assert client.get("/api/odds/raw", params={"bookmaker": "Tab"}).json()["total_count"] == 0
+    window = {"commence_from": "2025-12-09T12:10:00+00:00", "commence_to": "2025-12-09T12:20:00Z"}
+    page = client.get("/api/odds/raw", params={**window, "sport": "icehockey_nhl"}).json()
+    assert [r["event_id"] for r in page["rows"]] == ["e12", "e15", "e18"]
+    page = client.get("/api/odds/raw", params={"event_id": "e4", "market": "totals"}).json()
+    assert [r["event_id"] for r in page["rows"]] == ["e4"]
+    assert client.get("/api/odds/raw", params={"commence_to": "soon"}).status_code == 400
+
+    # A cursor from an older file version is rejected
+    cursor = client.get("/api/odds/raw", params=params).json()["next_cursor"]
+    os.utime(path, ns=(3_000_000_000, 3_000_000_000))
+    response = client.get("/api/odds/raw", params={**params, "cursor": cursor})
+    assert response.status_code == 409
+
+
+def test_ev_summary_reads_published_summary_table(tmp_path, monkeypatch):
+    from datetime import datetime
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import backend_api
+
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'ev.db'}")
+    backend_api.Base.metadata.create_all(db_engine)
+    monkeypatch.setattr(backend_api, "SessionLocal", sessionmaker(bind=db_engine))
+    monkeypatch.setattr(backend_api, "LEADERBOARD_JSON", tmp_path / "missing.json")
+    client = TestClient(backend_api.app)
+
+    def hit(sport, ev):
+        return backend_api.EVOpportunity(
+            sport=sport,
+            event_id="e1",
+            market="h2h",
+            selection="Home",
+            best_book="Tab",
+            best_odds=2.1,
+            ev_percent=ev,
+            detected_at=datetime(2025, 12, 9, 12),
+        )
+
+    session = backend_api.SessionLocal()
+    session.add_all([hit("NBA", 3.0), hit("NBA", 8.5), hit("NHL", 2.0)])
+    session.commit()
+
+    # No published summary yet: aggregated in SQL
+    summary = client.get("/api/ev/summary").json()
+    assert summary["sports"] == {"NBA": 2, "NHL": 1}
+    assert (summary["total_hits"], summary["top_ev"]) == (3, 8.5)
+    assert summary["last_updated"] == "2025-12-09T12:00:00"
+
+    published = datetime(2025, 12, 9, 13)
+    session.add(backend_api.EVSummary(sport="NBA", hits=40, top_ev=9.25, last_updated=published))
+    session.commit()
+    session.close()
+    summary = client.get("/api/ev/summary").json()
+    assert summary["sports"] == {"NBA": 40} and summary["top_ev"] == 9.25
+
+    page = client.get("/api/ev/hits", params={"sport": "NBA", "min_ev": 4.0, "limit": 1}).json()
+    assert page["count"] == 1 and page["total_count"] == 1
+
+
+def test_published_artifacts_match_dynamic_responses(tmp_path, monkeypatch):
+    import random
+
+    from fastapi.testclient import TestClient
+
+    import backend_api
+    from pipeline_v2 import calculate_opportunities as calc
+    from pipeline_v2 import extract_odds
+    from pipeline_v2.leaderboard import new_leaderboards, offer
+
+    for module in (calc, extract_odds, backend_api):
+        monkeypatch.setattr(module, "DATA_DIR", tmp_path)
+    paths = {
+        "EV_CSV": tmp_path / "ev_hits.csv",
+        "RAW_CSV": tmp_path / "raw_odds_pure.csv",
+        "LEADERBOARD_JSON": tmp_path / "ev_leaderboards.json",
+    }
+    for module in (calc, extract_odds, backend_api):
+        for name, path in paths.items():
+            if hasattr(module, name):
+                monkeypatch.setattr(module, name, path)
+    monkeypatch.setattr(backend_api, "ARTIFACT_DIR", tmp_path / "api")
+    monkeypatch.setattr(backend_api, "SessionLocal", None)
+    monkeypatch.setattr(backend_api, "_raw_index_cache", {"key": None, "index": None})
+    client = TestClient(backend_api.app)
+    identity = {"Accept-Encoding": "identity"}
+
+    def from_artifact(response, name):
+        meta = json.loads((tmp_path / "api" / f"{name}.meta.json").read_text())
+        return response.num_bytes_downloaded == meta["gzip_bytes"]
+
+    # Extractor: raw rows as written by DictWriter, then page 1 published
+    rng = random.Random(1)
+    rows = [
+        {
+            "timestamp": f"2025-12-09T12:{i % 60:02d}:00Z",
+            "sport": "basketball_nba",
+            "event_id": f"e{i}",
+            "market": "totals",
+            "point": 210.5,
+            "selection": "Over",
+            "Pinnacle": round(rng.uniform(1.5, 3), 2),
+        }
+        for i in range(620)
+    ]
+    headers = extract_odds.BASE_HEADERS + ["Pinnacle", "Tab"]
+    with open(paths["RAW_CSV"], "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=headers)
+        writer.writeheader()
+        writer.writerows(rows)
+    extract_odds.publish_raw_page(rows, headers)
+
+    published = client.get("/api/odds/raw")
+    assert published.headers["content-encoding"] == "gzip" and from_artifact(published, "odds_raw")
+    assert published.json() == client.get("/api/odds/raw", headers=identity).json()
+    assert not from_artifact(client.get("/api/odds/raw", params={"limit": 5}), "odds_raw")
+
+    # Calculator: hits pages and summary published with the leaderboards
+    paths["EV_CSV"].write_text("published before the leaderboards\n")
+    boards = new_leaderboards(calc.LEADERBOARD_K)
+    for i in range(80):
+        opp = {"sport": ["basketball_nba", "icehockey_nhl"][i % 2], "market": "h2h"}
+        opp.update(event_id=f"e{i}", selection="Home", ev_percent=1 + i / 10, odds_decimal=2.0)
+        offer(boards, opp, opp["ev_percent"], opp["sport"], opp["market"])
+    calc.publish_leaderboards(boards)
+
+    for params, name in (({}, "ev_hits"), ({"sport": "icehockey_nhl"}, "ev_hits.icehockey_nhl")):
+        published = client.get("/api/ev/hits", params=params)
+        assert from_artifact(published, name)
+        assert (
+            published.json() == client.get("/api/ev/hits", params=params, headers=identity).json()
+        )
+    published = client.get("/api/ev/summary")
+    assert published.headers["content-encoding"] == "gzip" and from_artifact(
+        published, "ev_summary"
+    )
+    assert published.json() == client.get("/api/ev/summary", headers=identity).json()
+
+    # A newer source file retires the artifacts
+    paths["EV_CSV"].write_text("rewritten\n")
+    assert not from_artifact(client.get("/api/ev/summary"), "ev_summary")
+
+
+def test_read_endpoints_revalidate_against_snapshot_generation(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import backend_api
+
+    path = tmp_path / "raw_odds_pure.csv"
+    monkeypatch.setattr(backend_api, "RAW_CSV", path)
+    monkeypatch.setattr(backend_api, "ARTIFACT_DIR", tmp_path / "api")
+    monkeypatch.setattr(backend_api, "_raw_index_cache", {"key": None, "index": None})
+    client = TestClient(backend_api.app)
+
+    header = ["timestamp", "sport", "event_id", "market", "selection", "Pinnacle"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows([["t", "nba", f"e{i}", "h2h", "Home", 1.5 + i / 100] for i in range(200)])
+    os.utime(path, ns=(time.time_ns(), time.time_ns()))
+
+    first = client.get("/api/odds/raw", params={"sport": "nba"})
+    etag = first.headers["etag"]
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["cache-control"].startswith("public, max-age=")
+    assert int(first.headers["cache-control"].split("max-age=")[1].split(",")[0]) > 0
+
+    again = client.get("/api/odds/raw", params={"sport": "nba"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    since = {"If-Modified-Since": first.headers["last-modified"]}
+    assert client.get("/api/odds/raw", params={"sport": "nba"}, headers=since).status_code == 304
+    other = client.get("/api/odds/raw", params={"sport": "nhl"}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+    # A new snapshot changes the ETag
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    fresh = client.get("/api/odds/raw", params={"sport": "nba"}, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.headers["etag"] != etag
+    assert fresh.headers["cache-control"].startswith("public, max-age=0")
+
+
+def test_leaderboard_rows_have_the_db_row_keys():
+    import backend_api
+    from pipeline_v2 import calculate_opportunities as calc
+
+    db_row = backend_api.EVOpportunity(ev_percent=5.0, best_odds=2.1)
+    opp = {"sport": "nba", "ev_percent": 5.0, "odds_decimal": 2.1, "fair_source": "interp"}
+    assert list(calc.leaderboard_entry(opp)) == list(db_row.to_dict())
+
+
+def test_db_backed_endpoints_revalidate_against_db_generation(tmp_path, monkeypatch):
+    from datetime import datetime
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import backend_api
+
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'ev.db'}")
+    backend_api.Base.metadata.create_all(db_engine)
+    monkeypatch.setattr(backend_api, "SessionLocal", sessionmaker(bind=db_engine))
+    # A stale local CSV that the crons (on another host) never touch again
+    stale_csv = tmp_path / "ev_hits.csv"
+    write_hits(stale_csv, [], 1_000_000_000)
+    monkeypatch.setattr(backend_api, "EV_CSV", stale_csv)
+    monkeypatch.setattr(backend_api, "LEADERBOARD_JSON", tmp_path / "missing.json")
+    monkeypatch.setattr(backend_api, "ARTIFACT_DIR", tmp_path / "api")
+    client = TestClient(backend_api.app)
+
+    session = backend_api.SessionLocal()
+    row = backend_api.EVSummary(
+        sport="NBA", hits=2, top_ev=8.5, last_updated=datetime(2025, 12, 9, 12)
+    )
+    session.add(row)
+    session.commit()
+
+    first = client.get("/api/ev/summary")
+    etag = first.headers["etag"]
+    assert first.json()["total_hits"] == 2
+    assert first.headers["last-modified"] == "Tue, 09 Dec 2025 12:00:00 GMT"
+    assert client.get("/api/ev/summary", headers={"If-None-Match": etag}).status_code == 304
+
+    # A new publish lands in the DB only; the local CSV is unchanged
+    row.hits, row.last_updated = 5, datetime(2025, 12, 9, 12, 30)
+    session.commit()
+    session.close()
+    fresh = client.get("/api/ev/summary", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.headers["etag"] != etag
+    assert fresh.json()["total_hits"] == 5
+
+
+def test_db_mode_serves_leaderboards_only_for_the_db_generation(tmp_path, monkeypatch):
+    from datetime import datetime
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import backend_api
+    from pipeline_v2.leaderboard import (
+        leaderboards_document,
+        new_leaderboards,
+        offer,
+        write_leaderboards,
+    )
+
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'ev.db'}")
+    backend_api.Base.metadata.create_all(db_engine)
+    monkeypatch.setattr(backend_api, "SessionLocal", sessionmaker(bind=db_engine))
+    path = tmp_path / "ev_leaderboards.json"
+    monkeypatch.setattr(backend_api, "LEADERBOARD_JSON", path)
+    monkeypatch.setattr(backend_api, "EV_CSV", tmp_path / "ev_hits.csv")
+    monkeypatch.setattr(backend_api, "ARTIFACT_DIR", tmp_path / "api")
+    client = TestClient(backend_api.app)
+
+    generation = datetime(2025, 12, 9, 12, 0, 0, 123456)
+    session = backend_api.SessionLocal()
+    session.add(backend_api.EVSummary(sport="NBA", hits=1, top_ev=4.0, last_updated=generation))
+    session.add(
+        backend_api.EVOpportunity(
+            sport="NBA",
+            event_id="db",
+            market="h2h",
+            selection="Home",
+            best_book="Tab",
+            best_odds=2.1,
+            ev_percent=4.0,
+        )
+    )
+    session.commit()
+    session.close()
+
+    boards = new_leaderboards(10)
+    offer(boards, {"event_id": "local", "ev_percent": 9.0}, 9.0, "NBA", "h2h")
+
+    def publish(stamp, mtime_ns):
+        doc = leaderboards_document(boards, min_edge_percent=1.0, db_generation=stamp)
+        write_leaderboards(path, doc)
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    # A stale local copy from an older run: the database answers
+    publish(datetime(2025, 12, 9, 11).isoformat(), 1_000_000_000)
+    hits = client.get("/api/ev/hits", params={"min_ev": 0.01}).json()["hits"]
+    assert [h["event_id"] for h in hits] == ["db"]
+
+    # Published by the run that wrote the database: the leaderboards answer
+    publish(generation.isoformat(), 2_000_000_000)
+    hits = client.get("/api/ev/hits", params={"min_ev": 0.01}).json()["hits"]
+    assert [h["event_id"] for h in hits] == ["local"]
+
+
+def test_artifact_bodies_are_gzip_encoded_exactly_once(tmp_path, monkeypatch):
+    import gzip
+
+    from fastapi.testclient import TestClient
+
+    import backend_api
+    from pipeline_v2 import calculate_opportunities as calc
+    from pipeline_v2.leaderboard import new_leaderboards, offer
+
+    monkeypatch.setattr(calc, "DATA_DIR", tmp_path)
+    for module in (calc, backend_api):
+        monkeypatch.setattr(module, "EV_CSV", tmp_path / "ev_hits.csv")
+        monkeypatch.setattr(module, "LEADERBOARD_JSON", tmp_path / "ev_leaderboards.json")
+    monkeypatch.setattr(backend_api, "ARTIFACT_DIR", tmp_path / "api")
+    monkeypatch.setattr(backend_api, "SessionLocal", None)
+    client = TestClient(backend_api.app)
+
+    (tmp_path / "ev_hits.csv").write_text("published before the leaderboards\n")
+    boards = new_leaderboards(calc.LEADERBOARD_K)
+    for i in range(80):
+        opp = {"sport": "basketball_nba", "market": "h2h", "event_id": f"e{i}"}
+        opp.update(selection="Home", ev_percent=1 + i / 10, odds_decimal=2.0)
+        offer(boards, opp, opp["ev_percent"], opp["sport"], opp["market"])
+    calc.publish_leaderboards(boards)
+
+    gzip_only = {"Accept-Encoding": "gzip"}
+    # The published artifact goes out byte for byte, and decodes once to JSON
+    with client.stream("GET", "/api/ev/hits", headers=gzip_only) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == "gzip"
+    assert raw == (tmp_path / "api" / "ev_hits.json.gz").read_bytes()
+    assert len(json.loads(gzip.decompress(raw))["hits"]) == 50
+
+    # A dynamic response on the same path is gzipped once too
+    params = {"limit": 40, "offset": 5}
+    with client.stream("GET", "/api/ev/hits", params=params, headers=gzip_only) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(json.loads(gzip.decompress(raw))["hits"]) == 40
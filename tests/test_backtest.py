@@ -0,0 +1,133 @@
+"""
+Tests for the snapshot backtester.
+"""
+
+import csv
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# pipeline_v2 lives under archive/
+sys.path.insert(0, str(Path(__file__).parent.parent / "archive"))
+
+from pipeline_v2 import backtest
+from pipeline_v2.backtest import LOSS, PUSH, UNSETTLED, WIN, run_backtest, settle
+
+
+def outcome(market, selection, point="", sport="basketball_nba"):
+    return {
+        "sport": sport,
+        "event_id": "e1",
+        "home_team": "Home",
+        "away_team": "Away",
+        "market": market,
+        "selection": selection,
+        "point": point,
+    }
+
+
+def test_settle_rules():
+    scores = {"e1": (110.0, 104.0)}
+    assert settle(outcome("h2h", "Home"), scores, {}) == WIN
+    assert settle(outcome("h2h", "Away"), scores, {}) == LOSS
+    assert settle(outcome("spreads", "Home", "-5.5"), scores, {}) == WIN
+    assert settle(outcome("spreads", "Home", "-6"), scores, {}) == PUSH
+    assert settle(outcome("alternate_spreads", "Away", "6.5"), scores, {}) == WIN
+    assert settle(outcome("totals", "Over", "213.5"), scores, {}) == WIN
+    assert settle(outcome("totals", "Under +213.5", "213.5"), scores, {}) == LOSS
+    assert settle(outcome("player_points", "Over", "20.5"), scores, {}) == UNSETTLED
+
+    tie = {"e1": (1.0, 1.0)}
+    assert settle(outcome("h2h", "Draw", sport="soccer_epl"), tie, {}) == WIN
+    assert settle(outcome("h2h", "Home", sport="soccer_epl"), tie, {}) == LOSS
+    assert settle(outcome("h2h", "Home"), tie, {}) == PUSH
+
+    explicit = {("e1", "player_points", "Over", "20.5"): WIN}
+    assert settle(outcome("player_points", "Over", "20.5"), {}, explicit) == WIN
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_run_backtest_takes_first_qualifying_snapshot(tmp_path, monkeypatch):
+    def row(timestamp, event_id, selection, target):
+        home = selection == "Home"
+        return {
+            "timestamp": timestamp,
+            "sport": "basketball_nba",
+            "event_id": event_id,
+            "away_team": "Away",
+            "home_team": "Home",
+            "commence_time": f"2025-12-10T1{event_id[-1]}:00:00Z",
+            "market": "h2h",
+            "point": "",
+            "selection": selection,
+            "Pinnacle": "1.90" if home else "1.95",
+            "Draftkings": "1.92" if home else "1.93",
+            "Sportsbet": target if home else "1.80",
+        }
+
+    # e1: Home at 2.20 qualifies at the first snapshot only; e2: 2.40 at the second
+    rows = [
+        row("t1", "e1", "Home", "2.20"),
+        row("t1", "e1", "Away", ""),
+        row("t2", "e1", "Home", "1.85"),
+        row("t2", "e1", "Away", ""),
+        row("t1", "e2", "Home", "1.85"),
+        row("t1", "e2", "Away", ""),
+        row("t2", "e2", "Home", "2.40"),
+        row("t2", "e2", "Away", ""),
+    ]
+    write_csv(tmp_path / "snapshots.csv", rows)
+    write_csv(
+        tmp_path / "results.csv",
+        [
+            {"event_id": "e1", "home_score": "100", "away_score": "90"},
+            {"event_id": "e2", "home_score": "80", "away_score": "95"},
+        ],
+    )
+    monkeypatch.setattr(backtest, "TARGET_BOOKS", ["Sportsbet"])
+
+    low, high = run_backtest(
+        [str(tmp_path / "snapshots.csv")],
+        str(tmp_path / "results.csv"),
+        [0.05, 0.2],
+        stake_mode="flat",
+    )
+    stake = backtest.FLAT_STAKE
+    assert (low["bets"], low["wins"], low["losses"]) == (2, 1, 1)
+    assert np.isclose(low["profit"], stake * 1.20 - stake)
+    assert np.isclose(low["roi_percent"], (1.20 - 1) / 2 * 100)
+    # e1 settles first (+1.2 stakes), then e2 loses: a 1-stake drop from the peak
+    peak = backtest.BANKROLL + stake * 1.20
+    assert np.isclose(low["max_drawdown_percent"], stake / peak * 100)
+    assert (high["bets"], high["losses"]) == (1, 1)
+
+
+def test_kelly_stakes_match_kelly_stake():
+    from pipeline_v2.calculate_opportunities import kelly_stake
+
+    # Edge, no edge, capped at 10% of bankroll, unpriced fair
+    odds = np.array([2.20, 1.50, 9.00, 2.00])
+    fair = np.array([2.00, 4.00, 2.00, 1.00])
+    n = len(odds)
+    candidates = {
+        "odds": odds,
+        "fair": fair,
+        "ev": odds / np.maximum(fair, 1.0) - 1.0,
+        "outcome": np.arange(n),
+        "snapshot": np.zeros(n, dtype=np.int64),
+        "commence": np.arange(n),
+    }
+    results = np.full(n, WIN, dtype=np.int64)
+    metrics = backtest.bankroll_paths(candidates, [np.arange(n)], results)
+    expected = [
+        kelly_stake(backtest.BANKROLL, f, o, backtest.KELLY_FRACTION) for f, o in zip(fair, odds)
+    ]
+    assert np.isclose(metrics[0]["staked"], sum(expected))
+    assert expected[1] == expected[3] == 0.0 and expected[2] == backtest.BANKROLL * 0.1
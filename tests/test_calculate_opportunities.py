@@ -0,0 +1,362 @@
+"""
+Tests for the pipeline_v2 EV calculator.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# pipeline_v2 lives under archive/
+sys.path.insert(0, str(Path(__file__).parent.parent / "archive"))
+
+from pipeline_v2 import calculate_opportunities as calc
+
+
+def make_row(sport, event_id, market, point, selection, **prices):
+    row = {
+        "timestamp": "2025-12-10T00:00:00+00:00",
+        "sport": sport,
+        "event_id": event_id,
+        "away_team": "Away",
+        "home_team": "Home",
+        "commence_time": "2025-12-10T10:00:00Z",
+        "market": market,
+        "point": point,
+        "selection": selection,
+    }
+    row.update({bk: f"{price:.3f}" for bk, price in prices.items()})
+    return row
+
+
+def make_slate():
+    rows = []
+    for sport in ["icehockey_nhl", "basketball_nba", "americanfootball_nfl"]:
+        for i in range(3):
+            event_id = f"{sport}-{i}"
+            rows.append(
+                make_row(
+                    sport,
+                    event_id,
+                    "totals",
+                    "210.5",
+                    "Over +210.5",
+                    Pinnacle=1.90,
+                    Draftkings=1.91,
+                    Sportsbet=2.05,
+                )
+            )
+            rows.append(
+                make_row(
+                    sport,
+                    event_id,
+                    "totals",
+                    "210.5",
+                    "Under +210.5",
+                    Pinnacle=1.95,
+                    Draftkings=1.93,
+                    Sportsbet=1.80,
+                )
+            )
+    return rows
+
+
+def test_partition_by_sport_single_pass():
+    rows = make_slate()
+    partitions = calc.partition_by_sport(rows)
+    assert sorted(partitions) == ["americanfootball_nfl", "basketball_nba", "icehockey_nhl"]
+    assert sum(len(v) for v in partitions.values()) == len(rows)
+
+
+def test_run_sports_does_not_mutate_globals():
+    before = dict(calc.SHARP_WEIGHTS)
+    rows = make_slate()
+    bookie_cols = calc.get_bookie_columns(rows)
+    calc.run_sports(calc.partition_by_sport(rows), bookie_cols, max_workers=1)
+    assert calc.SHARP_WEIGHTS == before
+
+
+def test_run_sports_parallel_matches_sequential():
+    rows = make_slate()
+    bookie_cols = calc.get_bookie_columns(rows)
+    partitions = calc.partition_by_sport(rows)
+
+    sequential = calc.run_sports(partitions, bookie_cols, max_workers=1)
+    parallel = calc.run_sports(partitions, bookie_cols, max_workers=3)
+
+    assert sequential == parallel
+    assert [o["sport"] for o in parallel] == sorted(o["sport"] for o in parallel)
+    assert all(o["best_book"] == "Sportsbet" for o in parallel)
+
+
+def test_iter_event_chunks_cuts_on_event_boundaries():
+    rows = make_slate()
+    chunks = list(calc.iter_event_chunks(rows, chunk_rows=3))
+    assert sum(len(c) for c in chunks) == len(rows)
+    seen = set()
+    for chunk in chunks:
+        events = {r["event_id"] for r in chunk}
+        assert not events & seen
+        seen |= events
+
+
+def test_run_sports_failure_raises_serial_and_parallel():
+    rows = make_slate()
+    bookie_cols = calc.get_bookie_columns(rows)
+    partitions = calc.partition_by_sport(rows)
+    partitions["icehockey_nhl"] = None  # this sport's worker raises
+    for workers in (1, 3):
+        with pytest.raises(Exception):
+            calc.run_sports(partitions, bookie_cols, max_workers=workers)
+
+
+def test_streaming_matches_batch(tmp_path, monkeypatch):
+    rows = make_slate()
+    bookie_cols = calc.get_bookie_columns(rows)
+    batch = calc.run_sports(calc.partition_by_sport(rows), bookie_cols, max_workers=1)
+
+    chunks = calc.iter_event_chunks(iter(rows), chunk_rows=4)
+    streamed = list(calc.stream_opportunities(chunks, bookie_cols))
+    key = lambda o: (o["event_id"], o["selection"], o["best_book"])
+    assert sorted(streamed, key=key) == sorted(batch, key=key)
+
+    monkeypatch.setattr(calc, "EV_CSV", tmp_path / "ev_hits.csv")
+    monkeypatch.setattr(calc, "SessionLocal", None)
+    headers = calc.build_headers(bookie_cols)
+    written = calc.write_opportunities_stream(iter(streamed), headers)
+    assert written == len(batch)
+    assert len((tmp_path / "ev_hits.csv").read_text().splitlines()) == len(batch) + 1
+
+
+def test_streaming_logs_sharp_fairs_per_chunk(tmp_path, monkeypatch):
+    import pandas as pd
+
+    from pipeline_v2.clv import history_partitions
+
+    monkeypatch.setattr(calc, "FAIR_HISTORY_CSV", tmp_path / "fair_history.csv")
+    rows = make_slate()
+    bookie_cols = calc.get_bookie_columns(rows)
+    _, batch_scans = calc.process_sport("nba", rows, bookie_cols, with_scans=True)
+
+    scans = calc.new_scans()
+    chunks = calc.iter_event_chunks(iter(rows), chunk_rows=4)
+    list(calc.stream_opportunities(chunks, bookie_cols, scans_out=scans))
+    # Fairs went to disk chunk by chunk; none are held for the run
+    assert scans["fairs"] == []
+    logged = sum(len(pd.read_csv(p)) for p in history_partitions(calc.FAIR_HISTORY_CSV))
+    assert logged == len(batch_scans["fairs"]) > 0
+
+
+def test_read_raw_odds_grouped_matches_csv_path(tmp_path):
+    import pandas as pd
+    from sqlalchemy import create_engine
+
+    rows = make_slate()
+    db_url = f"sqlite:///{tmp_path / 'raw.db'}"
+    pd.DataFrame(rows).to_sql("raw_odds_pure", create_engine(db_url), index=False)
+
+    bookie_cols, grouped_by_sport, alt_stores = calc.read_raw_odds_grouped(db_url, batch_rows=4)
+    assert bookie_cols == calc.get_bookie_columns(rows)
+    from_db = calc.run_sports(grouped_by_sport, bookie_cols, max_workers=1, pregrouped=True)
+    from_rows = calc.run_sports(calc.partition_by_sport(rows), bookie_cols, max_workers=1)
+    assert from_db == from_rows
+
+
+def test_fair_from_sharps_devig_method(monkeypatch):
+    over, under = make_slate()[:2]
+    bookie_cols = calc.get_bookie_columns([over, under])
+
+    legacy_a, legacy_b, _ = calc.fair_from_sharps(over, under, bookie_cols, "basketball_nba")
+    assert 1 / legacy_a + 1 / legacy_b > 1.0  # sharp vig left in
+
+    fair_a, fair_b, count = calc.fair_from_sharps(
+        over, under, bookie_cols, "basketball_nba", devig_method="shin"
+    )
+    assert count == 2
+    assert abs(1 / fair_a + 1 / fair_b - 1.0) < 1e-9
+
+    monkeypatch.setenv("DEVIG_METHOD_ICEHOCKEY_NHL", "power")
+    assert calc.get_devig_method("icehockey_nhl") == "power"
+    assert calc.get_devig_method("basketball_nba") == "none"
+
+
+def test_three_way_h2h_priced_with_draw():
+    prices = {
+        "Home": dict(Pinnacle=2.10, Draftkings=2.12, Sportsbet=2.30),
+        "Draw": dict(Pinnacle=3.40, Draftkings=3.35, Sportsbet=3.30),
+        "Away": dict(Pinnacle=3.60, Draftkings=3.55, Sportsbet=3.50),
+    }
+    rows = [make_row("soccer_epl", "epl-1", "h2h", "", sel, **p) for sel, p in prices.items()]
+    bookie_cols = calc.get_bookie_columns(rows)
+
+    assert calc.extract_sides(rows) == (None, None)
+    assert len(calc.extract_outcomes(rows)) == 3
+
+    opps = calc.process_markets(calc.group_rows_wide(rows), bookie_cols, devig_method="shin")
+    assert [(o["selection"], o["best_book"]) for o in opps] == [("Home", "Sportsbet")]
+    assert opps[0]["sharp_book_count"] == 2
+
+
+def test_process_markets_matches_scalar_fair_prices():
+    rows = make_slate()
+    bookie_cols = calc.get_bookie_columns(rows)
+    for method in ("none", "multiplicative"):
+        opps = calc.process_markets(calc.group_rows_wide(rows), bookie_cols, devig_method=method)
+        assert opps
+        for opp in opps:
+            over, under = [r for r in rows if r["event_id"] == opp["event_id"]]
+            fair_over, _, count = calc.fair_from_sharps(
+                over, under, bookie_cols, opp["sport"], devig_method=method
+            )
+            assert abs(opp["fair_odds"] - fair_over) < 1e-12
+            assert opp["sharp_book_count"] == count
+
+
+def test_spread_sides_pair_and_unsharped_line_interpolates():
+    def spread(point, home_price, away_price, **sharps):
+        home = make_row("basketball_nba", "nba-9", "spreads", f"{point}", "Home", **sharps)
+        away = make_row("basketball_nba", "nba-9", "spreads", f"{-point}", "Away")
+        home.update(Sportsbet=f"{home_price:.3f}")
+        away.update(Sportsbet=f"{away_price:.3f}")
+        if sharps:
+            away.update(Pinnacle="1.900", Draftkings="1.910")
+        return [home, away]
+
+    rows = (
+        spread(-3.5, 1.95, 1.85, Pinnacle=1.90, Draftkings=1.91)
+        + spread(-4.5, 2.20, 1.70)  # Sportsbet only - no sharps on this line
+        + spread(-5.5, 2.10, 1.75, Pinnacle=2.00, Draftkings=2.02)
+    )
+    grouped = calc.group_rows_wide(rows)
+    assert {key[3] for key in grouped} == {"-3.5", "-4.5", "-5.5"}
+
+    opps = calc.process_markets(grouped, calc.get_bookie_columns(rows))
+    interp = [o for o in opps if o["fair_source"] == "interp"]
+    assert [(o["selection"], o["line"]) for o in interp] == [("Home", "-4.5")]
+    assert 1.90 < interp[0]["fair_odds"] < 2.02
+
+
+def test_alternate_lines_match_main_line_pricing():
+    rows = []
+    for point, sharps in [(208.5, True), (209.5, False), (210.5, True)]:
+        for side, sharp_price, soft_price in [("Over", 1.90, 2.05), ("Under", 1.95, 1.80)]:
+            prices = dict(Sportsbet=soft_price)
+            if sharps:
+                prices.update(Pinnacle=sharp_price, Draftkings=sharp_price + 0.01)
+            rows.append(
+                make_row(
+                    "basketball_nba",
+                    "nba-1",
+                    "alternate_totals",
+                    f"{point}",
+                    f"{side} +{point}",
+                    **prices,
+                )
+            )
+    bookie_cols = calc.get_bookie_columns(rows)
+
+    other, store = calc.split_alternate_lines(rows, bookie_cols)
+    assert other == [] and calc.store_size(store) == len(rows)
+    alt = calc.process_alternate_lines(store)
+
+    as_main = [dict(r, market="totals") for r in rows]
+    main = calc.process_markets(calc.group_rows_wide(as_main), bookie_cols)
+
+    key = lambda o: (o["selection"], o["best_book"], o["fair_odds"], o["fair_source"])
+    assert sorted(map(key, alt)) == sorted(map(key, main))
+    assert {o["fair_source"] for o in alt} == {"sharp", "interp"}
+
+
+def test_outlier_sharp_quote_is_rejected_and_counted():
+    from pipeline_v2.market_matrix import outlier_mask
+
+    odds = np.array([[[1.90, 1.91, 1.92, 2.60, 0.0], [1.95, 1.94, 1.93, 1.95, 1.80]]])
+    assert outlier_mask(odds, "mad").tolist() == [
+        [[False, False, False, True, False], [False, False, False, False, True]]
+    ]
+    # Within tolerance is always kept; too few quotes are left alone
+    assert not outlier_mask(odds, "mad", tolerance=0.5).any()
+    assert not outlier_mask(odds[:, :, :2], "relative").any()
+    assert outlier_mask(odds, "relative", tolerance=0.02)[0, 1].tolist() == [
+        False,
+        False,
+        False,
+        False,
+        True,
+    ]
+
+    rows = [
+        make_row(
+            "basketball_nba",
+            "nba-1",
+            "totals",
+            "210.5",
+            "Over +210.5",
+            Pinnacle=1.90,
+            Draftkings=1.91,
+            Fanduel=1.92,
+            Betmgm=2.60,
+            Sportsbet=2.05,
+        ),
+        make_row(
+            "basketball_nba",
+            "nba-1",
+            "totals",
+            "210.5",
+            "Under +210.5",
+            Pinnacle=1.95,
+            Draftkings=1.93,
+            Fanduel=1.94,
+            Betmgm=1.50,
+            Sportsbet=1.80,
+        ),
+    ]
+    bookie_cols = calc.get_bookie_columns(rows)
+    markets = [
+        (key, calc.extract_outcomes(bucket)) for key, bucket in calc.group_rows_wide(rows).items()
+    ]
+    batch = calc.price_market_batch(markets, 2, bookie_cols)
+    assert batch["outliers"] == {"Betmgm": 2}
+    assert 1.90 < batch["fair"][0, 0] < 1.92
+
+
+def test_bulk_writer_matches_row_formatting(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    rows = make_slate()
+    bookie_cols = calc.get_bookie_columns(rows)
+    opps = calc.process_markets(calc.group_rows_wide(rows), bookie_cols)
+    opps[0]["line"] = 210.5  # numbers and text mix in the generic columns
+    headers = calc.build_headers(bookie_cols) + ["Betfair_EX_EU"]  # a book no hit carries
+
+    plan = calc.compile_row_plan(headers)
+    expected = [[calc.format_row(opp, headers)[col] for col in headers] for opp in opps]
+    assert calc.format_block(opps, plan) == expected
+
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'ev.db'}")
+    calc.Base.metadata.create_all(db_engine)
+    monkeypatch.setattr(calc, "EV_CSV", tmp_path / "ev_hits.csv")
+    monkeypatch.setattr(calc, "engine", db_engine)
+    monkeypatch.setattr(calc, "SessionLocal", sessionmaker(bind=db_engine))
+    monkeypatch.setattr(calc, "WRITE_BATCH_ROWS", 2)
+    for _ in range(2):  # the second run replaces the first
+        assert calc.write_opportunities_stream(iter(opps), headers) == len(opps)
+
+    with db_engine.connect() as conn:
+        stored = conn.execute(calc.EVOpportunity.__table__.select()).mappings().all()
+        summary = conn.execute(calc.EVSummary.__table__.select()).mappings().all()
+    assert [(r["selection"], r["best_odds"]) for r in stored] == [
+        (o["selection"], o["odds_decimal"]) for o in opps
+    ]
+    sports = {o["sport"] for o in opps}
+    assert {r["sport"]: (r["hits"], r["top_ev"]) for r in summary} == {
+        sport: (
+            sum(o["sport"] == sport for o in opps),
+            max(o["ev_percent"] for o in opps if o["sport"] == sport),
+        )
+        for sport in sports
+    }
+    lines = (tmp_path / "ev_hits.csv").read_text().splitlines()
+    assert len(lines) == len(opps) + 1 and lines[0] == ",".join(headers)
@@ -0,0 +1,92 @@
+"""
+Tests for the sharp-book calibration job.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# pipeline_v2 lives under archive/
+sys.path.insert(0, str(Path(__file__).parent.parent / "archive"))
+
+from pipeline_v2.calibrate import devig_groups, learn_weights, score_sport, weight_profile
+from pipeline_v2.ratings import compile_weight_table, sport_rows
+
+
+def test_devig_groups_needs_every_outcome():
+    odds = np.array(
+        [
+            [2.0, 2.10, np.nan],
+            [3.0, 3.40, 3.50],
+            [2.0, 1.80, 1.90],
+            [4.0, 3.20, 3.00],
+        ]
+    )
+    # Rows 0 and 2 are one 2-way market, rows 1 and 3 another
+    probs = devig_groups(odds, np.array([0, 1, 0, 1]), "multiplicative")
+    assert np.allclose(probs[[0, 2], 0], [0.5, 0.5])
+    assert np.allclose(probs[[1, 3], 0], [4 / 7, 3 / 7])
+    assert np.isnan(probs[[0, 2], 2]).all()
+    assert np.allclose(probs[[0, 2], 1].sum(), 1.0)
+
+
+def test_sharper_book_scores_better_and_gets_more_weight():
+    rows, scores = [], {}
+    for g in range(40):
+        event_id = f"e{g}"
+        home_wins = g % 4 != 0  # home wins 75% of games
+        scores[event_id] = (100.0, 90.0) if home_wins else (90.0, 100.0)
+        for selection, pinnacle, betmgm in [("Home", 1.30, 1.95), ("Away", 4.00, 1.95)]:
+            rows.append(
+                {
+                    "timestamp": "2025-12-09T12:00:00+00:00",
+                    "sport": "basketball_nba",
+                    "event_id": event_id,
+                    "away_team": "Away",
+                    "home_team": "Home",
+                    "commence_time": "2025-12-10T10:00:00Z",
+                    "market": "h2h",
+                    "point": "",
+                    "selection": selection,
+                    "Pinnacle": pinnacle,
+                    "Betmgm": betmgm,
+                }
+            )
+    frame = pd.DataFrame(rows)
+    books = ["Pinnacle", "Betmgm"]
+    table = pd.DataFrame(score_sport("basketball_nba", frame, books, results=(scores, {})))
+
+    by_book = table.set_index("book")
+    assert by_book.loc["Betmgm", "quotes"] == 80
+    assert np.isclose(by_book.loc["Betmgm", "log_loss"], np.log(2))
+    assert np.isclose(by_book.loc["Betmgm", "brier"], 0.25)
+    assert by_book.loc["Pinnacle", "log_loss"] < by_book.loc["Betmgm", "log_loss"]
+
+    weighted = learn_weights(table, temperature=0.1, min_quotes=10).set_index("book")
+    assert np.isclose(weighted["weight"].sum(), 1.0)
+    assert weighted.loc["Pinnacle", "weight"] > 0.5
+    profile = weight_profile(weighted.reset_index())
+    assert set(profile["book_weights"]["basketball_nba"]) == {"Pinnacle", "Betmgm"}
+
+
+def test_non_main_class_weights_price_that_class():
+    scores = pd.DataFrame(
+        [
+            ("basketball_nba", "main", "Pinnacle", 0.8),
+            ("basketball_nba", "main", "Betmgm", 0.2),
+            ("basketball_nba", "props", "Betmgm", 1.0),
+        ],
+        columns=["sport", "market_class", "book", "weight"],
+    )
+    profile = weight_profile(scores)
+    assert profile["book_weights"] == {
+        "basketball_nba": {"Pinnacle": 0.8, "Betmgm": 0.2},
+        "basketball_nba|props": {"Betmgm": 1.0},
+    }
+
+    table = compile_weight_table(["Pinnacle", "Betmgm"], profile)
+    sports = ["basketball_nba"] * 3
+    rows = sport_rows(table, sports, ["main", "props", "alternate"])
+    assert table["matrix"][rows].tolist() == [[0.8, 0.2], [0.0, 1.0], [0.8, 0.2]]
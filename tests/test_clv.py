@@ -0,0 +1,163 @@
+"""
+Tests for the closing-line value stage.
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# pipeline_v2 lives under archive/
+sys.path.insert(0, str(Path(__file__).parent.parent / "archive"))
+
+from pipeline_v2 import calculate_opportunities as calc
+from pipeline_v2.clv import (
+    HISTORY_COLUMNS,
+    append_history,
+    append_rows,
+    closing_fairs,
+    history_partitions,
+    outcome_point,
+    prune_history,
+    read_history,
+)
+
+
+def test_closing_fair_is_last_before_kickoff():
+    history = pd.DataFrame(
+        [
+            ("2025-12-10T08:00:00+00:00", "e1", "spreads", "-3.5", "Home", 1.95),
+            ("2025-12-10T09:30:00+00:00", "e1", "spreads", "-3.5", "Home", 1.88),
+            # At (not before) kick-off, and another line of the same event
+            ("2025-12-10T10:00:00+00:00", "e1", "spreads", "-3.5", "Home", 1.70),
+            ("2025-12-10T09:45:00+00:00", "e1", "spreads", "-4.5", "Home", 2.05),
+            ("2025-12-10T09:45:00+00:00", "e2", "h2h", "", "Away", 2.50),
+        ],
+        columns=HISTORY_COLUMNS,
+    )
+    log = pd.DataFrame(
+        {
+            "event_id": ["e2", "e1", "e1", "e3"],
+            "commence_time": [
+                "2025-12-10T11:00:00Z",
+                "2025-12-10T10:00:00Z",
+                "2025-12-10T10:00:00Z",
+                "2025-12-10T10:00:00Z",
+            ],
+            "market": ["h2h", "spreads", "spreads", "h2h"],
+            "point": ["", outcome_point("-3.50"), "-3.5", ""],
+            "selection": ["Away", "Home", "Away", "Home"],
+        }
+    )
+    result = closing_fairs(log, history)
+    assert result["event_id"].tolist() == ["e2", "e1", "e1", "e3"]
+    assert np.allclose(
+        result["closing_fair"].to_numpy(), [2.50, 1.88, np.nan, np.nan], equal_nan=True
+    )
+    assert result["closed_at"][1] == pd.Timestamp("2025-12-10T09:30:00Z")
+
+
+def test_event_that_has_not_started_has_no_close():
+    history = pd.DataFrame(
+        [
+            ("2025-12-10T08:00:00+00:00", "e1", "h2h", "", "Home", 1.95),
+            ("2025-12-10T08:00:00+00:00", "e2", "h2h", "", "Home", 2.40),
+        ],
+        columns=HISTORY_COLUMNS,
+    )
+    log = pd.DataFrame(
+        {
+            "event_id": ["e1", "e2"],
+            "commence_time": ["2025-12-10T09:00:00Z", "2025-12-10T12:00:00Z"],
+            "market": ["h2h", "h2h"],
+            "point": ["", ""],
+            "selection": ["Home", "Home"],
+        }
+    )
+    # Run at 10:00: e1 has kicked off, e2's only fair is this run's, not a close
+    result = closing_fairs(log, history, now=datetime(2025, 12, 10, 10))
+    assert result["closing_fair"][0] == 1.95
+    assert np.isnan(result["closing_fair"][1]) and pd.isna(result["closed_at"][1])
+
+
+def test_calculator_logs_fairs_and_computes_clv(tmp_path, monkeypatch):
+    monkeypatch.setattr(calc, "FAIR_HISTORY_CSV", tmp_path / "fair_history.csv")
+    monkeypatch.setattr(calc, "OPPORTUNITY_LOG_CSV", tmp_path / "opportunity_log.csv")
+    monkeypatch.setattr(calc, "CLV_CSV", tmp_path / "clv.csv")
+    monkeypatch.setattr(calc, "HISTORY_RETENTION_DAYS", 100_000)
+
+    def rows(timestamp, pinnacle_home, target_home):
+        meta = {
+            "timestamp": timestamp,
+            "sport": "basketball_nba",
+            "event_id": "e1",
+            "away_team": "Away",
+            "home_team": "Home",
+            "commence_time": "2025-12-10T10:00:00Z",
+            "market": "h2h",
+            "point": "",
+        }
+        return [
+            {
+                **meta,
+                "selection": "Home",
+                "Pinnacle": pinnacle_home,
+                "Draftkings": "1.92",
+                "Sportsbet": target_home,
+            },
+            {
+                **meta,
+                "selection": "Away",
+                "Pinnacle": "1.95",
+                "Draftkings": "1.93",
+                "Sportsbet": "1.80",
+            },
+        ]
+
+    cols = ["Pinnacle", "Draftkings", "Sportsbet"]
+    # First run flags Home at 2.10; by the second run the sharp price has shortened
+    for timestamp, pinnacle_home, target_home in [
+        ("2025-12-10T08:00:00+00:00", "1.90", "2.10"),
+        ("2025-12-10T09:00:00+00:00", "1.80", "1.70"),
+    ]:
+        opps, scans = calc.process_sport(
+            "basketball_nba", rows(timestamp, pinnacle_home, target_home), cols, with_scans=True
+        )
+        assert len(scans["fairs"]) == 2
+        calc.record_clv([calc.clv_log_row(opp) for opp in opps], scans["fairs"])
+
+    table = pd.read_csv(tmp_path / "clv.csv")
+    assert len(table) == 1
+    hit = table.iloc[0]
+    closing = 1 / (1 / 1.80 + 1 / 1.92) * 2
+    assert hit["best_odds"] == 2.10
+    assert np.isclose(hit["closing_fair"], closing, atol=0.05)
+    assert np.isclose(hit["clv_percent"], (2.10 / hit["closing_fair"] - 1) * 100, atol=0.01)
+    assert len(pd.read_csv(tmp_path / "fair_history.2025-12-10.csv")) == 4
+
+
+def test_append_rows_writes_header_once(tmp_path):
+    path = tmp_path / "log.csv"
+    append_rows(path, ["a", "b"], [(1, 2)])
+    append_rows(path, ["a", "b"], [(3, 4)])
+    assert path.read_text().splitlines() == ["a,b", "1,2", "3,4"]
+
+
+def test_fair_history_is_partitioned_by_day_and_pruned(tmp_path):
+    path = tmp_path / "fair_history.csv"
+    rows = [
+        ("2025-12-09T23:50:00", "e1", "h2h", "", "Home", 1.9),
+        ("2025-12-10T00:10:00", "e1", "h2h", "", "Home", 1.8),
+        ("2025-12-10T00:20:00", "e2", "h2h", "", "Home", 2.2),
+    ]
+    assert append_history(path, rows) == 3
+    assert [p.name for p in history_partitions(path)] == [
+        "fair_history.2025-12-09.csv",
+        "fair_history.2025-12-10.csv",
+    ]
+    assert len(read_history(path, ["e1"])) == 2
+
+    assert prune_history(path, datetime(2025, 12, 10, 6)) == 1
+    assert read_history(path, ["e1", "e2"])["fair_odds"].tolist() == [1.8, 2.2]
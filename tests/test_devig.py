@@ -0,0 +1,62 @@
+"""
+Tests for the batch devig library.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# pipeline_v2 lives under archive/
+sys.path.insert(0, str(Path(__file__).parent.parent / "archive"))
+
+from pipeline_v2.devig import DEVIG_METHODS, devig
+
+ODDS = np.array(
+    [
+        [1.90, 1.95, np.nan],
+        [2.50, 3.40, 2.90],
+        [1.50, np.nan, 2.60],
+        [2.00, np.nan, np.nan],  # single priced outcome -> not devigable
+    ]
+)
+
+
+@pytest.mark.parametrize("method", DEVIG_METHODS)
+def test_rows_sum_to_one_and_respect_mask(method):
+    probs = devig(ODDS, method)
+    assert np.allclose(np.nansum(probs[:3], axis=1), 1.0)
+    assert np.isnan(probs[0, 2]) and np.isnan(probs[2, 1])
+    assert np.isnan(probs[3]).all()
+
+
+def test_multiplicative_matches_proportional():
+    probs = devig(ODDS[:1, :2], "multiplicative")[0]
+    implied = np.array([1 / 1.90, 1 / 1.95])
+    assert np.allclose(probs, implied / implied.sum())
+
+
+def test_power_solves_exponent():
+    probs = devig(ODDS, "power")
+    row = ODDS[1]
+    k = np.log(probs[1, 0]) / np.log(1 / row[0])
+    assert np.allclose(probs[1], (1 / row) ** k)
+
+
+def test_shin_equals_additive_for_two_way():
+    # Known property of Shin's model: with two outcomes it reduces to additive devig
+    two_way = np.array([[1.50, 2.60], [1.80, 2.10], [1.25, 4.20]])
+    assert np.allclose(devig(two_way, "shin"), devig(two_way, "additive"))
+
+
+def test_shin_shades_longshots_more_than_multiplicative():
+    probs_shin = devig(ODDS[1:2], "shin")[0]
+    probs_mult = devig(ODDS[1:2], "multiplicative")[0]
+    longshot = np.argmax(ODDS[1])
+    assert probs_shin[longshot] < probs_mult[longshot]
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        devig(ODDS, "bogus")
@@ -0,0 +1,84 @@
+"""
+Tests for the top-K EV leaderboards and the API serving them.
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# pipeline_v2 lives under archive/
+sys.path.insert(0, str(Path(__file__).parent.parent / "archive"))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pipeline_v2.leaderboard import (
+    leaderboards_document,
+    new_leaderboards,
+    offer,
+    write_leaderboards,
+)
+
+
+def make_opps(n=500):
+    rng = random.Random(5)
+    return [
+        {
+            "id": i,
+            "sport": rng.choice(["basketball_nba", "icehockey_nhl"]),
+            "market": rng.choice(["h2h", "totals", "player_points"]),
+            "ev_percent": round(rng.uniform(1, 12), 1),
+        }
+        for i in range(n)
+    ]
+
+
+def test_boards_match_full_sort():
+    opps = make_opps()
+    boards = new_leaderboards(10)
+    for opp in opps:
+        offer(boards, opp, opp["ev_percent"], opp["sport"], opp["market"])
+    doc = leaderboards_document(boards)
+
+    def top(rows):
+        # Stable sort keeps the first-seen item on ties, as the heap does
+        return [o["id"] for o in sorted(rows, key=lambda o: -o["ev_percent"])[:10]]
+
+    assert [o["id"] for o in doc["all"]["rows"]] == top(opps)
+    assert doc["all"]["count"] == len(opps)
+    for sport in ("basketball_nba", "icehockey_nhl"):
+        expected = top([o for o in opps if o["sport"] == sport])
+        assert [o["id"] for o in doc["sport"][sport]["rows"]] == expected
+    board = doc["sport_market"]["icehockey_nhl|totals"]
+    subset = [o for o in opps if o["sport"] == "icehockey_nhl" and o["market"] == "totals"]
+    assert board["count"] == len(subset)
+    assert [o["id"] for o in board["rows"]] == top(subset)
+
+
+def test_api_serves_leaderboards(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import backend_api
+
+    opps = make_opps(200)
+    boards = new_leaderboards(20)
+    for opp in opps:
+        offer(boards, opp, opp["ev_percent"], opp["sport"], opp["market"])
+    path = tmp_path / "ev_leaderboards.json"
+    write_leaderboards(path, leaderboards_document(boards, min_edge_percent=1.0))
+    monkeypatch.setattr(backend_api, "LEADERBOARD_JSON", path)
+    monkeypatch.setattr(backend_api, "EV_CSV", tmp_path / "ev_hits.csv")
+    client = TestClient(backend_api.app)
+
+    top = client.get("/api/ev/top", params={"sport": "basketball_nba", "limit": 5}).json()
+    nba = [o for o in opps if o["sport"] == "basketball_nba"]
+    assert top["total_count"] == len(nba)
+    assert [h["ev_percent"] for h in top["hits"]] == sorted(
+        (o["ev_percent"] for o in nba), reverse=True
+    )[:5]
+
+    # Pages inside the top K come from the leaderboards; deeper pages do not
+    page = client.get("/api/ev/hits", params={"limit": 10, "offset": 5}).json()
+    assert [h["id"] for h in page["hits"]] == [
+        o["id"] for o in leaderboards_document(boards)["all"]["rows"][5:15]
+    ]
+    assert page["total_count"] == len(opps)
+    assert backend_api.leaderboard_page(None, None, 0.01, 15, 10) is None
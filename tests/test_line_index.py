@@ -0,0 +1,42 @@
+"""
+Tests for the sorted line index.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# pipeline_v2 lives under archive/
+sys.path.insert(0, str(Path(__file__).parent.parent / "archive"))
+
+from pipeline_v2.line_index import (
+    SOURCE_CARRY,
+    SOURCE_INTERP,
+    SOURCE_NONE,
+    build_line_index,
+    interpolate_lines,
+)
+
+
+def test_interpolates_within_side_and_gap():
+    # side 0: Over at 210.5 / 212.5; side 1: Under at 210.5 / 212.5
+    index = build_line_index(
+        side_ids=[1, 0, 0, 1],
+        lines=[212.5, 212.5, 210.5, 210.5],
+        probs=[0.56, 0.44, 0.50, 0.50],
+    )
+    probs, source = interpolate_lines(
+        index, side_ids=[0, 1, 0, 0], lines=[211.5, 211.5, 215.5, 209.5], max_gap=1.5
+    )
+    assert np.allclose(probs[:2], [0.47, 0.53])
+    assert list(source) == [SOURCE_INTERP, SOURCE_INTERP, SOURCE_NONE, SOURCE_NONE]
+
+
+def test_carry_only_within_carry_gap():
+    index = build_line_index(side_ids=[0, 1], lines=[5.5, -100.0], probs=[0.48, 0.9])
+    probs, source = interpolate_lines(
+        index, side_ids=[0, 0], lines=[6.0, 7.5], max_gap=1.5, carry_gap=0.5
+    )
+    assert list(source) == [SOURCE_CARRY, SOURCE_NONE]
+    assert probs[0] == 0.48 and probs[1] == 0.0
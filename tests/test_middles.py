@@ -0,0 +1,87 @@
+"""
+Tests for the middles scanner.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# pipeline_v2 lives under archive/
+sys.path.insert(0, str(Path(__file__).parent.parent / "archive"))
+
+from pipeline_v2 import calculate_opportunities as calc
+from pipeline_v2.middles import middle_value, middle_windows
+
+
+def test_sweep_matches_all_pairs():
+    rng = np.random.default_rng(3)
+    n = 400
+    ladder = rng.integers(0, 12, n)
+    kind = rng.integers(0, 2, n)
+    threshold = rng.integers(-20, 20, n) / 2.0
+
+    low, high = middle_windows(ladder, kind, threshold, 0.5, 4.0)
+    found = set(zip(low.tolist(), high.tolist()))
+    expected = {
+        (i, j)
+        for i in range(n)
+        for j in range(n)
+        if kind[i] == 0
+        and kind[j] == 1
+        and ladder[i] == ladder[j]
+        and 0.5 <= threshold[j] - threshold[i] <= 4.0
+    }
+    assert found == expected
+    assert len(low) == len(found)
+
+
+def test_middle_value_pays_equal_and_hits_double():
+    value = middle_value(np.array([1.95]), np.array([2.0]), np.array([0.55]), np.array([0.5]))
+    payout = 1 / (1 / 1.95 + 1 / 2.0)
+    assert np.isclose(value["stake_low"][0] * 1.95, value["stake_high"][0] * 2.0)
+    assert np.isclose(value["stake_low"][0] + value["stake_high"][0], 1.0)
+    assert np.isclose(value["middle_prob"][0], 0.05)
+    assert np.isclose(value["ev"][0], 1.05 * payout - 1)
+    assert np.isclose(value["hit_return"][0], 2 * payout - 1)
+
+
+def test_find_middles_across_totals_and_spread_lines():
+    def row(market, point, sel, **prices):
+        return {
+            "sport": "basketball_nba",
+            "event_id": "e1",
+            "away_team": "Away",
+            "home_team": "Home",
+            "commence_time": "2025-12-10T10:00:00Z",
+            "market": market,
+            "point": point,
+            "selection": sel,
+            **{bk: f"{price:.3f}" for bk, price in prices.items()},
+        }
+
+    rows = [
+        row("totals", "210.5", "Over", Pinnacle=1.91, Draftkings=1.91, Sportsbet=2.05),
+        row("totals", "210.5", "Under", Pinnacle=1.91, Draftkings=1.91, Sportsbet=1.80),
+        row("totals", "213.5", "Over", Pinnacle=2.10, Draftkings=2.10, Tab=1.85),
+        row("totals", "213.5", "Under", Pinnacle=1.75, Draftkings=1.75, Tab=1.98),
+        # Home -3.5 / Away +6.5: home margin 4..6 wins both
+        row("spreads", "-3.5", "Home", Pinnacle=1.91, Draftkings=1.91, Sportsbet=1.95),
+        row("spreads", "3.5", "Away", Pinnacle=1.91, Draftkings=1.91, Sportsbet=1.85),
+        row("spreads", "-6.5", "Home", Pinnacle=2.30, Draftkings=2.30, Tab=2.20),
+        row("spreads", "6.5", "Away", Pinnacle=1.62, Draftkings=1.62, Tab=1.72),
+    ]
+    cols = ["Pinnacle", "Draftkings", "Sportsbet", "Tab"]
+    middles = calc.find_middles(
+        calc.group_rows_wide(rows), cols, target_books=["Sportsbet", "Tab"], min_ev=-1.0
+    )
+
+    windows = {(m["market"], m["window_low"], m["window_high"]) for m in middles}
+    assert windows == {("totals", 210.5, 213.5), ("spreads", 3.5, 6.5)}
+    totals = next(m for m in middles if m["market"] == "totals")
+    assert [(leg["selection"], leg["book"]) for leg in totals["legs"]] == [
+        ("Over", "Sportsbet"),
+        ("Under", "Tab"),
+    ]
+    assert totals["window_width"] == 3.0
+    assert 0 < totals["middle_prob"] < 0.1
@@ -0,0 +1,59 @@
+"""
+Tests for portfolio stake sizing.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# pipeline_v2 lives under archive/
+sys.path.insert(0, str(Path(__file__).parent.parent / "archive"))
+
+from pipeline_v2.portfolio import simultaneous_kelly, size_portfolio
+
+
+def opp(event_id, selection, book, odds, fair, market="h2h", line=""):
+    return {
+        "sport": "soccer_epl",
+        "event_id": event_id,
+        "market": market,
+        "line": line,
+        "selection": selection,
+        "away_team": "Away",
+        "home_team": "Home",
+        "best_book": book,
+        "odds_decimal": odds,
+        "fair_odds": fair,
+    }
+
+
+def test_single_outcome_is_plain_kelly():
+    fraction = simultaneous_kelly(np.array([0.55]), np.array([2.0]), np.array([0]))
+    assert np.isclose(fraction[0], (0.55 * 2.0 - 1) / (2.0 - 1))
+
+
+def test_exclusive_outcomes_match_grid_search():
+    prob, odds = np.array([0.5, 0.3]), np.array([2.2, 3.5])
+    fractions = simultaneous_kelly(prob, odds, np.array([7, 7]))
+
+    grid = np.linspace(0, 0.3, 301)
+    a, b = np.meshgrid(grid, grid, indexing="ij")
+    growth = (
+        prob[0] * np.log(1 - a - b + a * odds[0])
+        + prob[1] * np.log(1 - a - b + b * odds[1])
+        + (1 - prob.sum()) * np.log(1 - a - b)
+    )
+    i, j = np.unravel_index(np.argmax(growth), growth.shape)
+    assert np.allclose(fractions, [grid[i], grid[j]], atol=2e-3)
+
+
+def test_best_price_only_and_event_cap():
+    opps = [opp("e1", "Home", "Sportsbet", 2.40, 2.0), opp("e1", "Home", "Tab", 2.30, 2.0)]
+    opps += [
+        opp("e1", "Away", "Sportsbet", 2.9, 2.5, market="spreads", line=f"{-line}")
+        for line in range(5)
+    ]
+    stakes = size_portfolio(opps, bankroll=1000, kelly_fraction=1.0, max_event_exposure=0.10)
+    assert stakes[0] > 0 and stakes[1] == 0
+    assert np.isclose(stakes.sum(), 100.0)
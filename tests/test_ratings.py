@@ -0,0 +1,48 @@
+"""
+Tests for the compiled sharp weight tables.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# pipeline_v2 lives under archive/
+sys.path.insert(0, str(Path(__file__).parent.parent / "archive"))
+
+from pipeline_v2 import ratings
+from pipeline_v2.ratings import sport_rows, weight_table
+
+
+def test_weight_table_hot_reloads_profile(tmp_path, monkeypatch):
+    path = tmp_path / "profile.json"
+    monkeypatch.setattr(ratings, "RATINGS_PROFILE_PATH", str(path))
+    monkeypatch.setattr(ratings, "_profile_state", {"generation": 0, "mtime": None, "profile": {}})
+    monkeypatch.setattr(ratings, "_table_cache", {})
+    monkeypatch.setenv("SPORT_WEIGHT_ICEHOCKEY_NHL", "2")
+    cols = ["Sportsbet", "Pinnacle", "Betmgm", "Mybookie"]
+
+    table = weight_table(cols)
+    assert table["sharp_books"] == ["Pinnacle", "Betmgm"]
+    assert table["sharp_idx"].tolist() == [1, 2]
+    rows = sport_rows(table, ["basketball_nba", "icehockey_nhl"])
+    assert table["matrix"][rows].tolist() == [[4.0, 3.0], [8.0, 6.0]]
+    assert not table["matrix"].flags.writeable
+    assert weight_table(cols) is table
+
+    # A calibrated profile replaces the NBA weights and promotes Mybookie there
+    profile = {"book_weights": {"basketball_nba": {"Pinnacle": 0.7, "Mybookie": 0.3}}}
+    path.write_text(json.dumps(profile))
+    os.utime(path, ns=(1, 1))
+    table = weight_table(cols)
+    assert table["sharp_books"] == ["Pinnacle", "Betmgm", "Mybookie"]
+    nba = table["matrix"][sport_rows(table, ["basketball_nba"])[0]]
+    assert np.allclose(nba, [0.7, 0.0, 0.3])
+    assert table["partial"]
+
+    # A broken write keeps the last good profile
+    path.write_text("{not json")
+    os.utime(path, ns=(2, 2))
+    assert weight_table(cols)["sharp_books"] == ["Pinnacle", "Betmgm", "Mybookie"]
@@ -0,0 +1,55 @@
+"""
+Tests for the threshold / weight sensitivity sweep.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# pipeline_v2 lives under archive/
+sys.path.insert(0, str(Path(__file__).parent.parent / "archive"))
+
+from pipeline_v2 import calculate_opportunities as calc
+from pipeline_v2.benchmarks import synthetic_rows
+from pipeline_v2.sensitivity import precompute, sweep, threshold_grid
+
+
+def test_sweep_matches_engine_hits(monkeypatch):
+    monkeypatch.setattr(calc, "INTERP_MAX_GAP", 0)
+    rows = list(synthetic_rows(2000))
+    bookie_cols = calc.get_bookie_columns(rows)
+    grouped = calc.group_rows_wide(rows)
+    matrix = precompute(grouped, bookie_cols, ["none", "shin"])
+
+    for method in ("none", "shin"):
+        opps = calc.process_markets(grouped, bookie_cols, devig_method=method)
+        edges = [calc.EV_MIN_EDGE, 0.03]
+        results = sweep(matrix, ["ratings", "default"], [method], [2, 3], edges)
+        assert len(results) == 8
+        live = results[0]
+        assert (live["profile"], live["min_sharps"], live["min_edge"]) == ("ratings", 2, 0.01)
+        assert live["hits"] == len(opps)
+        assert np.isclose(
+            live["mean_ev_percent"], np.mean([o["ev_percent"] for o in opps]), atol=1e-3
+        )
+        # Stricter thresholds never add hits
+        assert results[1]["hits"] <= live["hits"] and results[2]["hits"] <= live["hits"]
+
+
+def test_threshold_grid_cells():
+    hits = {
+        "ev": np.array([0.005, 0.02, 0.04, 0.06]),
+        "coverage": np.array([2, 4, 3, 2]),
+        "stake": np.array([1.0, 2.0, 3.0, 4.0]),
+    }
+    grid = threshold_grid(hits, [2, 3], [0.01, 0.05])
+    assert grid["hits"].tolist() == [[3, 1], [2, 0]]
+    assert np.allclose(grid["turnover"], [[9.0, 4.0], [5.0, 0.0]])
+    assert np.allclose(grid["mean_ev"][1, 0], 0.03)
+
+
+def test_sweep_of_an_empty_snapshot():
+    matrix = {"sharp_books": [], "bookie_cols": [], "batches": []}
+    results = sweep(matrix, ["ratings"], ["none"], [2], [0.01])
+    assert [(r["hits"], r["turnover"]) for r in results] == [(0, 0.0)]